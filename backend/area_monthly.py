@@ -0,0 +1,351 @@
+"""Bölge ve ay bazında önceden hesaplanmış m² fiyatı özetleri.
+
+``area_monthly_stats`` her (şehir, ilçe, mahalle, ay) için ilan sayısını,
+m² fiyatı toplamını/sayısını ve birleştirilebilir bir medyan taslağını
+tutar. Taslak, m² fiyatlarının logaritmik kovalara göre histogramıdır
+(``SKETCH_GAMMA`` = 1.02, kova içi göreli hata ~%1); iki ayın veya iki
+mahallenin taslağı kova sayıları toplanarak birleştirilir.
+
+Satırlar kayıt sırasında dokunulan (bölge, ay) anahtarları için
+``AreaStatisticsRefresher.flush`` tarafından yeniden hesaplanır; her
+anahtar sadece o mahallenin o ayki ilanlarını okur. Değerleme ham ilanları
+taramak yerine ilçenin son aylarındaki birkaç yüz satırı okur.
+
+Aylık çözünürlükte "son 6 ay" içinde bulunulan ay ve önceki 5 aydır.
+
+``area_monthly_stats`` ilanları ilan tarihinin ayına ve güncel fiyatına göre
+toplar; bir ilanın fiyatı değiştiğinde eski ayın ortalaması da değişir. Bu
+yüzden fiyat trendleri ayrı bir seriden, ``area_price_monthly``'den
+hesaplanır: her (bölge, ay) için o ay ``price_history``'ye kaydedilen
+fiyatlar (yeni ilanlar ve fiyat değişiklikleri; saklama süresini aşmış aylar
+için ``price_history_monthly`` özetleri), her ilanın o ayki son fiyatıyla
+bir kez sayılır. Geçmiş ayların satırları sonradan gelen fiyat
+değişikliklerinden etkilenmez. Trend, içinde bulunulan ayda gözlenen m²
+fiyatı ortalamasının 6 ve 12 ay önceki aylarda gözlenen ortalamaya göre
+değişimidir; bir trend için mahallenin sadece iki aylık satırı okunur (bkz.
+``area_trends_query``).
+"""
+from datetime import date
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from databases import Database
+
+from price_history import add_months
+
+SKETCH_GAMMA = 1.02
+WINDOW_MONTHS = 6
+# Trend kolonu -> karşılaştırılan ayın kaç ay önce olduğu
+TREND_MONTHS = {'price_trend_6m': WINDOW_MONTHS, 'price_trend_1y': 12}
+
+MonthKey = Tuple[str, str, str, date]
+
+# (şehir, ilçe, mahalle, ay) anahtarlarını properties'ten yeniden hesapla.
+# Anahtarın ayında hiç ilan kalmadıysa satır sıfırlanır.
+RECOMPUTE_MONTHLY_QUERY = f"""
+    WITH keys AS (
+        SELECT DISTINCT *
+        FROM unnest($1::text[], $2::text[], $3::text[], $4::date[])
+            AS k(city, district, neighborhood, month)
+    ),
+    listings AS (
+        SELECT k.city, k.district, k.neighborhood, k.month, p.price_per_sqm
+        FROM keys k
+        JOIN properties p
+            ON p.city = k.city AND p.district = k.district AND p.neighborhood = k.neighborhood
+            AND p.created_at >= k.month AND p.created_at < k.month + INTERVAL '1 month'
+    ),
+    totals AS (
+        SELECT city, district, neighborhood, month,
+            COUNT(*) AS listings,
+            COALESCE(SUM(price_per_sqm), 0) AS price_per_sqm_sum,
+            COUNT(price_per_sqm) AS price_per_sqm_count
+        FROM listings
+        GROUP BY city, district, neighborhood, month
+    ),
+    buckets AS (
+        SELECT city, district, neighborhood, month,
+            FLOOR(LN(price_per_sqm) / LN({SKETCH_GAMMA}))::int AS bucket,
+            COUNT(*)::int AS n
+        FROM listings
+        WHERE price_per_sqm > 0
+        GROUP BY city, district, neighborhood, month, bucket
+    ),
+    sketches AS (
+        SELECT city, district, neighborhood, month,
+            array_agg(bucket ORDER BY bucket) AS sketch_buckets,
+            array_agg(n ORDER BY bucket) AS sketch_counts
+        FROM buckets
+        GROUP BY city, district, neighborhood, month
+    )
+    INSERT INTO area_monthly_stats (
+        city, district, neighborhood, month,
+        listings, price_per_sqm_sum, price_per_sqm_count,
+        sketch_buckets, sketch_counts
+    )
+    SELECT
+        k.city, k.district, k.neighborhood, k.month,
+        COALESCE(t.listings, 0),
+        COALESCE(t.price_per_sqm_sum, 0),
+        COALESCE(t.price_per_sqm_count, 0),
+        COALESCE(s.sketch_buckets, '{{}}'),
+        COALESCE(s.sketch_counts, '{{}}')
+    FROM keys k
+    LEFT JOIN totals t USING (city, district, neighborhood, month)
+    LEFT JOIN sketches s USING (city, district, neighborhood, month)
+    ON CONFLICT (city, district, neighborhood, month) DO UPDATE SET
+        listings = EXCLUDED.listings,
+        price_per_sqm_sum = EXCLUDED.price_per_sqm_sum,
+        price_per_sqm_count = EXCLUDED.price_per_sqm_count,
+        sketch_buckets = EXCLUDED.sketch_buckets,
+        sketch_counts = EXCLUDED.sketch_counts,
+        updated_at = CURRENT_TIMESTAMP
+"""
+
+# (şehir, ilçe, mahalle, ay) anahtarlarının gözlenen fiyat satırlarını
+# price_history ve price_history_monthly'den yeniden hesapla. İlanın ay
+# içindeki son fiyatı sayılır.
+RECOMPUTE_PRICE_MONTHLY_QUERY = """
+    WITH keys AS (
+        SELECT DISTINCT *
+        FROM unnest($1::text[], $2::text[], $3::text[], $4::date[])
+            AS k(city, district, neighborhood, month)
+    ),
+    observations AS (
+        SELECT k.city, k.district, k.neighborhood, k.month,
+            p.id AS property_id, p.square_meters, h.price, h.recorded_at
+        FROM keys k
+        JOIN properties p
+            ON p.city = k.city AND p.district = k.district AND p.neighborhood = k.neighborhood
+        JOIN price_history h
+            ON h.property_id = p.id
+            AND h.recorded_at >= k.month AND h.recorded_at < k.month + INTERVAL '1 month'
+        UNION ALL
+        SELECT k.city, k.district, k.neighborhood, k.month,
+            p.id, p.square_meters, m.last_price, m.last_recorded_at
+        FROM keys k
+        JOIN properties p
+            ON p.city = k.city AND p.district = k.district AND p.neighborhood = k.neighborhood
+        JOIN price_history_monthly m ON m.property_id = p.id AND m.month = k.month
+    ),
+    latest AS (
+        SELECT DISTINCT ON (property_id, month)
+            city, district, neighborhood, month,
+            price / NULLIF(square_meters, 0) AS price_per_sqm
+        FROM observations
+        WHERE price > 0
+        ORDER BY property_id, month, recorded_at DESC
+    ),
+    totals AS (
+        SELECT city, district, neighborhood, month,
+            COUNT(*) AS listings,
+            COALESCE(SUM(price_per_sqm), 0) AS price_per_sqm_sum,
+            COUNT(price_per_sqm) AS price_per_sqm_count
+        FROM latest
+        GROUP BY city, district, neighborhood, month
+    )
+    INSERT INTO area_price_monthly (
+        city, district, neighborhood, month,
+        listings, price_per_sqm_sum, price_per_sqm_count
+    )
+    SELECT
+        k.city, k.district, k.neighborhood, k.month,
+        COALESCE(t.listings, 0),
+        COALESCE(t.price_per_sqm_sum, 0),
+        COALESCE(t.price_per_sqm_count, 0)
+    FROM keys k
+    LEFT JOIN totals t USING (city, district, neighborhood, month)
+    ON CONFLICT (city, district, neighborhood, month) DO UPDATE SET
+        listings = EXCLUDED.listings,
+        price_per_sqm_sum = EXCLUDED.price_per_sqm_sum,
+        price_per_sqm_count = EXCLUDED.price_per_sqm_count,
+        updated_at = CURRENT_TIMESTAMP
+"""
+
+
+def _month_sql(offset: int) -> str:
+    """İçinde bulunulan aydan ``offset`` ay önceki ayın başı"""
+    if not offset:
+        return "date_trunc('month', NOW())::date"
+    return f"(date_trunc('month', NOW()) - INTERVAL '{offset} months')::date"
+
+
+def _month_average_sql(offset: int) -> str:
+    month = _month_sql(offset)
+    return (
+        f"SUM(price_per_sqm_sum) FILTER (WHERE month = {month})"
+        f" / NULLIF(SUM(price_per_sqm_count) FILTER (WHERE month = {month}), 0)"
+        f" AS avg_{offset}"
+    )
+
+
+def _trend_sql(offset: int) -> str:
+    """Yüzde değişim; aylardan birinde ilan yoksa 0 (DECIMAL(5, 2) sınırında)"""
+    change = f"avg_0 / NULLIF(avg_{offset}, 0) * 100 - 100"
+    return f"COALESCE(ROUND(LEAST(GREATEST({change}, -999.99), 999.99), 2), 0)"
+
+
+def area_trends_query(conditions: str = '') -> str:
+    """Mahallelerin ``TREND_MONTHS`` trendleri; sadece içinde bulunulan ayın ve
+    karşılaştırılan ayların satırları okunur. ``conditions``
+    ``area_price_monthly`` kolonları üzerinde " AND ..." ile başlayan ek filtredir."""
+    offsets = (0, *TREND_MONTHS.values())
+    months = ', '.join(_month_sql(offset) for offset in offsets)
+    averages = ',\n                '.join(_month_average_sql(offset) for offset in offsets)
+    trends = ',\n            '.join(
+        f"{_trend_sql(offset)} AS {name}" for name, offset in TREND_MONTHS.items()
+    )
+    return f"""
+        SELECT city, district, neighborhood,
+            {trends}
+        FROM (
+            SELECT city, district, neighborhood,
+                {averages}
+            FROM area_price_monthly
+            WHERE month IN ({months}){conditions}
+            GROUP BY city, district, neighborhood
+        ) averages
+    """
+
+
+TREND_MONTHS_SQL = ', '.join(_month_sql(offset) for offset in (0, *TREND_MONTHS.values()))
+
+# İlçenin pencere ayları (içinde bulunulan ay dahil 7 ay, series = 'listings')
+# ve trend ayları için gözlenen fiyat satırları (series = 'prices')
+DISTRICT_MONTHS_QUERY = f"""
+    SELECT
+        'listings' AS series,
+        neighborhood, month, listings, price_per_sqm_sum, price_per_sqm_count,
+        sketch_buckets, sketch_counts,
+        date_trunc('month', NOW())::date AS current_month
+    FROM area_monthly_stats
+    WHERE city = $1 AND district = $2
+      AND month > {_month_sql(WINDOW_MONTHS)}
+    UNION ALL
+    SELECT
+        'prices' AS series,
+        neighborhood, month, listings, price_per_sqm_sum, price_per_sqm_count,
+        '{{}}'::int[], '{{}}'::int[],
+        date_trunc('month', NOW())::date AS current_month
+    FROM area_price_monthly
+    WHERE city = $1 AND district = $2
+      AND month IN ({TREND_MONTHS_SQL})
+"""
+
+
+def window_months(today: Optional[date] = None) -> List[date]:
+    """Değerlemenin okuduğu aylar: 6 ay önce ... içinde bulunulan ay"""
+    current = (today or date.today()).replace(day=1)
+    return [add_months(current, -offset) for offset in range(WINDOW_MONTHS, -1, -1)]
+
+
+def trend_months(today: Optional[date] = None) -> List[date]:
+    """Trendlerin okuduğu gözlenen fiyat ayları: içinde bulunulan ay, 6 ve 12 ay önce"""
+    current = (today or date.today()).replace(day=1)
+    return [add_months(current, -offset) for offset in (0, *TREND_MONTHS.values())]
+
+
+class PriceSketch:
+    """m² fiyatlarının logaritmik kova histogramı (birleştirilebilir)"""
+
+    def __init__(self):
+        self.counts: Dict[int, int] = {}
+        self.total = 0
+
+    def add_buckets(self, buckets: Iterable[int], counts: Iterable[int]):
+        for bucket, count in zip(buckets, counts):
+            self.counts[bucket] = self.counts.get(bucket, 0) + count
+            self.total += count
+
+    def merge(self, other: 'PriceSketch') -> 'PriceSketch':
+        self.add_buckets(other.counts.keys(), other.counts.values())
+        return self
+
+    def quantile(self, q: float) -> Optional[float]:
+        if not self.total:
+            return None
+        rank = q * self.total
+        seen = 0
+        for bucket in sorted(self.counts):
+            seen += self.counts[bucket]
+            if seen >= rank:
+                # Kovanın geometrik orta noktası
+                return SKETCH_GAMMA ** (bucket + 0.5)
+        return SKETCH_GAMMA ** (max(self.counts) + 0.5)
+
+
+class _Accumulator:
+    def __init__(self):
+        self.listings = 0
+        self.price_sum = 0.0
+        self.price_count = 0
+        self.sketch = PriceSketch()
+
+    def add(self, row):
+        self.listings += row['listings']
+        self.price_sum += float(row['price_per_sqm_sum'])
+        self.price_count += row['price_per_sqm_count']
+        self.sketch.add_buckets(row['sketch_buckets'], row['sketch_counts'])
+
+    @property
+    def average(self) -> Optional[float]:
+        return self.price_sum / self.price_count if self.price_count else None
+
+
+async def fetch_district_months(db: Database, city: str, district: str) -> List:
+    async with db.connection() as connection:
+        return await connection.raw_connection.fetch(DISTRICT_MONTHS_QUERY, city, district)
+
+
+async def area_price_summary(db: Database, city: str, district: str, neighborhood: str) -> Dict:
+    """Değerlemenin kullandığı mahalle/ilçe özetleri ve 6 ay/1 yıllık trendler"""
+    return summarize_area(await fetch_district_months(db, city, district), neighborhood)
+
+
+def summarize_area(rows: List, neighborhood: str) -> Dict:
+    """İlçenin aylık satırlarından bir mahallenin özetini çıkar (toplu
+    değerlemede aynı satırlar ilçedeki bütün mahalleler için kullanılır)"""
+    neighborhood_stats, district_stats = _Accumulator(), _Accumulator()
+    last_month, six_months_ago, year_ago = _Accumulator(), _Accumulator(), _Accumulator()
+    for row in rows:
+        current = row['current_month']
+        trend_start = add_months(current, -WINDOW_MONTHS)
+        if row['series'] == 'prices':
+            if row['neighborhood'] != neighborhood:
+                continue
+            if row['month'] == current:
+                last_month.add(row)
+            elif row['month'] == trend_start:
+                six_months_ago.add(row)
+            elif row['month'] == add_months(current, -TREND_MONTHS['price_trend_1y']):
+                year_ago.add(row)
+            continue
+        in_window = row['month'] > trend_start
+        if in_window:
+            district_stats.add(row)
+        if row['neighborhood'] != neighborhood:
+            continue
+        if in_window:
+            neighborhood_stats.add(row)
+
+    last_month_avg = last_month.average
+    six_months_ago_avg, year_ago_avg = six_months_ago.average, year_ago.average
+    return {
+        'neighborhood_avg_price': neighborhood_stats.average,
+        'neighborhood_median_price': neighborhood_stats.sketch.quantile(0.5),
+        'neighborhood_listings': neighborhood_stats.listings,
+        'district_avg_price': district_stats.average,
+        'district_median_price': district_stats.sketch.quantile(0.5),
+        'district_listings': district_stats.listings,
+        'last_month_avg': last_month_avg,
+        'six_months_ago_avg': six_months_ago_avg,
+        'year_ago_avg': year_ago_avg,
+        'price_trend_6m': price_change(last_month_avg, six_months_ago_avg),
+        'price_trend_1y': price_change(last_month_avg, year_ago_avg),
+    }
+
+
+def price_change(current: Optional[float], previous: Optional[float]) -> float:
+    """Yüzde değişim; ortalamalardan biri yoksa 0 (``_trend_sql`` ile aynı)"""
+    if current is None or not previous:
+        return 0
+    return (current - previous) / previous * 100
@@ -0,0 +1,280 @@
+"""Bölge istatistiklerinin ertelenmiş (dirty-set) güncellenmesi.
+
+Kayıt sırasında dokunulan (şehir, ilçe, mahalle) anahtarları toplanır ve
+her anahtar sayfa ya da tarama başına bir kez güncellenir. İki mod vardır:
+
+- ``recompute``: Anahtarın bütün ilanları üzerinden ortalamalar yeniden
+  hesaplanır (tek ifade, bütün kirli anahtarlar için).
+- ``incremental``: ``area_statistics`` üzerindeki toplam/sayaç kolonları
+  kayıt sonuçlarından gelen farklarla güncellenir; maliyet mahallenin
+  büyüklüğünden bağımsızdır.
+
+Güncelleme başarısız olursa kirli anahtarlar bekleyen kümeye geri eklenir
+ve bir sonraki güncellemede (artımlı modda da) baştan hesaplanır. Başarılı
+bir güncellemeden sonra ``add_flush_listener`` ile kaydedilen dinleyiciler
+güncellenen her (şehir, ilçe) için çağrılır.
+
+Her iki modda da dokunulan (bölge, ay) anahtarlarının ``area_monthly_stats``
+satırları, yeni ilan veya fiyat değişikliği görülen bölgelerin içinde
+bulunulan aydaki ``area_price_monthly`` satırları aynı transaction'da
+yeniden hesaplanır (bkz. ``area_monthly``) ve kirli bölgelerin
+``price_trend_6m``/``price_trend_1y`` kolonları gözlenen fiyat serisinden
+güncellenir. Ay değiştiğinde saklanan trendler bölgeye yeni
+kayıt gelene kadar eskir; ``/area-statistics/`` trendleri okurken
+``area_price_monthly`` satırlarından hesaplar.
+"""
+import logging
+import os
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+from databases import Database
+
+from area_monthly import (RECOMPUTE_MONTHLY_QUERY, RECOMPUTE_PRICE_MONTHLY_QUERY, MonthKey,
+                          area_trends_query, trend_months, window_months)
+from ingest import IngestResult
+from metrics import timed
+
+logger = logging.getLogger(__name__)
+
+AREA_STATS_MODE = os.getenv("AREA_STATS_MODE", "recompute")
+# Kirli bölgelerin ne zaman güncelleneceği: her sayfadan sonra ("page")
+# veya sadece tarama sonunda ("crawl")
+AREA_STATS_FLUSH = os.getenv("AREA_STATS_FLUSH", "page")
+
+AreaKey = Tuple[str, str, str]
+
+# Başarılı bir güncellemeden sonra her (şehir, ilçe) ile çağrılır, ör.
+# aylık özetlerden okunan değerleme önbelleğini geçersiz kılmak için
+_flush_listeners: List[Callable[[str, str], None]] = []
+
+RECOMPUTE_QUERY = """
+    INSERT INTO area_statistics (
+        city, district, neighborhood,
+        avg_price_per_sqm, avg_property_age,
+        total_listings, price_trend_6m, price_trend_1y,
+        price_per_sqm_sum, price_per_sqm_count,
+        building_age_sum, building_age_count
+    )
+    SELECT
+        p.city, p.district, p.neighborhood,
+        AVG(p.price_per_sqm),
+        AVG(p.building_age),
+        COUNT(*),
+        0,  -- price_trend_6m, TRENDS_QUERY ile güncellenir
+        0,  -- price_trend_1y, TRENDS_QUERY ile güncellenir
+        COALESCE(SUM(p.price_per_sqm), 0),
+        COUNT(p.price_per_sqm),
+        COALESCE(SUM(p.building_age), 0),
+        COUNT(p.building_age)
+    FROM properties p
+    JOIN unnest($1::text[], $2::text[], $3::text[]) AS k(city, district, neighborhood)
+        ON p.city = k.city AND p.district = k.district AND p.neighborhood = k.neighborhood
+    GROUP BY p.city, p.district, p.neighborhood
+    ON CONFLICT (city, district, neighborhood) DO UPDATE SET
+        avg_price_per_sqm = EXCLUDED.avg_price_per_sqm,
+        avg_property_age = EXCLUDED.avg_property_age,
+        total_listings = EXCLUDED.total_listings,
+        price_per_sqm_sum = EXCLUDED.price_per_sqm_sum,
+        price_per_sqm_count = EXCLUDED.price_per_sqm_count,
+        building_age_sum = EXCLUDED.building_age_sum,
+        building_age_count = EXCLUDED.building_age_count,
+        updated_at = CURRENT_TIMESTAMP
+"""
+
+# Kirli bölgelerin trendleri; trend aylarında gözlenen fiyatı olmayan bölgeler 0 olur
+TRENDS_QUERY = f"""
+    UPDATE area_statistics a SET
+        price_trend_6m = COALESCE(t.price_trend_6m, 0),
+        price_trend_1y = COALESCE(t.price_trend_1y, 0)
+    FROM unnest($1::text[], $2::text[], $3::text[]) AS k(city, district, neighborhood)
+    LEFT JOIN ({area_trends_query(
+        " AND (city, district, neighborhood) IN"
+        " (SELECT * FROM unnest($1::text[], $2::text[], $3::text[]))"
+    )}) t
+        ON t.city = k.city AND t.district = k.district AND t.neighborhood = k.neighborhood
+    WHERE a.city = k.city AND a.district = k.district AND a.neighborhood = k.neighborhood
+"""
+
+EXISTING_KEYS_QUERY = """
+    SELECT a.city, a.district, a.neighborhood
+    FROM area_statistics a
+    JOIN unnest($1::text[], $2::text[], $3::text[]) AS k(city, district, neighborhood)
+        ON a.city = k.city AND a.district = k.district AND a.neighborhood = k.neighborhood
+    WHERE a.price_per_sqm_count IS NOT NULL
+"""
+
+INCREMENT_QUERY = """
+    UPDATE area_statistics a SET
+        total_listings = a.total_listings + k.listings,
+        price_per_sqm_sum = a.price_per_sqm_sum + k.price_per_sqm_sum,
+        price_per_sqm_count = a.price_per_sqm_count + k.price_per_sqm_count,
+        building_age_sum = a.building_age_sum + k.building_age_sum,
+        building_age_count = a.building_age_count + k.building_age_count,
+        avg_price_per_sqm = (a.price_per_sqm_sum + k.price_per_sqm_sum)
+            / NULLIF(a.price_per_sqm_count + k.price_per_sqm_count, 0),
+        avg_property_age = (a.building_age_sum + k.building_age_sum)
+            / NULLIF(a.building_age_count + k.building_age_count, 0),
+        updated_at = CURRENT_TIMESTAMP
+    FROM unnest(
+        $1::text[], $2::text[], $3::text[], $4::int[],
+        $5::float8[], $6::int[], $7::float8[], $8::int[]
+    ) AS k(
+        city, district, neighborhood, listings,
+        price_per_sqm_sum, price_per_sqm_count, building_age_sum, building_age_count
+    )
+    WHERE a.city = k.city AND a.district = k.district AND a.neighborhood = k.neighborhood
+"""
+
+
+def add_flush_listener(listener: Callable[[str, str], None]):
+    _flush_listeners.append(listener)
+
+
+def _notify_flushed(dirty: Set[AreaKey]):
+    for city, district in {key[:2] for key in dirty}:
+        for listener in _flush_listeners:
+            try:
+                listener(city, district)
+            except Exception as e:
+                logger.error(f"Bölge istatistiği dinleyicisi çalıştırılamadı: {str(e)}")
+
+
+def _to_float(value) -> Optional[float]:
+    return float(value) if value is not None else None
+
+
+class AreaStatisticsRefresher:
+    """Kirli bölge anahtarlarını toplayıp toplu olarak güncelle"""
+
+    def __init__(self, db: Database, mode: str = AREA_STATS_MODE):
+        if mode not in ('recompute', 'incremental'):
+            raise ValueError(f"Geçersiz bölge istatistiği modu: {mode}")
+        self.db = db
+        self.mode = mode
+        self._dirty: Set[AreaKey] = set()
+        self._dirty_months: Set[MonthKey] = set()
+        # area_price_monthly'de yeniden hesaplanacak (bölge, ay) anahtarları
+        self._dirty_price_months: Set[MonthKey] = set()
+        # listings, price_per_sqm_sum, price_per_sqm_count, building_age_sum, building_age_count
+        self._deltas: Dict[AreaKey, List[float]] = {}
+        # Artımlı modda da baştan hesaplanacak bölgeler
+        self._recompute: Set[AreaKey] = set()
+
+    @property
+    def pending(self) -> int:
+        return len(self._dirty)
+
+    def mark(self, city: str, district: str, neighborhood: str):
+        """Bir bölgeyi tamamen yeniden hesaplanmak üzere işaretle"""
+        if city and district and neighborhood:
+            self._dirty.add((city, district, neighborhood))
+            self._recompute.add((city, district, neighborhood))
+            for month in window_months():
+                self._dirty_months.add((city, district, neighborhood, month))
+            for month in trend_months():
+                self._dirty_price_months.add((city, district, neighborhood, month))
+
+    def track(self, result: IngestResult):
+        """Kayıt sonucundaki satırların bölgelerini ve farklarını topla"""
+        for row in result.rows:
+            key = (row['city'], row['district'], row['neighborhood'])
+            if not all(key):
+                continue
+            self._dirty.add(key)
+            if row['unchanged']:
+                continue
+            self._dirty_months.add(key + (row['created_month'],))
+            if row['inserted'] or row['price_changed']:
+                self._dirty_price_months.add(key + (row['observed_month'],))
+
+            prior_key = (row.get('prior_city'), row.get('prior_district'), row.get('prior_neighborhood'))
+            if not row['inserted'] and prior_key != key:
+                # Yeniden parse ilanı başka bir bölgeye taşıdı: iki bölge de
+                # farklarla değil baştan hesaplanır
+                self._recompute.add(key)
+                if all(prior_key):
+                    self._dirty.add(prior_key)
+                    self._recompute.add(prior_key)
+                    self._dirty_months.add(prior_key + (row['created_month'],))
+                # İlanın trend aylarındaki gözlemleri de yeni bölgeye geçer
+                for month in trend_months():
+                    self._dirty_price_months.add(key + (month,))
+                    if all(prior_key):
+                        self._dirty_price_months.add(prior_key + (month,))
+                continue
+
+            delta = self._deltas.setdefault(key, [0, 0.0, 0, 0.0, 0])
+            new_sqm_price = _to_float(row['price_per_sqm'])
+            old_sqm_price = _to_float(row['prior_price_per_sqm'])
+            new_age, old_age = row['building_age'], row.get('prior_building_age')
+            if row['inserted']:
+                delta[0] += 1
+                old_sqm_price = old_age = None
+            if new_sqm_price is not None:
+                delta[1] += new_sqm_price
+                delta[2] += 1
+            if old_sqm_price is not None:
+                delta[1] -= old_sqm_price
+                delta[2] -= 1
+            if new_age is not None:
+                delta[3] += new_age
+                delta[4] += 1
+            if old_age is not None:
+                delta[3] -= old_age
+                delta[4] -= 1
+
+    async def flush(self):
+        """Kirli bölgeleri güncelle ve kümeyi boşalt"""
+        if not self._dirty:
+            return
+
+        dirty, deltas, dirty_months = self._dirty, self._deltas, self._dirty_months
+        forced, dirty_price_months = self._recompute, self._dirty_price_months
+        self._dirty, self._deltas, self._dirty_months = set(), {}, set()
+        self._recompute, self._dirty_price_months = set(), set()
+
+        try:
+            with timed('db_area_stats'):
+                async with self.db.connection() as connection:
+                    async with connection.transaction():
+                        raw = connection.raw_connection
+                        if self.mode == 'incremental':
+                            recompute = await self._apply_increments(raw, dirty - forced, deltas) | forced
+                        else:
+                            recompute = dirty
+                        if recompute:
+                            await raw.execute(RECOMPUTE_QUERY, *map(list, zip(*recompute)))
+                        if dirty_months:
+                            await raw.execute(RECOMPUTE_MONTHLY_QUERY, *map(list, zip(*dirty_months)))
+                        if dirty_price_months:
+                            await raw.execute(RECOMPUTE_PRICE_MONTHLY_QUERY, *map(list, zip(*dirty_price_months)))
+                        await raw.execute(TRENDS_QUERY, *map(list, zip(*dirty)))
+            logger.info(
+                f"Bölge istatistikleri güncellendi: {len(dirty)} bölge "
+                f"({len(recompute)} yeniden hesaplandı, {len(dirty_months)} bölge-ay)"
+            )
+            _notify_flushed(dirty)
+        except Exception as e:
+            logger.error(f"Bölge istatistikleri güncellenirken hata: {str(e)}")
+            # Farklar uygulanmış mı bilinmediği için bölgeler bir sonraki
+            # güncellemede farklarla değil baştan hesaplanır
+            self._dirty |= dirty
+            self._dirty_months |= dirty_months
+            self._dirty_price_months |= dirty_price_months
+            self._recompute |= dirty
+
+    async def _apply_increments(self, raw, dirty: Set[AreaKey], deltas: Dict[AreaKey, List[float]]) -> Set[AreaKey]:
+        """Var olan bölgelere farkları uygula, toplamı bilinmeyenleri geri döndür"""
+        if not dirty:
+            return set()
+        existing = {
+            (row['city'], row['district'], row['neighborhood'])
+            for row in await raw.fetch(EXISTING_KEYS_QUERY, *map(list, zip(*dirty)))
+        }
+
+        changed = [(key, delta) for key, delta in deltas.items() if key in existing]
+        if changed:
+            columns = [list(column) for column in zip(*(key + tuple(delta) for key, delta in changed))]
+            await raw.execute(INCREMENT_QUERY, *columns)
+
+        return dirty - existing
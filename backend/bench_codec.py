@@ -0,0 +1,123 @@
+"""İlan yanıtlarının serileştirme maliyeti: eski yol ve ortak codec.
+
+Eski yol ``GET /properties/``'in önceki davranışını taklit eder:
+``agent_phone`` metin olarak gelir ve satır başına ``json.loads`` ile
+açılır, her satırdan ``Property`` nesnesi kurulur, FastAPI dönen listeyi
+``response_model`` ile yeniden doğrular, ``jsonable_encoder`` ile sözlüğe
+çevirir ve standart ``json`` ile yazar. Yeni yol ``codec.property_rows`` ve
+``FastJSONResponse``'tur. Satırlar veritabanı tiplerinde (Decimal, int,
+liste) sentetik olarak üretilir; veritabanı bağlantısı gerekmez.
+
+Kullanım:
+    python bench_codec.py [--rows 1000] [--repeat 50]
+"""
+import argparse
+import json
+import random
+import statistics
+import time
+from decimal import Decimal
+from typing import Callable, Dict, List
+
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+
+from codec import FastJSONResponse, orjson, property_rows
+from main import Property
+
+CITIES = ['İstanbul', 'Ankara', 'İzmir']
+PROPERTY_TYPES = ['Daire', 'Villa', 'Residence']
+
+
+def synthetic_rows(count: int, phone_as_text: bool) -> List[Dict]:
+    rng = random.Random(42)
+    rows = []
+    for i in range(count):
+        price = Decimal(rng.randint(500_000, 20_000_000))
+        square_meters = Decimal(rng.randint(40, 300))
+        phones = [f"0532 {rng.randint(100, 999)} {rng.randint(10, 99)} {rng.randint(10, 99)}"]
+        rows.append({
+            'id': i + 1,
+            'title': f"Satılık {rng.choice(PROPERTY_TYPES)} {i}",
+            'price': price,
+            'currency': 'TL',
+            'city': rng.choice(CITIES),
+            'district': f"İlçe {rng.randint(1, 30)}",
+            'neighborhood': f"Mahalle {rng.randint(1, 200)}",
+            'square_meters': square_meters,
+            'building_age': rng.randint(0, 40),
+            'property_type': rng.choice(PROPERTY_TYPES),
+            'listing_date': '',
+            'listing_number': str(100000 + i),
+            'price_per_sqm': (price / square_meters).quantize(Decimal('0.01')),
+            'predicted_price': None,
+            'area_avg_price': None,
+            'price_trend': None,
+            'area_price_trend': None,
+            'investment_score': rng.randint(0, 100),
+            'location_score': rng.randint(0, 100),
+            'property_score': rng.randint(0, 100),
+            'overall_score': rng.randint(0, 100),
+            'agency_name': 'Emlak Ofisi',
+            'agent_name': 'Danışman',
+            'agent_phone': json.dumps(phones) if phone_as_text else phones,
+            'image_url': f"https://example.com/{i}.jpg",
+            'listing_url': f"https://example.com/ilan/{i}",
+        })
+    return rows
+
+
+def serialize_before(rows: List[Dict], adapter: TypeAdapter) -> bytes:
+    properties = []
+    for row in rows:
+        result_dict = dict(row)
+        if result_dict['agent_phone']:
+            try:
+                result_dict['agent_phone'] = json.loads(result_dict['agent_phone'])
+            except ValueError:
+                result_dict['agent_phone'] = []
+        else:
+            result_dict['agent_phone'] = []
+        properties.append(Property(**result_dict))
+    validated = adapter.validate_python(properties, from_attributes=True)
+    content = jsonable_encoder(validated)
+    return json.dumps(content, ensure_ascii=False, allow_nan=False,
+                      indent=None, separators=(',', ':')).encode('utf-8')
+
+
+def serialize_after(rows: List[Dict]) -> bytes:
+    return FastJSONResponse(content=property_rows(rows)).body
+
+
+def measure(fn: Callable[[], bytes], repeat: int) -> float:
+    fn()  # ısınma
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings)
+
+
+def main(rows: int, repeat: int):
+    text_rows = synthetic_rows(rows, phone_as_text=True)
+    native_rows = synthetic_rows(rows, phone_as_text=False)
+    adapter = TypeAdapter(List[Property])
+
+    before = measure(lambda: serialize_before(text_rows, adapter), repeat)
+    after = measure(lambda: serialize_after(native_rows), repeat)
+    per_thousand = 1000 / rows
+
+    print(f"{rows} satır, {repeat} tekrar (medyan), JSON kodlayıcı: {'orjson' if orjson else 'json'}")
+    print(f"  eski yol : {before * 1000 * per_thousand:8.2f} ms / 1000 satır")
+    print(f"  codec    : {after * 1000 * per_thousand:8.2f} ms / 1000 satır")
+    print(f"  hızlanma : {before / after:8.1f}x")
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description="İlan yanıtı serileştirme benchmark'ı")
+    arg_parser.add_argument('--rows', type=int, default=1000)
+    arg_parser.add_argument('--repeat', type=int, default=50, help="Tekrar sayısı (medyan alınır)")
+    args = arg_parser.parse_args()
+
+    main(args.rows, args.repeat)
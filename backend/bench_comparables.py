@@ -0,0 +1,75 @@
+"""Emsal indeksinde benzerlik araması gecikmesi, ilçe büyüklüğüne göre.
+
+Sentetik ilçeler (1.000 - 100.000 ilan) ``DistrictIndex``'e yüklenir ve
+rastgele değerleme istekleri için en iyi 10 emsal seçilir. Veritabanı
+gerekmez; tam satırların kimlikle okunması (10 satır, birincil anahtar)
+ölçüme dahil değildir.
+
+Kullanım:
+    python bench_comparables.py [--sizes 1000,10000,50000,100000] [--repeat 200]
+"""
+import argparse
+import random
+import statistics
+import time
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from typing import Dict, List
+
+from comparables import COMPARABLE_WINDOW_MONTHS, DistrictIndex, months_ago
+
+NEIGHBORHOODS = [f"Mahalle {i}" for i in range(40)]
+PROPERTY_TYPES = ['Daire', 'Villa', 'Residence', 'Müstakil Ev']
+
+
+def synthetic_records(count: int, rng: random.Random) -> List[Dict]:
+    now = datetime.now(timezone.utc)
+    return [
+        {
+            'id': i + 1,
+            'square_meters': Decimal(rng.randint(40, 300)),
+            'building_age': rng.choice([None, *range(40)]),
+            'neighborhood': rng.choice(NEIGHBORHOODS),
+            'property_type': rng.choice(PROPERTY_TYPES),
+            'created_at': now - timedelta(days=rng.randint(0, 200)),
+            'price': Decimal(rng.randint(500_000, 20_000_000)),
+        }
+        for i in range(count)
+    ]
+
+
+def main(sizes: List[int], repeat: int):
+    rng = random.Random(42)
+    since = int(months_ago(datetime.now(timezone.utc), COMPARABLE_WINDOW_MONTHS).timestamp())
+    print(f"{'ilan':>8}  {'yükleme':>10}  {'medyan':>9}  {'p95':>9}")
+    for size in sizes:
+        records = synthetic_records(size, rng)
+        index = DistrictIndex()
+        started = time.perf_counter()
+        index.load(records)
+        load_ms = (time.perf_counter() - started) * 1000
+
+        timings = []
+        for _ in range(repeat):
+            query = {
+                'square_meters': float(rng.randint(50, 250)),
+                'building_age': rng.randint(0, 30),
+                'neighborhood': rng.choice(NEIGHBORHOODS),
+                'property_type': rng.choice(PROPERTY_TYPES),
+            }
+            started = time.perf_counter()
+            index.top_k(k=10, since=since, **query)
+            timings.append((time.perf_counter() - started) * 1000)
+        timings.sort()
+        p95 = timings[int(len(timings) * 0.95) - 1]
+        print(f"{size:>8}  {load_ms:>8.1f}ms  {statistics.median(timings):>7.3f}ms  {p95:>7.3f}ms")
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description="Emsal indeksi benchmark'ı")
+    arg_parser.add_argument('--sizes', default='1000,10000,50000,100000',
+                            help="Virgülle ayrılmış ilçe büyüklükleri")
+    arg_parser.add_argument('--repeat', type=int, default=200)
+    args = arg_parser.parse_args()
+
+    main([int(size) for size in args.sizes.split(',')], args.repeat)
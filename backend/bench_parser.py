@@ -0,0 +1,64 @@
+"""Kaydedilmiş sonuç sayfaları üzerinde ilan parser'ının hızını ölç.
+
+Kullanım:
+    python bench_parser.py sayfalar/ [--backend lxml] [--repeat 5]
+"""
+import argparse
+import gzip
+import logging
+import time
+from pathlib import Path
+from typing import List
+
+from listing_parser import available_backends, default_backend, parse_listings_html
+
+
+def load_pages(directory: Path) -> List[str]:
+    """Dizindeki .html ve .html.gz dosyalarını oku"""
+    pages = []
+    for path in sorted(directory.iterdir()):
+        if path.name.endswith('.html.gz'):
+            with gzip.open(path, 'rt', encoding='utf-8') as f:
+                pages.append(f.read())
+        elif path.suffix == '.html':
+            pages.append(path.read_text(encoding='utf-8'))
+    return pages
+
+
+def run(pages: List[str], backend: str, repeat: int) -> None:
+    total_listings = 0
+    started = time.perf_counter()
+    for _ in range(repeat):
+        for html in pages:
+            total_listings += len(parse_listings_html(html, backend=backend))
+    elapsed = time.perf_counter() - started
+
+    parsed_pages = len(pages) * repeat
+    print(
+        f"{backend:12s} {parsed_pages} sayfa, {total_listings} ilan, "
+        f"{elapsed:.3f} sn, {parsed_pages / elapsed:.1f} sayfa/sn, "
+        f"{elapsed / parsed_pages * 1000:.2f} ms/sayfa"
+    )
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="İlan parser benchmark'ı")
+    arg_parser.add_argument('directory', type=Path, help="Kaydedilmiş sonuç sayfalarının dizini")
+    arg_parser.add_argument('--backend', choices=available_backends(),
+                            help="Sadece bu backend'i ölç (varsayılan: hepsi)")
+    arg_parser.add_argument('--repeat', type=int, default=3, help="Her sayfanın kaç kez parse edileceği")
+    args = arg_parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+
+    pages = load_pages(args.directory)
+    if not pages:
+        arg_parser.error(f"{args.directory} içinde .html veya .html.gz dosyası yok")
+
+    print(f"Varsayılan backend: {default_backend()}")
+    for backend in [args.backend] if args.backend else available_backends():
+        run(pages, backend, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
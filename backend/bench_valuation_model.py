@@ -0,0 +1,164 @@
+"""Değerleme modelinin tahmin gecikmesi ve ayrılmış ilanlardaki hatası.
+
+İlanlar zamana göre sıralanır, en yeni ``--holdout`` oranı ayrılır ve model
+(``train_model.train``, yeniden eğitmeden) eski ilanlarla eğitilir. Ayrılan
+ilanlar için:
+
+- tek istekte ve toplu (``--batch``) tahminde istek başına gecikme
+  (p50/p99), API'deki ``ValuationModel.predict_many`` yoluyla
+- ``ml`` ve ``rules`` tahminlerinin hatası. Kural tabanlı tahminin bölge
+  ortalamaları eğitim ilanlarından hesaplanır; iki yol da sadece kuralların
+  hesaplayabildiği (mahallesi eğitimde görülmüş, bina yaşı bilinen)
+  ilanlarda karşılaştırılır.
+
+Varsayılan olarak sentetik ilanlar kullanılır (veritabanı gerekmez);
+``--from-db`` ile ``properties`` tablosu okunur.
+
+Kullanım:
+    python bench_valuation_model.py [--listings 100000] [--from-db] [--repeat 1000] [--batch 500]
+"""
+import argparse
+import asyncio
+import math
+import random
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+
+from train_model import load_frame, predict_frame, prepare_frame, price_errors, train
+from valuation import rules_sqm_price
+from valuation_model import ValuationModel
+
+CITIES = ['İstanbul', 'Ankara', 'İzmir']
+DISTRICTS_PER_CITY = 20
+NEIGHBORHOODS_PER_DISTRICT = 15
+PROPERTY_TYPES = {'Daire': 0.0, 'Residence': 0.15, 'Villa': 0.3, 'Müstakil Ev': -0.1}
+MONTHS = 24
+
+
+def synthetic_records(count: int, rng: random.Random) -> List[Dict]:
+    """Bölge seviyesi, metrekare, yaş, tip ve aylık artış etkili log-normal fiyatlar"""
+    areas = []
+    for city in CITIES:
+        for d in range(DISTRICTS_PER_CITY):
+            district_level = rng.gauss(math.log(30_000), 0.4)
+            for n in range(NEIGHBORHOODS_PER_DISTRICT):
+                areas.append((city, f"İlçe {d}", f"Mahalle {n}", district_level + rng.gauss(0, 0.2)))
+
+    now = datetime.now(timezone.utc)
+    records = []
+    for _ in range(count):
+        city, district, neighborhood, level = rng.choice(areas)
+        property_type = rng.choice(list(PROPERTY_TYPES))
+        square_meters = float(rng.randint(45, 300))
+        building_age = rng.choice([None, *range(40)])
+        months_back = rng.uniform(0, MONTHS)
+        log_sqm_price = (
+            level
+            + PROPERTY_TYPES[property_type]
+            - 0.15 * math.log(square_meters / 100)
+            - 0.01 * (building_age if building_age is not None else 15)
+            - 0.02 * months_back
+            + rng.gauss(0, 0.15)
+        )
+        records.append({
+            'city': city,
+            'district': district,
+            'neighborhood': neighborhood,
+            'property_type': property_type,
+            'square_meters': square_meters,
+            'building_age': building_age,
+            'price': math.exp(log_sqm_price) * square_meters,
+            'created_at': now - timedelta(days=months_back * 30.4),
+        })
+    return records
+
+
+def percentile(timings: List[float], q: float) -> float:
+    return float(np.percentile(timings, q))
+
+
+def rules_prices(train_frame: pd.DataFrame, test_frame: pd.DataFrame) -> np.ndarray:
+    """Eğitim ilanlarının bölge ortalamalarıyla kural tabanlı fiyat (hesaplanamazsa NaN)"""
+    neighborhoods = train_frame.groupby(['city', 'district', 'neighborhood'])['price_per_sqm'].mean().to_dict()
+    districts = train_frame.groupby(['city', 'district'])['price_per_sqm'].mean().to_dict()
+    prices = []
+    for row in test_frame.itertuples():
+        neighborhood_avg = neighborhoods.get((row.city, row.district, row.neighborhood))
+        if neighborhood_avg is None or math.isnan(row.building_age):
+            prices.append(np.nan)
+            continue
+        area_stats = {
+            'neighborhood_avg_price': neighborhood_avg,
+            'district_avg_price': districts[(row.city, row.district)],
+        }
+        _, sqm_price = rules_sqm_price(area_stats, int(row.building_age), row.square_meters)
+        prices.append(sqm_price * row.square_meters)
+    return np.array(prices)
+
+
+def main(frame: pd.DataFrame, holdout: float, repeat: int, batch: int):
+    started = time.perf_counter()
+    artifact = train(frame, holdout, refit=False)
+    train_seconds = time.perf_counter() - started
+    model = ValuationModel(artifact)
+
+    cutoff = int(len(frame) * (1 - holdout))
+    train_frame, test_frame = frame.iloc[:cutoff], frame.iloc[cutoff:]
+    requests = list(test_frame.itertuples())
+    print(f"ilan: {len(frame)}  eğitim: {len(train_frame)}  ayrılmış: {len(test_frame)}  "
+          f"eğitim süresi: {train_seconds:.1f} sn")
+
+    # Gecikme: API'deki gibi tek istek ve ilçe grubu büyüklüğünde toplu çağrı
+    rng = random.Random(7)
+    model.predict_many(requests[:batch])  # ilk çağrının ısınma maliyeti ölçülmez
+    single = []
+    for _ in range(repeat):
+        request = rng.choice(requests)
+        call_started = time.perf_counter()
+        model.predict_many([request])
+        single.append((time.perf_counter() - call_started) * 1000)
+    batched = []
+    for _ in range(max(1, repeat // 10)):
+        chunk = rng.sample(requests, min(batch, len(requests)))
+        call_started = time.perf_counter()
+        model.predict_many(chunk)
+        batched.append((time.perf_counter() - call_started) * 1000 / len(chunk))
+    print(f"\n{'tahmin':<18}  {'p50':>9}  {'p99':>9}")
+    print(f"{'tek istek':<18}  {percentile(single, 50):>7.3f}ms  {percentile(single, 99):>7.3f}ms")
+    print(f"{f'toplu ({batch}), birim':<18}  {percentile(batched, 50):>7.4f}ms  {percentile(batched, 99):>7.4f}ms")
+
+    # Hata: ayrılmış ilanlarda ml ve kural tabanlı tahmin
+    actual = test_frame['price'].to_numpy()
+    ml = predict_frame(model.estimator, model.encodings, test_frame)
+    rules = rules_prices(train_frame, test_frame)
+    comparable = ~np.isnan(rules)
+    print(f"\n{'yol':<6}  {'ilan':>7}  {'MAPE':>7}  {'medyan':>7}  {'%10 içi':>8}  {'%20 içi':>8}")
+    rows = [
+        ('ml', price_errors(actual, ml)),
+        ('ml*', price_errors(actual[comparable], ml[comparable])),
+        ('rules*', price_errors(actual[comparable], rules[comparable])),
+    ]
+    for name, errors in rows:
+        print(f"{name:<6}  {errors['listings']:>7}  {errors['mape']:>6.2f}%  {errors['median_ape']:>6.2f}%  "
+              f"{errors['within_10pct']:>7.2f}%  {errors['within_20pct']:>7.2f}%")
+    print("* kural tabanlı tahminin hesaplanabildiği ilanlar")
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description="Değerleme modeli benchmark'ı")
+    arg_parser.add_argument('--listings', type=int, default=100_000, help="Sentetik ilan sayısı")
+    arg_parser.add_argument('--from-db', action='store_true', help="properties tablosunu kullan")
+    arg_parser.add_argument('--holdout', type=float, default=0.2)
+    arg_parser.add_argument('--repeat', type=int, default=1000)
+    arg_parser.add_argument('--batch', type=int, default=500)
+    args = arg_parser.parse_args()
+
+    if args.from_db:
+        listings = asyncio.run(load_frame())
+    else:
+        listings = prepare_frame(synthetic_records(args.listings, random.Random(42)))
+    main(listings, args.holdout, args.repeat, args.batch)
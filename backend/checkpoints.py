@@ -0,0 +1,97 @@
+"""Tarama ilerlemesinin veritabanında saklanması.
+
+Her arama adresi için tamamlanan son sayfa ve o sayfada görülen son ilan
+numarası tutulur. Tarama yarıda kesilirse bir sonraki çalıştırma kaldığı
+sayfadan devam eder; tarama bittiğinde kayıt tamamlandı olarak işaretlenir
+ve sonraki tarama yeniden ilk sayfadan başlar.
+"""
+import logging
+from typing import Dict, Optional
+
+from databases import Database
+
+from metrics import timed
+
+logger = logging.getLogger(__name__)
+
+LOAD_QUERY = """
+    SELECT base_url, last_page, last_listing_number, completed, started_at, updated_at
+    FROM crawl_checkpoints
+    WHERE base_url = :base_url
+"""
+
+START_QUERY = """
+    INSERT INTO crawl_checkpoints (base_url, last_page, last_listing_number, completed, started_at, updated_at)
+    VALUES (:base_url, 0, NULL, FALSE, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP)
+    ON CONFLICT (base_url) DO UPDATE SET
+        last_page = 0,
+        last_listing_number = NULL,
+        completed = FALSE,
+        started_at = CURRENT_TIMESTAMP,
+        updated_at = CURRENT_TIMESTAMP
+"""
+
+SAVE_QUERY = """
+    UPDATE crawl_checkpoints SET
+        last_page = :last_page,
+        last_listing_number = COALESCE(:last_listing_number, last_listing_number),
+        updated_at = CURRENT_TIMESTAMP
+    WHERE base_url = :base_url
+"""
+
+COMPLETE_QUERY = """
+    UPDATE crawl_checkpoints SET completed = TRUE, updated_at = CURRENT_TIMESTAMP
+    WHERE base_url = :base_url
+"""
+
+
+class CrawlCheckpoints:
+    """Arama adresi başına kaldığı yer bilgisi.
+
+    Kayıt hataları taramayı durdurmaz; en kötü ihtimalle tarama baştan başlar.
+    """
+
+    def __init__(self, db: Database):
+        self.db = db
+
+    async def start(self, base_url: str, resume: bool = True) -> int:
+        """Taramanın başlayacağı sayfayı döndür.
+
+        Yarım kalmış bir tarama varsa (ve resume açıksa) kaldığı sayfanın bir
+        sonrası, yoksa kayıt sıfırlanır ve 1 döner.
+        """
+        checkpoint = await self.load(base_url) if resume else None
+        if checkpoint and not checkpoint['completed'] and checkpoint['last_page'] > 0:
+            logger.info(
+                f"Yarım kalan tarama devam ediyor: {base_url}, sayfa {checkpoint['last_page'] + 1} "
+                f"(son ilan: {checkpoint['last_listing_number']})"
+            )
+            return checkpoint['last_page'] + 1
+        await self._execute(START_QUERY, {"base_url": base_url})
+        return 1
+
+    async def load(self, base_url: str) -> Optional[Dict]:
+        try:
+            row = await self.db.fetch_one(query=LOAD_QUERY, values={"base_url": base_url})
+        except Exception as e:
+            logger.error(f"Tarama kaydı okunurken hata: {str(e)}")
+            return None
+        return dict(row) if row else None
+
+    async def save(self, base_url: str, last_page: int, last_listing_number: Optional[str] = None):
+        """Tamamlanan son sayfayı kaydet"""
+        await self._execute(SAVE_QUERY, {
+            "base_url": base_url,
+            "last_page": last_page,
+            "last_listing_number": last_listing_number,
+        })
+
+    async def complete(self, base_url: str):
+        await self._execute(COMPLETE_QUERY, {"base_url": base_url})
+
+    async def _execute(self, query: str, values: Dict):
+        try:
+            with timed('db_checkpoint'):
+                await self.db.execute(query=query, values=values)
+        except Exception as e:
+            logger.error(f"Tarama kaydı yazılırken hata: {str(e)}")
@@ -0,0 +1,94 @@
+"""İlan yanıtları için ortak satır dönüştürücü ve hızlı JSON yanıtı.
+
+- ``jsonb``/``json`` kolonları havuz bağlantısı açılırken kaydedilen
+  codec sayesinde asyncpg'den doğrudan Python nesnesi olarak gelir;
+  SQL'de ``::text`` dönüşümü ve satır başına ``json.loads`` gerekmez.
+- ``property_row`` veritabanı satırını ``Property`` şemasındaki alanlara
+  indirger; satırlar zaten veritabanı tiplerinde olduğundan Pydantic ile
+  ikinci kez doğrulanmaz.
+- ``FastJSONResponse`` kuruluysa orjson ile yazar (Decimal dahil), değilse
+  standart ``json`` modülüne döner.
+"""
+import json
+from decimal import Decimal
+from typing import Any, Dict, Iterable, List, Mapping
+
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - opsiyonel bağımlılık
+    orjson = None
+
+# main.Property alanları, yanıttaki sırasıyla
+PROPERTY_FIELDS = (
+    'id', 'title', 'price', 'currency', 'city', 'district', 'neighborhood',
+    'square_meters', 'building_age', 'property_type', 'listing_date',
+    'listing_number', 'price_per_sqm', 'predicted_price',
+    'area_avg_price', 'price_trend', 'area_price_trend',
+    'investment_score', 'location_score', 'property_score', 'overall_score',
+    'agency_name', 'agent_name', 'agent_phone', 'image_url', 'listing_url',
+)
+
+
+def _default(value: Any):
+    if isinstance(value, Decimal):
+        return float(value)
+    raise TypeError(f"JSON'a çevrilemeyen tip: {type(value).__name__}")
+
+
+def _json_default(value: Any):
+    if isinstance(value, Decimal):
+        return float(value)
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    raise TypeError(f"JSON'a çevrilemeyen tip: {type(value).__name__}")
+
+
+def dumps(content: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(content, default=_default)
+    return json.dumps(content, default=_json_default, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def _loads(value: str):
+    return orjson.loads(value) if orjson is not None else json.loads(value)
+
+
+def _dumps_text(value: Any) -> str:
+    return dumps(value).decode('utf-8')
+
+
+async def init_connection(connection):
+    """Havuzdaki her yeni bağlantıda JSON kolonları için codec kaydet"""
+    for type_name in ('jsonb', 'json'):
+        await connection.set_type_codec(
+            type_name, encoder=_dumps_text, decoder=_loads, schema='pg_catalog'
+        )
+
+
+class FastJSONResponse(JSONResponse):
+    """orjson ile yazılan JSON yanıtı"""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def property_row(record: Mapping) -> Dict[str, Any]:
+    """Veritabanı satırını ``Property`` yanıt sözlüğüne çevir"""
+    row = {field: record[field] for field in PROPERTY_FIELDS}
+    if row['listing_date'] is None:
+        row['listing_date'] = ''
+    phone = row['agent_phone']
+    if isinstance(phone, str):
+        # Codec kaydedilmemiş bir bağlantıdan gelen satır
+        try:
+            phone = _loads(phone)
+        except ValueError:
+            phone = None
+    row['agent_phone'] = phone if isinstance(phone, list) else []
+    return row
+
+
+def property_rows(records: Iterable[Mapping]) -> List[Dict[str, Any]]:
+    return [property_row(record) for record in records]
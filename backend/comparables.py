@@ -0,0 +1,292 @@
+"""Değerleme için bellek içi emsal indeksi.
+
+Her (şehir, ilçe) için son ``COMPARABLE_WINDOW_MONTHS`` ayın ilanları kolon
+dizileri olarak tutulur (metrekare, bina yaşı, mahalle kimliği, emlak tipi
+kimliği, ilan tarihi). Benzerlik skoru eski SQL sorgusundaki bantların
+aynısıdır ve NumPy ile bütün ilçe için tek seferde hesaplanır; en iyi k
+ilan ``argpartition`` ile seçilir:
+
+- metrekare farkı ≤10/20/30/40 → 40/30/20/10 puan
+- bina yaşı farkı ≤2/5/10 → 30/20/10 puan
+- aynı mahalle 20, aynı emlak tipi 10 puan
+
+İndeks ilk değerleme isteğinde ilçe bazında yüklenir. Kayıt sonrasında
+dokunulan ilanların kimlikleri bekleyen listeye alınır ve bir sonraki
+sorguda sadece o satırlar veritabanından okunup dizilere işlenir. Başka
+süreçlerin yazdıkları ``COMPARABLES_INDEX_TTL`` saniyede bir yapılan tam
+yenilemeyle gelir; bu yenileme pencereden çıkan ilanları da temizler.
+"""
+import asyncio
+import calendar
+import logging
+import os
+import time
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+from databases import Database
+from dotenv import load_dotenv
+
+from ingest import IngestResult
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+COMPARABLE_WINDOW_MONTHS = int(os.getenv("COMPARABLE_WINDOW_MONTHS", "6"))
+COMPARABLES_INDEX_TTL = float(os.getenv("COMPARABLES_INDEX_TTL", "600"))
+MIN_SIMILARITY_SCORE = 50
+
+# Bantlar kuruş/santimetrekare hassasiyetinde tam sayılarla karşılaştırılır;
+# sınırda kalan değerler SQL'deki DECIMAL karşılaştırmasıyla aynı sonucu verir
+SQM_BANDS = np.array([1000, 2000, 3000, 4000], dtype=np.int64)
+SQM_POINTS = np.array([40, 30, 20, 10, 0], dtype=np.int16)
+AGE_BANDS = np.array([2, 5, 10], dtype=np.int32)
+AGE_POINTS = np.array([30, 20, 10, 0], dtype=np.int16)
+NEIGHBORHOOD_POINTS = 20
+PROPERTY_TYPE_POINTS = 10
+
+MISSING = -1
+UNKNOWN = -2
+
+# Toplu değerlemede skor matrisinin en fazla hücre sayısı
+SCORE_CHUNK_CELLS = 2_000_000
+
+PARTITION_QUERY = """
+    SELECT id, square_meters, building_age, neighborhood, property_type, created_at, price
+    FROM properties
+    WHERE city = $1 AND district = $2
+      AND created_at >= NOW() - make_interval(months => $3)
+"""
+
+DELTA_QUERY = """
+    SELECT id, square_meters, building_age, neighborhood, property_type, created_at, price
+    FROM properties
+    WHERE id = ANY($1::int[])
+"""
+
+ROWS_QUERY = "SELECT * FROM properties WHERE id = ANY($1::int[])"
+
+PartitionKey = Tuple[str, str]
+
+
+def months_ago(now: datetime, months: int) -> datetime:
+    """PostgreSQL'deki ``NOW() - INTERVAL 'n months'`` ile aynı (ay sonu kırpılır)"""
+    index = now.year * 12 + now.month - 1 - months
+    year, month = index // 12, index % 12 + 1
+    return now.replace(year=year, month=month, day=min(now.day, calendar.monthrange(year, month)[1]))
+
+
+def _centi(value) -> int:
+    return int(round(float(value) * 100)) if value is not None else 0
+
+
+class DistrictIndex:
+    """Bir ilçenin ilanları için kolon dizileri"""
+
+    def __init__(self):
+        self.ids = np.empty(0, dtype=np.int64)
+        self.square_meters = np.empty(0, dtype=np.int64)  # m² × 100
+        self.building_age = np.empty(0, dtype=np.int32)
+        self.neighborhood = np.empty(0, dtype=np.int32)
+        self.property_type = np.empty(0, dtype=np.int32)
+        self.created_at = np.empty(0, dtype=np.int64)  # epoch saniye
+        self.valid = np.empty(0, dtype=bool)  # price > 0 AND square_meters > 0
+        self.positions: Dict[int, int] = {}
+        self.neighborhood_ids: Dict[str, int] = {}
+        self.property_type_ids: Dict[str, int] = {}
+        self.pending: Set[int] = set()
+        self.loaded_at = 0.0
+        self.lock = asyncio.Lock()
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @staticmethod
+    def _code(vocabulary: Dict[str, int], value: Optional[str]) -> int:
+        if value is None:
+            return MISSING
+        return vocabulary.setdefault(value, len(vocabulary))
+
+    def _columns(self, records) -> Dict[str, np.ndarray]:
+        return {
+            'ids': np.fromiter((r['id'] for r in records), np.int64, len(records)),
+            'square_meters': np.fromiter((_centi(r['square_meters']) for r in records), np.int64, len(records)),
+            'building_age': np.fromiter(
+                (MISSING if r['building_age'] is None else r['building_age'] for r in records),
+                np.int32, len(records)),
+            'neighborhood': np.fromiter(
+                (self._code(self.neighborhood_ids, r['neighborhood']) for r in records),
+                np.int32, len(records)),
+            'property_type': np.fromiter(
+                (self._code(self.property_type_ids, r['property_type']) for r in records),
+                np.int32, len(records)),
+            'created_at': np.fromiter((int(r['created_at'].timestamp()) for r in records), np.int64, len(records)),
+            'valid': np.fromiter(
+                ((r['price'] or 0) > 0 and (r['square_meters'] or 0) > 0 for r in records),
+                bool, len(records)),
+        }
+
+    def load(self, records):
+        """Diziyi sıfırdan kur (tam yenileme)"""
+        self.neighborhood_ids.clear()
+        self.property_type_ids.clear()
+        for name, values in self._columns(records).items():
+            setattr(self, name, values)
+        self.positions = {int(row_id): i for i, row_id in enumerate(self.ids)}
+        self.pending.clear()
+        self.loaded_at = time.monotonic()
+
+    def apply(self, records):
+        """Değişen ilanları yerinde güncelle, yenileri sona ekle"""
+        if not records:
+            return
+        columns = self._columns(records)
+        existing = [(i, self.positions[int(row_id)]) for i, row_id in enumerate(columns['ids'])
+                    if int(row_id) in self.positions]
+        if existing:
+            source, target = (np.array(side, dtype=np.int64) for side in zip(*existing))
+            for name, values in columns.items():
+                getattr(self, name)[target] = values[source]
+        new = np.array([i for i, row_id in enumerate(columns['ids'])
+                        if int(row_id) not in self.positions], dtype=np.int64)
+        if len(new):
+            start = len(self.ids)
+            for name, values in columns.items():
+                setattr(self, name, np.concatenate([getattr(self, name), values[new]]))
+            for offset, row_id in enumerate(columns['ids'][new]):
+                self.positions[int(row_id)] = start + offset
+
+    @staticmethod
+    def _lookup(vocabulary: Dict[str, int], values) -> np.ndarray:
+        # Sözlükte olmayan değerler hiçbir satırla eşleşmez
+        return np.array([vocabulary.get(value, UNKNOWN) for value in values], dtype=np.int32)
+
+    def scores(self, square_meters: np.ndarray, building_age: np.ndarray,
+               neighborhood: np.ndarray, property_type: np.ndarray) -> np.ndarray:
+        """İstek × ilan benzerlik skoru matrisi (istek başına bir satır)"""
+        sqm_diff = np.abs(self.square_meters[None, :] - square_meters[:, None])
+        score = SQM_POINTS[np.searchsorted(SQM_BANDS, sqm_diff, side='left')]
+        age_diff = np.abs(self.building_age[None, :] - building_age[:, None])
+        age_score = AGE_POINTS[np.searchsorted(AGE_BANDS, age_diff, side='left')]
+        age_known = (self.building_age[None, :] != MISSING) & (building_age[:, None] != MISSING)
+        score = score + np.where(age_known, age_score, 0)
+        score = score + np.where(self.neighborhood[None, :] == neighborhood[:, None], NEIGHBORHOOD_POINTS, 0)
+        score = score + np.where(self.property_type[None, :] == property_type[:, None], PROPERTY_TYPE_POINTS, 0)
+        return score
+
+    def top_k_many(self, queries: List[Dict], k: int, since: int) -> List[List[Tuple[int, int]]]:
+        """Her istek için skoru ``MIN_SIMILARITY_SCORE`` ve üzeri en iyi k ilan: (id, skor).
+
+        İstekler, skor matrisi ``SCORE_CHUNK_CELLS`` hücreyi geçmeyecek
+        parçalar halinde tek seferde puanlanır.
+        """
+        if not len(self.ids):
+            return [[] for _ in queries]
+        square_meters = np.array([_centi(q['square_meters']) for q in queries], dtype=np.int64)
+        building_age = np.array(
+            [MISSING if q['building_age'] is None else q['building_age'] for q in queries], dtype=np.int32)
+        neighborhood = self._lookup(self.neighborhood_ids, [q['neighborhood'] for q in queries])
+        property_type = self._lookup(self.property_type_ids, [q['property_type'] for q in queries])
+        eligible = self.valid & (self.created_at >= since)
+
+        results = []
+        chunk = max(1, SCORE_CHUNK_CELLS // len(self.ids))
+        for start in range(0, len(queries), chunk):
+            rows = slice(start, start + chunk)
+            score = self.scores(square_meters[rows], building_age[rows], neighborhood[rows], property_type[rows])
+            # Sıralama: skor azalan, sonra ilan tarihi azalan; aday olmayanlar -1
+            key = np.where(
+                eligible[None, :] & (score >= MIN_SIMILARITY_SCORE),
+                score.astype(np.int64) * (1 << 40) + self.created_at[None, :],
+                -1
+            )
+            if key.shape[1] > k:
+                best = np.argpartition(-key, k - 1, axis=1)[:, :k]
+            else:
+                best = np.broadcast_to(np.arange(key.shape[1]), key.shape)
+            best_keys = np.take_along_axis(key, best, axis=1)
+            order = np.argsort(-best_keys, axis=1, kind='stable')
+            best = np.take_along_axis(best, order, axis=1)
+            best_keys = np.take_along_axis(best_keys, order, axis=1)
+            for row_best, row_keys, row_score in zip(best, best_keys, score):
+                results.append([
+                    (int(self.ids[i]), int(row_score[i]))
+                    for i, row_key in zip(row_best, row_keys) if row_key >= 0
+                ])
+        return results
+
+    def top_k(self, square_meters: float, building_age: Optional[int], neighborhood: str,
+              property_type: str, k: int, since: int) -> List[Tuple[int, int]]:
+        query = {'square_meters': square_meters, 'building_age': building_age,
+                 'neighborhood': neighborhood, 'property_type': property_type}
+        return self.top_k_many([query], k, since)[0]
+
+
+class ComparablesIndex:
+    """(şehir, ilçe) bölümlerine ayrılmış emsal indeksi"""
+
+    def __init__(self, window_months: int = COMPARABLE_WINDOW_MONTHS, ttl: float = COMPARABLES_INDEX_TTL):
+        self.window_months = window_months
+        self.ttl = ttl
+        self.partitions: Dict[PartitionKey, DistrictIndex] = {}
+
+    def track(self, result: IngestResult):
+        """Kayıt dinleyicisi: yüklü ilçelerdeki dokunulan ilanları işaretle"""
+        for row in result.rows:
+            partition = self.partitions.get((row['city'], row['district']))
+            if partition is not None:
+                partition.pending.add(row['id'])
+
+    def since(self) -> int:
+        """Emsal penceresinin başlangıcı (epoch saniye)"""
+        return int(months_ago(datetime.now(timezone.utc), self.window_months).timestamp())
+
+    async def partition(self, db: Database, city: str, district: str) -> DistrictIndex:
+        """İlçenin indeksini gerekirse yükle veya bekleyen değişiklikleri işle"""
+        partition = self.partitions.setdefault((city, district), DistrictIndex())
+        async with partition.lock:
+            if time.monotonic() - partition.loaded_at > self.ttl:
+                async with db.connection() as connection:
+                    records = await connection.raw_connection.fetch(
+                        PARTITION_QUERY, city, district, self.window_months
+                    )
+                partition.load(records)
+                logger.info(f"Emsal indeksi yüklendi: {city}/{district} ({len(partition)} ilan)")
+            elif partition.pending:
+                ids, partition.pending = list(partition.pending), set()
+                async with db.connection() as connection:
+                    records = await connection.raw_connection.fetch(DELTA_QUERY, ids)
+                partition.apply(records)
+        return partition
+
+    @staticmethod
+    async def fetch_rows(db: Database, ids: Iterable[int]) -> Dict[int, Dict]:
+        """Seçilen emsallerin tam satırları (birincil anahtarla)"""
+        if not ids:
+            return {}
+        async with db.connection() as connection:
+            records = await connection.raw_connection.fetch(ROWS_QUERY, list(ids))
+        return {record['id']: dict(record) for record in records}
+
+    @staticmethod
+    def rows_for(best: List[Tuple[int, int]], rows: Dict[int, Dict]) -> List[Dict]:
+        return [
+            {**rows[row_id], 'similarity_score': score}
+            for row_id, score in best if row_id in rows
+        ]
+
+    async def find(self, db: Database, city: str, district: str, neighborhood: str,
+                   square_meters: float, building_age: Optional[int], property_type: str,
+                   k: int = 10) -> List[Dict]:
+        """En benzer k ilanın tam satırlarını skor sırasıyla döndür"""
+        partition = await self.partition(db, city, district)
+        best = partition.top_k(square_meters, building_age, neighborhood, property_type,
+                               k, self.since())
+        rows = await self.fetch_rows(db, [row_id for row_id, _ in best])
+        return self.rows_for(best, rows)
+
+
+# API sürecinde paylaşılan indeks
+comparables_index = ComparablesIndex()
@@ -0,0 +1,288 @@
+"""Birden fazla tarayıcı ile paralel sayfa taraması.
+
+İlk sayfadan toplam sayfa sayısı okunur, kalan ``?page=N`` adresleri bir
+WebDriver havuzuna dağıtılır. İşçiler parse edilen ilanları sınırlı bir
+kuyruğa koyar; kuyruğu tek bir yazıcı tüketir ve ilanları partiler halinde
+veritabanına yazar. Aynı ilan numarası tarama boyunca başarıyla yalnızca
+bir kez yazılır, sayfaların hangi sırayla bittiğinin önemi yoktur. Kaldığı yer
+bilgisi, kesintisiz yazılmış son sayfaya göre güncellenir.
+
+Kullanım:
+    python crawler.py https://www.hepsiemlak.com/istanbul-satilik [--workers 4]
+"""
+import argparse
+import asyncio
+import logging
+import os
+from typing import Dict, List, Optional, Set, Tuple
+
+from databases import Database
+
+from area_statistics import AreaStatisticsRefresher
+from checkpoints import CrawlCheckpoints
+from http_fetcher import HTTP_FETCH_CONCURRENCY, SCRAPER_FETCH_MODE, HostLimiter, HttpFetcher
+from ingest import IngestResult, ingest_listings
+from metrics import StageMetrics, activate, deactivate, emit_report
+from page_archive import PAGE_ARCHIVE_ENABLED, PageArchive
+from db import database
+from scraper import CRAWL_RESUME, CrawlProgress, HepsiEmlakScraper, SCRAPER_LIST_ONLY, build_page_url
+
+logger = logging.getLogger(__name__)
+
+CRAWL_WORKERS = int(os.getenv("CRAWL_WORKERS", "3"))
+# Aynı siteye aynı anda açık olabilecek en fazla sayfa yüklemesi
+CRAWL_MAX_PER_HOST = int(os.getenv("CRAWL_MAX_PER_HOST", "2"))
+# İşçilerle yazıcı arasındaki kuyruğun kapasitesi (sayfa)
+CRAWL_QUEUE_SIZE = int(os.getenv("CRAWL_QUEUE_SIZE", "8"))
+# Yazıcının tek seferde veritabanına göndereceği en fazla ilan
+CRAWL_WRITE_BATCH = int(os.getenv("CRAWL_WRITE_BATCH", "200"))
+
+
+class ParallelCrawler:
+    """Sayfaları bir WebDriver havuzu ile paralel olarak tara"""
+
+    def __init__(self, workers: int = CRAWL_WORKERS, max_per_host: int = CRAWL_MAX_PER_HOST,
+                 queue_size: int = CRAWL_QUEUE_SIZE, write_batch: int = CRAWL_WRITE_BATCH,
+                 list_only: bool = SCRAPER_LIST_ONLY, db: Optional[Database] = None,
+                 fetch_mode: str = SCRAPER_FETCH_MODE):
+        self.workers = max(1, workers)
+        self.limiter = HostLimiter(max_per_host)
+        self.queue_size = queue_size
+        self.write_batch = write_batch
+        self.list_only = list_only
+        self.db = db or database
+        self.fetch_mode = fetch_mode
+        self.http: Optional[HttpFetcher] = None
+        self.archive = PageArchive() if PAGE_ARCHIVE_ENABLED else None
+        self.area_stats = AreaStatisticsRefresher(self.db)
+        self.checkpoints = CrawlCheckpoints(self.db)
+
+        self.progress = CrawlProgress()
+        # Bütün tarayıcıların aşama süreleri tek raporda toplanır
+        self.metrics = StageMetrics()
+        self.result = IngestResult()
+        # Bu taramada yazılmış ilanların anahtarları
+        self._seen: Set[str] = set()
+        self._base_url: Optional[str] = None
+        # Yazılmış sayfalar; kaldığı yer sadece boşluksuz ilerleyen kısma göre kaydedilir
+        self._written_pages: Dict[int, Optional[str]] = {}
+        self._checkpoint_page = 0
+        # Taranamayan sayfalar; biri bile varsa tarama tamamlanmış sayılmaz
+        self._failed_pages: Set[int] = set()
+
+    async def _start_scraper(self) -> HepsiEmlakScraper:
+        # WebDriver başlatmak bloklayan bir işlem
+        return await asyncio.to_thread(
+            HepsiEmlakScraper, self.list_only, db=self.db, http=self.http,
+            fetch_mode=self.fetch_mode, archive=self.archive, metrics=self.metrics,
+            limiter=self.limiter
+        )
+
+    async def _scrape(self, scraper: HepsiEmlakScraper, page: int, url: str) -> Tuple[Optional[List[Dict]], Optional[str]]:
+        """Sayfayı tara; (ilanlar, içerik özeti) döndür. Sayfa taranamadıysa
+        ilanlar None olur: hata veya sonuçların bittiğini göstermeyen boş sayfa
+        (ör. zaman aşımı). Değişmemiş sayfalar boş liste döner."""
+        try:
+            listings = await scraper.scrape_page(url)
+        except Exception as e:
+            logger.error(f"Sayfa {page} taranırken hata: {str(e)}")
+            self.progress.add_page(0)
+            return None, None
+        if not listings and not scraper.page_unchanged and not scraper.page_end:
+            logger.warning(f"Sayfa {page} boş döndü, taranamamış sayılıyor")
+            self.progress.add_page(0)
+            return None, None
+        self.progress.add_page(len(listings), unchanged=scraper.page_unchanged)
+        return listings, scraper.page_digest
+
+    async def _page_worker(self, pool: asyncio.Queue, write_queue: asyncio.Queue, page: int, url: str):
+        scraper = await pool.get()
+        try:
+            listings, digest = await self._scrape(scraper, page, url)
+        finally:
+            pool.put_nowait(scraper)
+
+        if listings is not None:
+            logger.info(f"Sayfa {page}: {len(listings)} ilan")
+        await write_queue.put((page, url, listings, digest))
+
+    def _dedupe(self, listings: List[Dict], pending: Set[str]) -> List[Dict]:
+        """Bu taramada yazılmış veya yazılmayı bekleyen partide olan ilanları çıkar.
+
+        Anahtarlar ``pending``e eklenir; ``_seen``e ancak parti yazıldıktan
+        sonra geçer, yazılamayan ilanlar sonraki sayfalarda yeniden denenir.
+        """
+        fresh = []
+        for listing in listings:
+            key = listing.get('listing_number') or listing.get('listing_url')
+            if key and (key in self._seen or key in pending):
+                continue
+            if key:
+                pending.add(key)
+            fresh.append(listing)
+        return fresh
+
+    async def _write(self, batch: List[Dict]) -> bool:
+        """Partiyi kaydet; sayfalar yazılmış sayılabiliyorsa True döndür"""
+        if not batch:
+            return True
+        try:
+            with self.metrics.timer('db_save'):
+                result = await ingest_listings(self.db, batch)
+        except Exception as e:
+            logger.error(f"İlanlar kaydedilirken hata: {str(e)}")
+            return False
+        self.area_stats.track(result)
+        result.rows = []
+        self.result.merge(result)
+        self.progress.add_saved(result.saved)
+        # Hiçbir ilan kaydedilemediyse sayfalar yazılmış sayılmaz
+        return result.saved > 0
+
+    async def _mark_written(self, pages: Dict[int, Optional[str]]):
+        """Yazılan sayfaları kaydet ve kaldığı yeri boşluksuz kısma kadar ilerlet"""
+        self._written_pages.update(pages)
+        last_page = self._checkpoint_page
+        while last_page + 1 in self._written_pages:
+            last_page += 1
+        if last_page > self._checkpoint_page:
+            self._checkpoint_page = last_page
+            await self.checkpoints.save(self._base_url, last_page, self._written_pages[last_page])
+
+    async def _mark_processed(self, processed: List[Tuple[str, str]]):
+        """Kaydedilen sayfaların içerik özetlerini arşive yaz; aynı içerik sonraki
+        taramalarda atlanır"""
+        if self.archive is None:
+            return
+        for url, digest in processed:
+            try:
+                await asyncio.to_thread(self.archive.mark_processed, url, digest)
+            except OSError as e:
+                logger.error(f"Sayfa arşiv kaydı güncellenirken hata: {str(e)}")
+
+    async def _writer(self, write_queue: asyncio.Queue):
+        """Kuyruktaki ilanları partiler halinde tek bağlantıdan yaz"""
+        batch: List[Dict] = []
+        pages: Dict[int, Optional[str]] = {}
+        processed: List[Tuple[str, str]] = []
+        keys: Set[str] = set()
+        while True:
+            item = await write_queue.get()
+            if item is None:
+                break
+            page, url, listings, digest = item
+            if listings is None:
+                # Taranamayan sayfa yazılmış sayılmaz; kaldığı yer bu sayfanın
+                # önünde kalır ve tarama tamamlanmış işaretlenmez
+                self._failed_pages.add(page)
+            else:
+                batch.extend(self._dedupe(listings, keys))
+                pages[page] = listings[-1].get('listing_number') if listings else None
+                if listings and digest:
+                    processed.append((url, digest))
+            # Kuyrukta bekleyen başka sayfa yoksa veya parti dolduysa yaz
+            if len(batch) >= self.write_batch or write_queue.empty():
+                if await self._write(batch):
+                    self._seen |= keys
+                    await self._mark_written(pages)
+                    await self._mark_processed(processed)
+                batch, pages, processed, keys = [], {}, [], set()
+        if pages and await self._write(batch):
+            self._seen |= keys
+            await self._mark_written(pages)
+            await self._mark_processed(processed)
+        await self.area_stats.flush()
+
+    async def crawl(self, base_url: str, resume: bool = CRAWL_RESUME) -> Dict:
+        """Bütün sayfaları tara ve özet istatistikleri döndür"""
+        metrics_token = activate(self.metrics)
+        owns_connection = not self.db.is_connected
+        if owns_connection:
+            await self.db.connect()
+
+        self._base_url = base_url
+        start_page = await self.checkpoints.start(base_url, resume)
+        self._checkpoint_page = start_page - 1
+
+        write_queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        pool: asyncio.Queue = asyncio.Queue()
+        scrapers: List[HepsiEmlakScraper] = []
+        writer = asyncio.create_task(self._writer(write_queue))
+        if self.fetch_mode == 'http':
+            # Bütün işçiler bağlantıları yeniden kullanan tek bir HTTP oturumunu paylaşır
+            self.http = HttpFetcher(concurrency=max(self.workers, HTTP_FETCH_CONCURRENCY))
+
+        completed = False
+        try:
+            # İlk sayfa toplam sayfa sayısını öğrenmek için tek başına taranır
+            first = await self._start_scraper()
+            scrapers.append(first)
+            first_url = build_page_url(base_url, start_page)
+            listings, digest = await self._scrape(first, start_page, first_url)
+            await write_queue.put((start_page, first_url, listings, digest))
+
+            last_page = first.last_page or start_page
+            logger.info(f"Toplam sayfa: {last_page}, işçi sayısı: {self.workers}")
+
+            if last_page > start_page:
+                extra = min(self.workers, last_page - start_page) - 1
+                if extra > 0:
+                    scrapers.extend(await asyncio.gather(*(self._start_scraper() for _ in range(extra))))
+                for scraper in scrapers:
+                    pool.put_nowait(scraper)
+
+                await asyncio.gather(*(
+                    self._page_worker(pool, write_queue, page, build_page_url(base_url, page))
+                    for page in range(start_page + 1, last_page + 1)
+                ))
+            completed = True
+        finally:
+            await write_queue.put(None)
+            await writer
+            if completed and not self._failed_pages and self._checkpoint_page >= last_page:
+                await self.checkpoints.complete(base_url)
+            await asyncio.gather(
+                *(asyncio.to_thread(scraper.close) for scraper in scrapers),
+                return_exceptions=True
+            )
+            if self.http is not None:
+                await self.http.close()
+            if owns_connection:
+                await self.db.disconnect()
+            deactivate(metrics_token)
+
+        self.progress.finish()
+        summary = {
+            **self.progress.snapshot(),
+            'inserted': self.result.inserted,
+            'updated': self.result.updated,
+            'unchanged': self.result.unchanged,
+            'skipped': self.result.skipped,
+        'failed_pages': len(self._failed_pages),
+        }
+        logger.info(f"Paralel tarama tamamlandı: {summary}")
+        emit_report(self.metrics, 'parallel_crawl', base_url=base_url, workers=self.workers, **summary)
+        return summary
+
+
+async def main(base_url: str, workers: int, max_per_host: int, list_only: Optional[bool], resume: bool):
+    crawler = ParallelCrawler(
+        workers=workers,
+        max_per_host=max_per_host,
+        list_only=SCRAPER_LIST_ONLY if list_only is None else list_only,
+    )
+    await crawler.crawl(base_url, resume=resume)
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description="Paralel ilan taraması")
+    arg_parser.add_argument('url', help="Taranacak arama sonucu adresi")
+    arg_parser.add_argument('--workers', type=int, default=CRAWL_WORKERS)
+    arg_parser.add_argument('--max-per-host', type=int, default=CRAWL_MAX_PER_HOST)
+    arg_parser.add_argument('--list-only', action='store_true', default=None,
+                            help="Telefon açma adımını atla")
+    arg_parser.add_argument('--no-resume', dest='resume', action='store_false', default=CRAWL_RESUME,
+                            help="Yarım kalan taramayı yok sayıp ilk sayfadan başla")
+    args = arg_parser.parse_args()
+
+    asyncio.run(main(args.url, args.workers, args.max_per_host, args.list_only, args.resume))
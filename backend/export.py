@@ -0,0 +1,175 @@
+"""İlanların toplu dışa aktarımı (``GET /properties/export``).
+
+Satırlar sunucu tarafı bir imleçten ``EXPORT_FETCH_SIZE``'lık partiler
+halinde okunur ve her parti okunur okunmaz yazılır; bellekte hiçbir zaman
+bir partiden fazla satır tutulmaz.
+
+- ``ndjson`` ve ``csv`` doğrudan yanıt gövdesine akar, ilk parti hazır
+  olduğunda istemci veri almaya başlar.
+- ``parquet`` biçimi sonu dosyada olan bir biçim olduğundan partiler geçici
+  bir dosyaya satır grubu olarak yazılır ve dosya indirme olarak döner.
+  ``pyarrow`` kurulu değilse bu biçim kullanılamaz.
+"""
+import csv
+import io
+import logging
+import os
+import tempfile
+from typing import AsyncIterator, Dict, List
+
+from databases import Database
+from dotenv import load_dotenv
+
+from codec import PROPERTY_FIELDS, dumps, property_rows
+from property_query import Filter, positional_conditions
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover - opsiyonel bağımlılık
+    pa = pq = None
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+EXPORT_FETCH_SIZE = int(os.getenv("EXPORT_FETCH_SIZE", "2000"))
+
+EXPORT_FORMATS = ('ndjson', 'csv', 'parquet')
+
+MEDIA_TYPES = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv; charset=utf-8',
+    'parquet': 'application/vnd.apache.parquet',
+}
+
+# Sayısal kolonlar düz float olarak okunur; Decimal dönüşümü gerekmez
+EXPORT_QUERY = """
+    SELECT
+        id, title, price::float8 AS price, currency, city, district, neighborhood,
+        square_meters::float8 AS square_meters, building_age, property_type,
+        COALESCE(listing_date, '') AS listing_date,
+        listing_number, price_per_sqm::float8 AS price_per_sqm,
+        predicted_price::float8 AS predicted_price,
+        area_avg_price::float8 AS area_avg_price,
+        price_trend::float8 AS price_trend,
+        area_price_trend::float8 AS area_price_trend,
+        investment_score, location_score, property_score,
+        overall_score, agency_name, agent_name,
+        agent_phone, image_url, listing_url
+    FROM properties
+    WHERE 1=1{conditions}
+    ORDER BY id
+"""
+
+
+class ExportUnavailable(Exception):
+    pass
+
+
+def parquet_available() -> bool:
+    return pq is not None
+
+
+async def fetch_batches(db: Database, filters: List[Filter],
+                        fetch_size: int = EXPORT_FETCH_SIZE) -> AsyncIterator[List[Dict]]:
+    """Filtreye uyan ilanları imleçle partiler halinde üret"""
+    conditions, args = positional_conditions(filters)
+    query = EXPORT_QUERY.format(conditions=conditions)
+    async with db.connection() as connection:
+        # Sunucu tarafı imleçler bir transaction içinde yaşar
+        async with connection.transaction():
+            cursor = await connection.raw_connection.cursor(query, *args)
+            while True:
+                records = await cursor.fetch(fetch_size)
+                if not records:
+                    break
+                yield property_rows(records)
+
+
+async def stream_ndjson(db: Database, filters: List[Filter]) -> AsyncIterator[bytes]:
+    exported = 0
+    try:
+        async for rows in fetch_batches(db, filters):
+            exported += len(rows)
+            yield b''.join(dumps(row) + b'\n' for row in rows)
+    except Exception as e:
+        # Yanıt başlığı gönderildikten sonra durum kodu değiştirilemez
+        logger.error(f"NDJSON dışa aktarımı yarıda kesildi ({exported} satır): {str(e)}")
+        raise
+    logger.info(f"NDJSON dışa aktarımı tamamlandı: {exported} satır")
+
+
+def _csv_value(field: str, value):
+    if field == 'agent_phone':
+        return ', '.join(value)
+    return '' if value is None else value
+
+
+async def stream_csv(db: Database, filters: List[Filter]) -> AsyncIterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(PROPERTY_FIELDS)
+    yield buffer.getvalue().encode('utf-8')
+
+    exported = 0
+    try:
+        async for rows in fetch_batches(db, filters):
+            buffer.seek(0)
+            buffer.truncate()
+            writer.writerows(
+                [_csv_value(field, row[field]) for field in PROPERTY_FIELDS] for row in rows
+            )
+            exported += len(rows)
+            yield buffer.getvalue().encode('utf-8')
+    except Exception as e:
+        logger.error(f"CSV dışa aktarımı yarıda kesildi ({exported} satır): {str(e)}")
+        raise
+    logger.info(f"CSV dışa aktarımı tamamlandı: {exported} satır")
+
+
+def _parquet_schema():
+    string_fields = {
+        'title', 'currency', 'city', 'district', 'neighborhood', 'property_type',
+        'listing_date', 'listing_number', 'agency_name', 'agent_name',
+        'image_url', 'listing_url',
+    }
+    float_fields = {
+        'price', 'square_meters', 'price_per_sqm', 'predicted_price',
+        'area_avg_price', 'price_trend', 'area_price_trend',
+    }
+    columns = []
+    for field in PROPERTY_FIELDS:
+        if field == 'id':
+            column_type = pa.int64()
+        elif field == 'agent_phone':
+            column_type = pa.list_(pa.string())
+        elif field in string_fields:
+            column_type = pa.string()
+        elif field in float_fields:
+            column_type = pa.float64()
+        else:
+            column_type = pa.int32()
+        columns.append(pa.field(field, column_type))
+    return pa.schema(columns)
+
+
+async def write_parquet(db: Database, filters: List[Filter]) -> str:
+    """İlanları geçici bir Parquet dosyasına yaz, dosya yolunu döndür"""
+    if not parquet_available():
+        raise ExportUnavailable("Parquet dışa aktarımı için pyarrow kurulu olmalı")
+
+    schema = _parquet_schema()
+    handle, path = tempfile.mkstemp(prefix='properties_', suffix='.parquet')
+    os.close(handle)
+    exported = 0
+    try:
+        with pq.ParquetWriter(path, schema) as writer:
+            async for rows in fetch_batches(db, filters):
+                writer.write_table(pa.Table.from_pylist(rows, schema=schema))
+                exported += len(rows)
+    except Exception:
+        os.remove(path)
+        raise
+    logger.info(f"Parquet dışa aktarımı hazır: {exported} satır")
+    return path
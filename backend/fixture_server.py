@@ -0,0 +1,89 @@
+"""Kaydedilmiş sonuç sayfalarını yerel olarak sunan basit HTTP sunucusu.
+
+Scraper'ı gerçek siteye gitmeden denemek için kullanılır. ``?page=N``
+isteği dizindeki ``page_N.html`` (veya ``page_N.html.gz``) dosyasına
+eşlenir; sayfa parametresi yoksa ``page_1.html`` döner. Olmayan sayfalar
+için "sonuç yok" sayfası döndürülür.
+
+Kullanım:
+    python fixture_server.py sayfalar/ [--port 8765] [--delay 0.2]
+"""
+import argparse
+import gzip
+import logging
+import time
+from functools import partial
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Optional
+from urllib.parse import parse_qs, urlparse
+
+logger = logging.getLogger(__name__)
+
+NO_RESULT_PAGE = '<html><body><div class="no-result-wrapper">Sonuç bulunamadı</div></body></html>'.encode('utf-8')
+
+
+def load_fixture(directory: Path, page: int) -> Optional[bytes]:
+    """Sayfa numarasına karşılık gelen kayıtlı HTML'i oku"""
+    path = directory / f'page_{page}.html'
+    if path.exists():
+        return path.read_bytes()
+    gz_path = directory / f'page_{page}.html.gz'
+    if gz_path.exists():
+        return gzip.decompress(gz_path.read_bytes())
+    return None
+
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    def __init__(self, *args, directory: Path, delay: float, **kwargs):
+        self.fixture_directory = directory
+        self.delay = delay
+        super().__init__(*args, **kwargs)
+
+    def do_GET(self):
+        query = parse_qs(urlparse(self.path).query)
+        try:
+            page = int(query.get('page', ['1'])[0])
+        except ValueError:
+            page = 1
+
+        if self.delay:
+            time.sleep(self.delay)
+
+        body = load_fixture(self.fixture_directory, page) or NO_RESULT_PAGE
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        logger.info(f"{self.address_string()} {format % args}")
+
+
+def make_server(directory: Path, host: str = '127.0.0.1', port: int = 8765, delay: float = 0.0) -> ThreadingHTTPServer:
+    handler = partial(FixtureHandler, directory=directory, delay=delay)
+    return ThreadingHTTPServer((host, port), handler)
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Kayıtlı sonuç sayfaları için yerel sunucu")
+    arg_parser.add_argument('directory', type=Path, help="page_N.html dosyalarının bulunduğu dizin")
+    arg_parser.add_argument('--host', default='127.0.0.1')
+    arg_parser.add_argument('--port', type=int, default=8765)
+    arg_parser.add_argument('--delay', type=float, default=0.0, help="Her yanıttan önce beklenecek süre (sn)")
+    args = arg_parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    server = make_server(args.directory, args.host, args.port, args.delay)
+    logger.info(f"Fixture sunucusu: http://{args.host}:{args.port}/ ({args.directory})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""Sonuç sayfalarının tarayıcısız, doğrudan HTTP ile çekilmesi.
+
+İlan kartları çoğu zaman sunucu tarafında render edilmiş HTML'de bulunur;
+bu durumda sayfa başına Chrome açmaya gerek kalmaz. Tek bir aiohttp
+oturumu bağlantıları yeniden kullanır ve sayfalar eşzamanlı çekilebilir.
+"""
+import asyncio
+import logging
+import os
+import time
+from typing import Dict, Optional
+from urllib.parse import urlparse
+
+import aiohttp
+
+logger = logging.getLogger(__name__)
+
+# "http": önce HTTP, gerekirse tarayıcı; "browser": her sayfa tarayıcıyla
+SCRAPER_FETCH_MODE = os.getenv("SCRAPER_FETCH_MODE", "http")
+HTTP_FETCH_CONCURRENCY = int(os.getenv("HTTP_FETCH_CONCURRENCY", "4"))
+HTTP_FETCH_TIMEOUT = float(os.getenv("HTTP_FETCH_TIMEOUT", "15"))
+# Aynı host'a art arda iki HTTP isteği arasındaki en kısa süre (saniye)
+HTTP_POLITENESS_DELAY = float(os.getenv("HTTP_POLITENESS_DELAY", "0.5"))
+
+DEFAULT_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
+    'Accept-Language': 'tr-TR,tr;q=0.9,en;q=0.8',
+}
+
+
+class HostLimiter:
+    """Host başına eşzamanlı sayfa yüklemesi sınırı (HTTP veya tarayıcı)"""
+
+    def __init__(self, max_per_host: int):
+        self.max_per_host = max_per_host
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+
+    def for_url(self, url: str) -> asyncio.Semaphore:
+        host = urlparse(url).netloc
+        if host not in self._semaphores:
+            self._semaphores[host] = asyncio.Semaphore(self.max_per_host)
+        return self._semaphores[host]
+
+
+class HttpFetcher:
+    """Bağlantıları yeniden kullanan eşzamanlı sayfa indirici"""
+
+    def __init__(self, concurrency: int = HTTP_FETCH_CONCURRENCY, timeout: float = HTTP_FETCH_TIMEOUT,
+                 politeness_delay: float = HTTP_POLITENESS_DELAY):
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.politeness_delay = politeness_delay
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._host_locks: Dict[str, asyncio.Lock] = {}
+        self._last_request: Dict[str, float] = {}
+
+    async def start(self):
+        if self._session is None:
+            connector = aiohttp.TCPConnector(limit=self.concurrency, ttl_dns_cache=300)
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                headers=DEFAULT_HEADERS,
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+            )
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def __aenter__(self) -> 'HttpFetcher':
+        await self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+    async def _politeness_wait(self, url: str):
+        """Aynı host'a istekleri nezaket süresiyle aralıklandır"""
+        if not self.politeness_delay:
+            return
+        host = urlparse(url).netloc
+        lock = self._host_locks.setdefault(host, asyncio.Lock())
+        async with lock:
+            last = self._last_request.get(host)
+            if last is not None:
+                remaining = self.politeness_delay - (time.monotonic() - last)
+                if remaining > 0:
+                    await asyncio.sleep(remaining)
+            self._last_request[host] = time.monotonic()
+
+    async def fetch(self, url: str) -> Optional[str]:
+        """Sayfayı indir; hata veya 200 dışı yanıtta None döndür"""
+        await self.start()
+        await self._politeness_wait(url)
+        started = time.perf_counter()
+        try:
+            async with self._session.get(url) as response:
+                if response.status != 200:
+                    logger.warning(f"HTTP {response.status}: {url}")
+                    return None
+                html = await response.text()
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            logger.warning(f"HTTP isteği başarısız: {url}: {str(e)}")
+            return None
+        logger.info(f"HTTP ile çekildi: {url} ({(time.perf_counter() - started) * 1000:.0f} ms)")
+        return html
@@ -0,0 +1,94 @@
+"""JSONL veya CSV dosyalarındaki ilanları toplu olarak veritabanına aktar.
+
+Kullanım:
+    python import_listings.py ilanlar.jsonl diger.csv [--batch-size 1000]
+
+Satırlar scraper çıktısı biçiminde (``location``, ``price`` metni) ya da
+doğrudan ``city``/``district``/``neighborhood`` kolonlarıyla olabilir.
+"""
+import argparse
+import asyncio
+import csv
+import json
+import logging
+import time
+from pathlib import Path
+from typing import Dict, Iterator, List
+
+from dotenv import load_dotenv
+
+from area_statistics import AreaStatisticsRefresher
+from db import PooledDatabase
+from ingest import IngestResult, ingest_listings
+
+load_dotenv()
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def read_rows(path: Path) -> Iterator[Dict]:
+    """Dosyayı satır satır oku; belleğe tamamını almaz"""
+    with open(path, encoding='utf-8', newline='') as f:
+        if path.suffix == '.csv':
+            for row in csv.DictReader(f):
+                yield {key: (value if value != '' else None) for key, value in row.items()}
+        else:
+            for line in f:
+                line = line.strip()
+                if line:
+                    yield json.loads(line)
+
+
+def batched(rows: Iterator[Dict], size: int) -> Iterator[List[Dict]]:
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+async def import_files(paths: List[Path], batch_size: int) -> IngestResult:
+    database = PooledDatabase()
+    await database.connect()
+    area_stats = AreaStatisticsRefresher(database)
+    total = IngestResult()
+    started = time.perf_counter()
+    try:
+        for path in paths:
+            logger.info(f"Dosya aktarılıyor: {path}")
+            for batch in batched(read_rows(path), batch_size):
+                result = await ingest_listings(database, batch)
+                area_stats.track(result)
+                # Satır detayları büyük dosyalarda belleği şişirmesin
+                result.rows = []
+                total.merge(result)
+        # Her bölge aktarım sonunda bir kez güncellenir
+        await area_stats.flush()
+    finally:
+        await database.disconnect()
+
+    elapsed = time.perf_counter() - started
+    processed = total.saved + total.skipped
+    logger.info(
+        f"Aktarım tamamlandı: {total.inserted} yeni, {total.updated} güncellendi, "
+        f"{total.unchanged} değişmedi, {total.skipped} atlandı "
+        f"({processed / elapsed if elapsed else 0:.0f} satır/sn)"
+    )
+    return total
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="İlanları JSONL/CSV dosyalarından içe aktar")
+    arg_parser.add_argument('files', nargs='+', type=Path, help=".jsonl veya .csv dosyaları")
+    arg_parser.add_argument('--batch-size', type=int, default=1000, help="Tek seferde yazılacak satır sayısı")
+    args = arg_parser.parse_args()
+
+    asyncio.run(import_files(args.files, args.batch_size))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,400 @@
+"""İlanların toplu olarak veritabanına yazılması.
+
+Bir sayfa (veya dosya) dolusu ilan, geçici bir staging tablosuna COPY ile
+yüklenir ve tek bir ``INSERT ... ON CONFLICT`` ifadesiyle ``properties``
+tablosuna aktarılır. Fiyat geçmişi aynı ifade içinde, aynı transaction'da
+yazılır; geçmişe sadece yeni ilanlar ve fiyatı değişen ilanlar eklenir.
+"""
+import json
+import logging
+from typing import Callable, Dict, Iterable, List, Optional
+
+from databases import Database
+from pydantic import BaseModel
+
+from metrics import timed
+
+logger = logging.getLogger(__name__)
+
+# Staging tablosuna COPY ile yazılan kolonlar (sıra önemli)
+STAGING_COLUMNS = (
+    'seq', 'title', 'price', 'currency', 'city', 'district', 'neighborhood',
+    'square_meters', 'building_age', 'property_type', 'listing_number',
+    'agency_name', 'agency_logo_url', 'agency_url', 'agent_name',
+    'agent_phone', 'image_url', 'listing_url', 'price_per_sqm',
+)
+
+PROPERTY_COLUMNS = ', '.join(STAGING_COLUMNS[1:])
+
+# Yeni bir konum (şehir/ilçe/mahalle) eklendiğinde çağrılır, ör. API'nin
+# konum önbelleğini geçersiz kılmak için
+_location_listeners: List[Callable[[], None]] = []
+# Her kayıttan sonra sonuçla çağrılır, ör. emsal indeksini güncellemek için
+_ingest_listeners: List[Callable[['IngestResult'], None]] = []
+
+# agent_phone staging'e metin olarak yazılır; havuzdaki JSON codec'i COPY'ye
+# karışmaz ve jsonb'ye dönüşüm sunucuda yapılır
+BATCH_COLUMNS = ', '.join(
+    'agent_phone::jsonb AS agent_phone' if column == 'agent_phone' else column
+    for column in STAGING_COLUMNS
+)
+
+CREATE_STAGING_QUERY = """
+    CREATE TEMP TABLE IF NOT EXISTS properties_staging (
+        seq INTEGER,
+        title TEXT,
+        price DOUBLE PRECISION,
+        currency TEXT,
+        city TEXT,
+        district TEXT,
+        neighborhood TEXT,
+        square_meters DOUBLE PRECISION,
+        building_age INTEGER,
+        property_type TEXT,
+        listing_number TEXT,
+        agency_name TEXT,
+        agency_logo_url TEXT,
+        agency_url TEXT,
+        agent_name TEXT,
+        agent_phone TEXT,
+        image_url TEXT,
+        listing_url TEXT,
+        price_per_sqm DOUBLE PRECISION
+    ) ON COMMIT DELETE ROWS
+"""
+
+# Her kayıtta güncellenen kolonlar; ilanın diğer bilgileri ilk kayıttaki gibi kalır
+UPDATE_COLUMNS = ('price', 'price_per_sqm')
+# Yeniden parse (``refresh``) sırasında parse edilen bütün kolonlar güncellenir.
+# Arşivde telefon bilgisi olmadığından danışman kolonları her iki modda da
+# sadece telefon açıldıysa değişir.
+REFRESH_COLUMNS = tuple(
+    column for column in STAGING_COLUMNS[1:]
+    if column not in ('listing_number', 'agent_name', 'agent_phone')
+)
+
+
+def _upsert_query(update_columns) -> str:
+    """Aynı ilan numarası sayfada birden fazla geçerse en son görülen kazanır.
+    "prior" CTE'si ifadenin başındaki snapshot'ı gördüğü için eski değerleri verir."""
+    updates = ''.join(f"{column} = EXCLUDED.{column},\n            " for column in update_columns)
+    return f"""
+    WITH batch AS (
+        SELECT DISTINCT ON (listing_number) {BATCH_COLUMNS}
+        FROM properties_staging
+        ORDER BY listing_number, seq DESC
+    ),
+    prior AS (
+        SELECT p.listing_number, p.price, p.price_per_sqm, p.agent_name, p.agent_phone, p.building_age,
+            p.city, p.district, p.neighborhood
+        FROM properties p
+        JOIN batch b USING (listing_number)
+    ),
+    upserted AS (
+        INSERT INTO properties ({PROPERTY_COLUMNS}, agent_updated_at)
+        SELECT {PROPERTY_COLUMNS},
+            CASE WHEN agent_phone IS NOT NULL THEN CURRENT_TIMESTAMP END
+        FROM batch
+        ON CONFLICT (listing_number) DO UPDATE SET
+            {updates}-- Telefonu açılmayan ilanlarda kayıtlı danışman bilgisi korunur;
+            -- telefon yenilenince danışman adı da onunla birlikte yenilenir
+            agent_name = CASE
+                WHEN EXCLUDED.agent_phone IS NULL THEN properties.agent_name
+                ELSE COALESCE(EXCLUDED.agent_name, properties.agent_name)
+            END,
+            agent_phone = COALESCE(EXCLUDED.agent_phone, properties.agent_phone),
+            agent_updated_at = CASE
+                WHEN EXCLUDED.agent_phone IS NULL THEN properties.agent_updated_at
+                ELSE CURRENT_TIMESTAMP
+            END,
+            updated_at = CURRENT_TIMESTAMP
+        RETURNING id, listing_number, price, price_per_sqm, building_age,
+                  agent_name, agent_phone, city, district, neighborhood, created_at
+    ),
+    history AS (
+        -- Geçmişe sadece yeni ilanlar ve fiyatı değişenler yazılır
+        INSERT INTO price_history (property_id, price)
+        SELECT u.id, u.price
+        FROM upserted u
+        LEFT JOIN prior USING (listing_number)
+        WHERE prior.listing_number IS NULL OR prior.price IS DISTINCT FROM u.price
+    ),
+    new_locations AS (
+        -- Şehir/ilçe/mahalle açılır listeleri için konum hiyerarşisi
+        INSERT INTO locations (city, district, neighborhood)
+        SELECT DISTINCT city, COALESCE(district, ''), COALESCE(neighborhood, '')
+        FROM batch
+        WHERE city IS NOT NULL
+        ON CONFLICT DO NOTHING
+        RETURNING 1
+    )
+    SELECT
+        u.id, u.listing_number, u.city, u.district, u.neighborhood,
+        u.price_per_sqm, u.building_age,
+        date_trunc('month', u.created_at)::date AS created_month,
+        -- Yeni ilanların ve fiyat değişikliklerinin price_history'ye düştüğü ay
+        date_trunc('month', CURRENT_TIMESTAMP)::date AS observed_month,
+        prior.price_per_sqm AS prior_price_per_sqm,
+        prior.building_age AS prior_building_age,
+        prior.city AS prior_city,
+        prior.district AS prior_district,
+        prior.neighborhood AS prior_neighborhood,
+        prior.listing_number IS NULL AS inserted,
+        prior.listing_number IS NOT NULL AND prior.price IS DISTINCT FROM u.price AS price_changed,
+        -- Bölge istatistiklerini etkileyen kolonlardan biri değiştiyse "değişmedi" sayılmaz
+        prior.listing_number IS NOT NULL
+            AND prior.price IS NOT DISTINCT FROM u.price
+            AND prior.price_per_sqm IS NOT DISTINCT FROM u.price_per_sqm
+            AND prior.building_age IS NOT DISTINCT FROM u.building_age
+            AND prior.city IS NOT DISTINCT FROM u.city
+            AND prior.district IS NOT DISTINCT FROM u.district
+            AND prior.neighborhood IS NOT DISTINCT FROM u.neighborhood
+            AND prior.agent_name IS NOT DISTINCT FROM u.agent_name
+            AND prior.agent_phone IS NOT DISTINCT FROM u.agent_phone AS unchanged,
+        (SELECT COUNT(*) FROM new_locations) AS new_locations
+    FROM upserted u
+    LEFT JOIN prior USING (listing_number)
+"""
+
+
+UPSERT_QUERY = _upsert_query(UPDATE_COLUMNS)
+REFRESH_UPSERT_QUERY = _upsert_query(REFRESH_COLUMNS)
+
+
+KNOWN_LISTINGS_QUERY = """
+    SELECT
+        listing_url,
+        listing_number,
+        agent_updated_at >= NOW() - make_interval(days => $2) AS agent_fresh
+    FROM properties
+    WHERE listing_url = ANY($1::text[])
+"""
+
+
+class IngestResult(BaseModel):
+    inserted: int = 0
+    updated: int = 0
+    # Güncellenenlerden fiyatı değişenler (danışman bilgisi değişenler hariç)
+    price_changed: int = 0
+    unchanged: int = 0
+    skipped: int = 0
+    new_locations: int = 0
+    rows: List[Dict] = []
+
+    @property
+    def saved(self) -> int:
+        return self.inserted + self.updated + self.unchanged
+
+    def merge(self, other: 'IngestResult') -> 'IngestResult':
+        self.inserted += other.inserted
+        self.updated += other.updated
+        self.price_changed += other.price_changed
+        self.unchanged += other.unchanged
+        self.skipped += other.skipped
+        self.new_locations += other.new_locations
+        self.rows.extend(other.rows)
+        return self
+
+
+def parse_location(location: str) -> tuple:
+    """Konum bilgisini parçalara ayır"""
+    parts = location.split('/')
+    city = parts[0].strip() if len(parts) > 0 else None
+    district = parts[1].strip() if len(parts) > 1 else None
+    neighborhood = parts[2].replace('Mah.', '').strip() if len(parts) > 2 else None
+    return city, district, neighborhood
+
+
+def _parse_price(value) -> float:
+    if isinstance(value, (int, float)):
+        return float(value)
+    price_str = str(value or '0').replace('.', '').replace('TL', '').strip()
+    try:
+        return float(price_str)
+    except ValueError:
+        return 0
+
+
+def _parse_float(value) -> Optional[float]:
+    if value is None or value == '':
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _parse_building_age(value) -> Optional[int]:
+    if value is None or value == '':
+        return None
+    if isinstance(value, str):
+        if 'Sıfır' in value:
+            return 0
+        try:
+            return int(value.replace('Yaşında', '').strip())
+        except (ValueError, AttributeError):
+            return None
+    return int(value)
+
+
+def _parse_phones(value) -> List[str]:
+    if not value:
+        return []
+    if isinstance(value, str):
+        if value.startswith('['):
+            return json.loads(value)
+        return [phone.strip() for phone in value.split(',') if phone.strip()]
+    return list(value)
+
+
+def normalize_listing(listing: Dict) -> Optional[Dict]:
+    """Scraper çıktısını veya dosyadan okunan satırı properties kolonlarına çevir"""
+    listing_number = listing.get('listing_number')
+    if not listing_number:
+        logger.warning("İlan numarası bulunamadı, kayıt atlanıyor")
+        return None
+
+    if listing.get('location'):
+        city, district, neighborhood = parse_location(listing['location'])
+    else:
+        city = listing.get('city') or None
+        district = listing.get('district') or None
+        neighborhood = listing.get('neighborhood') or None
+
+    price = _parse_price(listing.get('price'))
+
+    # m² başına fiyat hesapla
+    square_meters = _parse_float(listing.get('square_meters'))
+    price_per_sqm = price / square_meters if price and square_meters else None
+
+    return {
+        'title': listing.get('title'),
+        'price': price,
+        'currency': listing.get('currency') or 'TL',
+        'city': city,
+        'district': district,
+        'neighborhood': neighborhood,
+        'square_meters': square_meters,
+        'building_age': _parse_building_age(listing.get('building_age')),
+        'property_type': listing.get('property_type'),
+        'listing_number': str(listing_number),
+        'agency_name': listing.get('agency_name'),
+        'agency_logo_url': listing.get('agency_logo_url'),
+        'agency_url': listing.get('agency_url'),
+        'agent_name': listing.get('agent_name'),
+        # Telefonu açılmamış ilanlarda NULL yazılır, kayıtlı numaralar ezilmez
+        'agent_phone': (
+            json.dumps(_parse_phones(listing['agent_phone']))
+            if 'agent_phone' in listing else None
+        ),
+        'image_url': listing.get('image_url'),
+        'listing_url': listing.get('listing_url'),
+        'price_per_sqm': price_per_sqm,
+    }
+
+
+async def lookup_known_listings(db: Database, listing_urls: List[str], ttl_days: int) -> Dict[str, Dict]:
+    """Sayfadaki ilan URL'lerini tek sorguda veritabanında ara"""
+    if not listing_urls:
+        return {}
+    async with db.connection() as connection:
+        with timed('db_lookup'):
+            records = await connection.raw_connection.fetch(KNOWN_LISTINGS_QUERY, listing_urls, ttl_days)
+    return {record['listing_url']: dict(record) for record in records}
+
+
+def add_location_listener(listener: Callable[[], None]):
+    _location_listeners.append(listener)
+
+
+def add_ingest_listener(listener: Callable[['IngestResult'], None]):
+    _ingest_listeners.append(listener)
+
+
+def _notify(listeners: List[Callable], *args):
+    for listener in listeners:
+        try:
+            listener(*args)
+        except Exception as e:
+            logger.error(f"Kayıt dinleyicisi çalıştırılamadı: {str(e)}")
+
+
+async def _upsert_batch(db: Database, rows: List[Dict], query: str = UPSERT_QUERY) -> IngestResult:
+    records = [
+        (seq, *(row[column] for column in STAGING_COLUMNS[1:]))
+        for seq, row in enumerate(rows)
+    ]
+    async with db.connection() as connection:
+        async with connection.transaction():
+            raw = connection.raw_connection
+            await raw.execute(CREATE_STAGING_QUERY)
+            with timed('db_copy'):
+                await raw.copy_records_to_table(
+                    'properties_staging', records=records, columns=STAGING_COLUMNS
+                )
+            with timed('db_upsert'):
+                returned = await raw.fetch(query)
+
+    # Sayfa içinde tekrar eden ilan numaraları tek satıra indirilir
+    result = IngestResult(
+        skipped=len(rows) - len(returned),
+        new_locations=returned[0]['new_locations'] if returned else 0,
+    )
+    for record in returned:
+        row = dict(record)
+        if row['inserted']:
+            result.inserted += 1
+        elif row['unchanged']:
+            result.unchanged += 1
+        else:
+            result.updated += 1
+            if row['price_changed']:
+                result.price_changed += 1
+        result.rows.append(row)
+    return result
+
+
+async def ingest_listings(db: Database, listings: Iterable[Dict], refresh: bool = False) -> IngestResult:
+    """İlanları tek seferde upsert et ve eklenen/güncellenen/değişmeyen sayılarını döndür.
+
+    refresh: kayıtlı ilanların fiyatla birlikte parse edilen bütün kolonlarını
+    (başlık, metrekare, konum, ...) güncelle; seçici düzeltmelerinden sonra
+    arşivden yeniden parse için.
+    """
+    query = REFRESH_UPSERT_QUERY if refresh else UPSERT_QUERY
+    rows = []
+    skipped = 0
+    for listing in listings:
+        row = normalize_listing(listing)
+        if row is None:
+            skipped += 1
+        else:
+            rows.append(row)
+
+    if not rows:
+        return IngestResult(skipped=skipped)
+
+    try:
+        result = await _upsert_batch(db, rows, query)
+    except Exception as e:
+        # Tek bir hatalı satır (ör. başka ilan numarasıyla kayıtlı listing_url)
+        # bütün sayfayı kaybettirmesin diye satır satır tekrar dene
+        logger.warning(f"Toplu kayıt başarısız, satır satır deneniyor: {str(e)}")
+        result = IngestResult()
+        for row in rows:
+            try:
+                result.merge(await _upsert_batch(db, [row], query))
+            except Exception as row_error:
+                logger.error(f"İlan kaydedilemedi ({row['listing_number']}): {str(row_error)}")
+                result.skipped += 1
+
+    result.skipped += skipped
+    if result.new_locations:
+        _notify(_location_listeners)
+    if result.rows:
+        _notify(_ingest_listeners, result)
+    logger.info(
+        f"Toplu kayıt: {result.inserted} yeni, {result.updated} güncellendi, "
+        f"{result.unchanged} değişmedi, {result.skipped} atlandı"
+    )
+    return result
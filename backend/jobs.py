@@ -0,0 +1,125 @@
+"""Arka planda çalışan tarama işleri.
+
+``POST /scrape/`` taramayı beklemeden bir iş kimliği döndürür; tarama
+API'nin event loop'unda bir task olarak çalışır, Selenium çağrıları ise
+worker thread'lere aktarılır. Aynı anda çalışabilecek iş sayısı
+sınırlandırılarak veritabanı havuzu korunur.
+"""
+import asyncio
+import logging
+import os
+import uuid
+from datetime import datetime, timezone
+from typing import Dict, Optional
+
+from databases import Database
+
+from crawler import ParallelCrawler
+from scraper import CrawlProgress, HepsiEmlakScraper
+
+logger = logging.getLogger(__name__)
+
+MAX_SCRAPE_JOBS = int(os.getenv("MAX_SCRAPE_JOBS", "2"))
+# Çalışmayı bekleyen en fazla iş; aşılırsa yeni istekler reddedilir
+MAX_QUEUED_SCRAPE_JOBS = int(os.getenv("MAX_QUEUED_SCRAPE_JOBS", "10"))
+# Bellekte tutulacak tamamlanmış iş sayısı
+SCRAPE_JOB_HISTORY = int(os.getenv("SCRAPE_JOB_HISTORY", "100"))
+
+
+class JobQueueFull(Exception):
+    pass
+
+
+class ScrapeJob:
+    def __init__(self, url: str, workers: int = 1, incremental: Optional[bool] = None):
+        self.id = uuid.uuid4().hex
+        self.url = url
+        self.workers = workers
+        self.incremental = incremental
+        self.status = 'queued'
+        self.error: Optional[str] = None
+        self.created_at = datetime.now(timezone.utc)
+        self.started_at: Optional[datetime] = None
+        self.finished_at: Optional[datetime] = None
+        self.progress: Optional[CrawlProgress] = None
+        self.task: Optional[asyncio.Task] = None
+
+    def to_dict(self) -> Dict:
+        progress = self.progress.snapshot() if self.progress else CrawlProgress().snapshot()
+        return {
+            'job_id': self.id,
+            'url': self.url,
+            'status': self.status,
+            'error': self.error,
+            'created_at': self.created_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at,
+            **progress,
+        }
+
+
+class ScrapeJobManager:
+    """Tarama işlerini sınırlı eşzamanlılıkla arka planda çalıştır"""
+
+    def __init__(self, db: Database, max_concurrent: int = MAX_SCRAPE_JOBS,
+                 max_queued: int = MAX_QUEUED_SCRAPE_JOBS):
+        self.db = db
+        self.max_queued = max_queued
+        self._semaphore = asyncio.Semaphore(max_concurrent)
+        self._jobs: Dict[str, ScrapeJob] = {}
+
+    def submit(self, url: str, workers: int = 1, incremental: Optional[bool] = None) -> ScrapeJob:
+        queued = sum(1 for job in self._jobs.values() if job.status == 'queued')
+        if queued >= self.max_queued:
+            raise JobQueueFull("Bekleyen tarama işi sayısı sınıra ulaştı")
+
+        job = ScrapeJob(url, workers, incremental)
+        self._jobs[job.id] = job
+        job.task = asyncio.create_task(self._run(job))
+        self._prune()
+        return job
+
+    def get(self, job_id: str) -> Optional[ScrapeJob]:
+        return self._jobs.get(job_id)
+
+    async def _run(self, job: ScrapeJob):
+        async with self._semaphore:
+            job.status = 'running'
+            job.started_at = datetime.now(timezone.utc)
+            logger.info(f"Tarama işi başladı: {job.id} ({job.url})")
+            try:
+                if job.workers > 1:
+                    crawler = ParallelCrawler(workers=job.workers, db=self.db)
+                    job.progress = crawler.progress
+                    await crawler.crawl(job.url)
+                else:
+                    # WebDriver başlatmak bloklayan bir işlem
+                    scraper = await asyncio.to_thread(HepsiEmlakScraper, db=self.db)
+                    job.progress = scraper.progress
+                    await scraper.scrape_and_save(job.url, incremental=job.incremental)
+                job.status = 'completed'
+            except asyncio.CancelledError:
+                job.status = 'cancelled'
+                raise
+            except Exception as e:
+                logger.error(f"Tarama işi başarısız: {job.id}: {str(e)}")
+                job.status = 'failed'
+                job.error = str(e)
+            finally:
+                if job.progress:
+                    job.progress.finish()
+                job.finished_at = datetime.now(timezone.utc)
+                logger.info(f"Tarama işi bitti: {job.id} ({job.status})")
+
+    def _prune(self):
+        """En eski tamamlanmış işleri unut"""
+        finished = [job for job in self._jobs.values() if job.finished_at is not None]
+        for job in sorted(finished, key=lambda j: j.finished_at)[:max(0, len(finished) - SCRAPE_JOB_HISTORY)]:
+            del self._jobs[job.id]
+
+    async def shutdown(self):
+        """Çalışan işleri iptal et"""
+        tasks = [job.task for job in self._jobs.values() if job.task and not job.task.done()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
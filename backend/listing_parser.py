@@ -0,0 +1,307 @@
+"""Hepsiemlak sonuç sayfaları için tarayıcıdan bağımsız ilan parser'ı.
+
+Kaydedilmiş ``ul.list-items-container`` HTML'ini WebDriver olmadan ilan
+sözlüklerine çevirir. Kurulu olan en hızlı backend seçilir: selectolax,
+lxml (cssselect ile), lxml ile BeautifulSoup ve son olarak BeautifulSoup'un
+``html.parser``'ı.
+"""
+import logging
+import re
+from functools import lru_cache
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from bs4 import BeautifulSoup, SoupStrainer
+
+try:
+    from selectolax.lexbor import LexborHTMLParser as HTMLParser
+except ImportError:  # pragma: no cover - opsiyonel bağımlılık
+    try:
+        from selectolax.parser import HTMLParser
+    except ImportError:
+        HTMLParser = None
+
+try:
+    import lxml.html as lxml_html
+    HAS_LXML = True
+except ImportError:  # pragma: no cover - opsiyonel bağımlılık
+    lxml_html = None
+    HAS_LXML = False
+
+try:
+    from lxml.cssselect import CSSSelector
+except ImportError:  # pragma: no cover - cssselect opsiyonel
+    CSSSelector = None
+
+logger = logging.getLogger(__name__)
+
+BASE_URL = "https://www.hepsiemlak.com"
+CONTAINER_SELECTOR = 'ul.list-items-container'
+ITEM_SELECTOR = 'li.listing-item'
+PAGINATION_SELECTOR = '.he-pagination ul li'
+NO_RESULT_SELECTOR = '.no-result-wrapper, .no-result'
+ERROR_PAGE_SELECTOR = '.error-page, .error-content'
+
+# İlan URL'leri ilan numarasıyla biter: .../daire/12345-678
+LISTING_NUMBER_PATTERN = re.compile(r'/(\d+-\d+)/?(?:[?#].*)?$')
+
+
+class _SoupNode:
+    """BeautifulSoup elemanları için ortak arayüz"""
+    __slots__ = ('node',)
+
+    def __init__(self, node):
+        self.node = node
+
+    def select_one(self, selector: str) -> Optional['_SoupNode']:
+        found = self.node.select_one(selector)
+        return _SoupNode(found) if found is not None else None
+
+    def select(self, selector: str) -> List['_SoupNode']:
+        return [_SoupNode(found) for found in self.node.select(selector)]
+
+    def text(self) -> str:
+        return self.node.get_text().strip()
+
+    def attr(self, name: str) -> Optional[str]:
+        return self.node.get(name)
+
+    def html(self) -> str:
+        return str(self.node)
+
+
+class _SelectolaxNode:
+    """selectolax elemanları için ortak arayüz"""
+    __slots__ = ('node',)
+
+    def __init__(self, node):
+        self.node = node
+
+    def select_one(self, selector: str) -> Optional['_SelectolaxNode']:
+        found = self.node.css_first(selector)
+        return _SelectolaxNode(found) if found is not None else None
+
+    def select(self, selector: str) -> List['_SelectolaxNode']:
+        return [_SelectolaxNode(found) for found in self.node.css(selector)]
+
+    def text(self) -> str:
+        return self.node.text().strip()
+
+    def attr(self, name: str) -> Optional[str]:
+        return self.node.attributes.get(name)
+
+    def html(self) -> str:
+        return self.node.html or ''
+
+
+class _LxmlNode:
+    """lxml.html elemanları için ortak arayüz"""
+    __slots__ = ('node',)
+
+    def __init__(self, node):
+        self.node = node
+
+    def select_one(self, selector: str) -> Optional['_LxmlNode']:
+        found = _compiled_selector(selector)(self.node)
+        return _LxmlNode(found[0]) if found else None
+
+    def select(self, selector: str) -> List['_LxmlNode']:
+        return [_LxmlNode(found) for found in _compiled_selector(selector)(self.node)]
+
+    def text(self) -> str:
+        return self.node.text_content().strip()
+
+    def attr(self, name: str) -> Optional[str]:
+        return self.node.get(name)
+
+    def html(self) -> str:
+        return lxml_html.tostring(self.node, encoding='unicode')
+
+
+@lru_cache(maxsize=None)
+def _compiled_selector(selector: str):
+    return CSSSelector(selector)
+
+
+def available_backends() -> List[str]:
+    """Bu ortamda kullanılabilen parser backend'lerini döndür"""
+    backends = []
+    if HTMLParser is not None:
+        backends.append('selectolax')
+    if HAS_LXML and CSSSelector is not None:
+        backends.append('lxml')
+    if HAS_LXML:
+        backends.append('bs4-lxml')
+    backends.append('html.parser')
+    return backends
+
+
+def default_backend() -> str:
+    """Kurulu en hızlı backend'i seç"""
+    return available_backends()[0]
+
+
+def _parse_document(html: str, backend: Optional[str] = None, only_container: bool = False):
+    backend = backend or default_backend()
+    if backend not in available_backends():
+        raise ValueError(f"Parser backend kullanılamıyor: {backend}")
+
+    if backend == 'selectolax':
+        return _SelectolaxNode(HTMLParser(html).root)
+
+    if backend == 'lxml':
+        return _LxmlNode(lxml_html.fromstring(html))
+
+    features = 'lxml' if backend == 'bs4-lxml' else 'html.parser'
+    if only_container:
+        # Sayfanın geri kalanı için ağaç kurmamak adına sadece container parse edilir
+        strainer = SoupStrainer('ul', class_='list-items-container')
+        return _SoupNode(BeautifulSoup(html, features, parse_only=strainer))
+    return _SoupNode(BeautifulSoup(html, features))
+
+
+def _find_container(html: str, backend: Optional[str] = None):
+    return _parse_document(html, backend, only_container=True).select_one(CONTAINER_SELECTOR)
+
+
+def container_html(html: str, backend: Optional[str] = None) -> Optional[str]:
+    """İlan listesi container'ının HTML'ini döndür; bulunamazsa None"""
+    container = _find_container(html, backend)
+    return container.html() if container else None
+
+
+def parse_page_info(html: str, backend: Optional[str] = None) -> Dict:
+    """Sayfanın 'sonuç yok' / hata sayfası olup olmadığını ve son sayfa numarasını bul"""
+    document = _parse_document(html, backend)
+    last_page = None
+    for page_item in document.select(PAGINATION_SELECTOR):
+        try:
+            last_page = max(last_page or 1, int(page_item.text()))
+        except ValueError:
+            continue
+    return {
+        'no_result': document.select_one(NO_RESULT_SELECTOR) is not None,
+        'error': document.select_one(ERROR_PAGE_SELECTOR) is not None,
+        'last_page': last_page,
+    }
+
+
+def listing_number_from_url(url: Optional[str]) -> Optional[str]:
+    """İlan URL'sinin sonundaki ilan numarasını çıkar"""
+    if not url:
+        return None
+    match = LISTING_NUMBER_PATTERN.search(url)
+    return match.group(1) if match else None
+
+
+def parse_building_age(text: str) -> Optional[int]:
+    """'5 Yaşında' veya 'Sıfır Bina' gibi metinleri yaşa çevir"""
+    if 'Sıfır' in text:
+        return 0
+    try:
+        return int(text.replace('Yaşında', '').strip())
+    except ValueError:
+        return None
+
+
+def parse_listing_item(item) -> Dict:
+    """Tek bir ``li.listing-item`` elemanından ilan sözlüğü oluştur"""
+    listing = {}
+
+    title = item.select_one('h3')
+    if title:
+        listing['title'] = title.text()
+
+    price_elem = item.select_one('span.list-view-price')
+    if price_elem:
+        currency = price_elem.select_one('span.currency')
+        listing['price'] = price_elem.text()
+        listing['currency'] = currency.text() if currency else 'TL'
+
+    location = item.select_one('span.list-view-location')
+    if location:
+        listing['location'] = location.text()
+
+    link = item.select_one('a[href*="/istanbul-"]')
+    if link and link.attr('href'):
+        listing['listing_url'] = f"{BASE_URL}{link.attr('href')}"
+        listing_number = listing_number_from_url(link.attr('href'))
+        if listing_number:
+            listing['listing_number'] = listing_number
+
+    img = item.select_one('img.list-view-image')
+    if img and img.attr('src'):
+        listing['image_url'] = img.attr('src')
+
+    features = []
+
+    prop_type = item.select_one('span.left')
+    if prop_type:
+        listing['property_type'] = prop_type.text()
+        features.append(prop_type.text())
+
+    specs = item.select_one('span.right.celly')
+    if specs:
+        room_count = specs.select_one('span.houseRoomCount')
+        if room_count:
+            listing['room_count'] = room_count.text()
+
+        square_meter = specs.select_one('span.squareMeter')
+        if square_meter:
+            listing['square_meters'] = float(square_meter.text().replace('m²', ''))
+
+        building_age = specs.select_one('span.buildingAge')
+        if building_age:
+            listing['building_age'] = parse_building_age(building_age.text())
+
+        floor = specs.select_one('span.floortype')
+        if floor:
+            listing['floor'] = floor.text()
+
+    listing['features'] = features
+
+    office = item.select_one('p.listing-card--owner-info__firm-name')
+    if office:
+        listing['agency_name'] = office.text()
+
+    office_logo = item.select_one('img.branded-image')
+    if office_logo and office_logo.attr('src'):
+        listing['agency_logo_url'] = office_logo.attr('src')
+
+    office_link = item.select_one('a[href*="/emlak-ofisi/"]')
+    if office_link and office_link.attr('href'):
+        listing['agency_url'] = f"{BASE_URL}{office_link.attr('href')}"
+
+    return listing
+
+
+def iter_listings(html: str, backend: Optional[str] = None) -> Iterator[Tuple[int, Dict]]:
+    """Sayfadaki ilanları, sayfa içi sıralarıyla birlikte üret.
+
+    Sıra numarası, aynı sayfanın canlı WebDriver elemanlarıyla eşleştirme
+    yapılabilmesi için parse edilemeyen ilanlar atlansa bile korunur.
+    """
+    container = _find_container(html, backend)
+    if not container:
+        logger.error("İlan listesi container'ı bulunamadı")
+        return
+
+    listing_items = container.select(ITEM_SELECTOR)
+    if not listing_items:
+        logger.info("Sayfada ilan bulunamadı")
+        return
+
+    logger.info(f"Bulunan ilan sayısı: {len(listing_items)}")
+
+    for idx, item in enumerate(listing_items):
+        try:
+            listing = parse_listing_item(item)
+        except Exception as e:
+            logger.error(f"İlan parse edilirken hata: {str(e)}")
+            continue
+        if listing:
+            yield idx, listing
+
+
+def parse_listings_html(html: str, backend: Optional[str] = None) -> List[Dict]:
+    """HTML içeriğinden ilanları WebDriver olmadan parse et"""
+    return [listing for _, listing in iter_listings(html, backend)]
@@ -0,0 +1,107 @@
+"""Şehir → ilçe → mahalle hiyerarşisinin bellek içi önbelleği.
+
+``/locations/*`` uçları ``properties`` üzerinde ``SELECT DISTINCT`` yapmak
+yerine kayıt sırasında güncellenen küçük ``locations`` tablosunu bir kez
+okuyup ağaç olarak bellekte tutar; yanıt süresi ilan sayısından bağımsızdır.
+
+Önbellek, kayıt sırasında yeni bir konum eklendiğinde (``ingest``
+dinleyicisi) geçersiz kılınır. Ayrı süreçlerde (ör. ``crawler.py``)
+eklenen konumlar için ağaç en geç ``LOCATIONS_CACHE_TTL`` saniyede bir
+yeniden okunur. Her yükleme içeriğin özetinden bir ETag üretir.
+"""
+import asyncio
+import hashlib
+import logging
+import os
+import time
+from typing import Dict, List, Optional
+
+from databases import Database
+from dotenv import load_dotenv
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+LOCATIONS_CACHE_TTL = float(os.getenv("LOCATIONS_CACHE_TTL", "300"))
+
+LOCATIONS_QUERY = """
+    SELECT city, district, neighborhood
+    FROM locations
+    ORDER BY city, district, neighborhood
+"""
+
+
+def _options(values: List[str]) -> List[Dict[str, str]]:
+    return [{'value': value, 'label': value} for value in values]
+
+
+class LocationTree:
+    """Konum ağacı ve hazır yanıt listeleri"""
+
+    def __init__(self, ttl: float = LOCATIONS_CACHE_TTL):
+        self.ttl = ttl
+        self.etag: Optional[str] = None
+        self.loaded_at = 0.0
+        self._stale = True
+        self._cities: List[Dict[str, str]] = []
+        self._districts: Dict[str, List[Dict[str, str]]] = {}
+        self._neighborhoods: Dict[tuple, List[Dict[str, str]]] = {}
+        self._lock = asyncio.Lock()
+
+    def invalidate(self):
+        self._stale = True
+
+    def _expired(self) -> bool:
+        return self._stale or time.monotonic() - self.loaded_at > self.ttl
+
+    async def ensure_loaded(self, db: Database):
+        if not self._expired():
+            return
+        async with self._lock:
+            # Kilidi beklerken başka bir istek yüklemiş olabilir
+            if not self._expired():
+                return
+            # Okuma sırasında gelen geçersiz kılma kaybolmasın
+            self._stale = False
+            try:
+                rows = await db.fetch_all(query=LOCATIONS_QUERY)
+            except Exception:
+                self._stale = True
+                raise
+            self._build(rows)
+
+    def _build(self, rows):
+        districts: Dict[str, List[str]] = {}
+        neighborhoods: Dict[tuple, List[str]] = {}
+        digest = hashlib.sha1()
+        for row in rows:
+            city, district, neighborhood = row['city'], row['district'], row['neighborhood']
+            digest.update(f"{city}\x1f{district}\x1f{neighborhood}\x1e".encode('utf-8'))
+            city_districts = districts.setdefault(city, [])
+            if not district:
+                continue
+            if not city_districts or city_districts[-1] != district:
+                city_districts.append(district)
+            if neighborhood:
+                neighborhoods.setdefault((city, district), []).append(neighborhood)
+
+        self._cities = _options(list(districts))
+        self._districts = {city: _options(values) for city, values in districts.items()}
+        self._neighborhoods = {key: _options(values) for key, values in neighborhoods.items()}
+        self.etag = f'"{digest.hexdigest()}"'
+        self.loaded_at = time.monotonic()
+        logger.info(f"Konum ağacı yüklendi: {len(self._cities)} şehir, {len(rows)} konum")
+
+    def cities(self) -> List[Dict[str, str]]:
+        return self._cities
+
+    def districts(self, city: str) -> List[Dict[str, str]]:
+        return self._districts.get(city, [])
+
+    def neighborhoods(self, city: str, district: str) -> List[Dict[str, str]]:
+        return self._neighborhoods.get((city, district), [])
+
+
+# API sürecinde paylaşılan önbellek
+location_tree = LocationTree()
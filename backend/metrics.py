@@ -0,0 +1,210 @@
+"""Tarama aşamalarının süre ölçümü ve performans raporu.
+
+Her aşama (WebDriver başlatma, sayfa yükleme, çerez, kaydırma, parse,
+telefon açma, veritabanı ifadeleri...) için süreler sabit kovalı bir
+histogramda toplanır. Tarama sonunda makinece okunabilir bir JSON raporu
+yazılır; istenirse aynı veriler Prometheus metin biçiminde de dosyaya
+yazılır (node_exporter textfile collector için).
+
+Ölçüm yapılacak kodun her yere ``StageMetrics`` taşıması gerekmez:
+``activate`` ile o anki görev için etkinleştirilen nesneye ``timed`` ile
+ulaşılır. ``asyncio.create_task`` ve ``asyncio.to_thread`` bağlamı
+kopyaladığı için alt görevler ve thread'ler de aynı nesneye yazar.
+"""
+import json
+import logging
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+# JSON raporlarının yazılacağı dizin; boş bırakılırsa rapor sadece loglanır
+METRICS_REPORT_DIR = os.getenv("METRICS_REPORT_DIR", "crawl_reports")
+# Prometheus metin biçimindeki çıktının yazılacağı dosya (opsiyonel)
+METRICS_PROMETHEUS_FILE = os.getenv("METRICS_PROMETHEUS_FILE", "")
+
+# Saniye cinsinden histogram kova üst sınırları
+STAGE_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+_current: ContextVar[Optional['StageMetrics']] = ContextVar('stage_metrics', default=None)
+
+
+class StageHistogram:
+    """Tek bir aşamanın süre dağılımı"""
+    __slots__ = ('counts', 'count', 'total', 'min', 'max', 'timeouts')
+
+    def __init__(self):
+        # Son kova +Inf
+        self.counts = [0] * (len(STAGE_BUCKETS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = 0.0
+        self.timeouts = 0
+
+    def observe(self, seconds: float, timed_out: bool = False):
+        self.counts[bisect_left(STAGE_BUCKETS, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        self.min = seconds if self.min is None else min(self.min, seconds)
+        self.max = max(self.max, seconds)
+        if timed_out:
+            self.timeouts += 1
+
+    def quantile(self, q: float) -> float:
+        """Kova sınırlarına göre yaklaşık yüzdelik (üst sınır, en fazla max)"""
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(STAGE_BUCKETS, self.counts):
+            seen += count
+            if seen >= rank:
+                return min(bound, self.max)
+        return self.max
+
+    def to_dict(self) -> Dict:
+        return {
+            'count': self.count,
+            'total': round(self.total, 3),
+            'avg': round(self.total / self.count, 4) if self.count else 0.0,
+            'min': round(self.min or 0.0, 4),
+            'max': round(self.max, 4),
+            'p50': round(self.quantile(0.5), 4),
+            'p95': round(self.quantile(0.95), 4),
+            'p99': round(self.quantile(0.99), 4),
+            'timeouts': self.timeouts,
+            'buckets': {
+                **{str(bound): count for bound, count in zip(STAGE_BUCKETS, self.counts)},
+                '+Inf': self.counts[-1],
+            },
+        }
+
+
+class StageMetrics:
+    """Aşama bazında süre histogramları; birden fazla thread'den yazılabilir"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stages: Dict[str, StageHistogram] = {}
+        self.started_at = datetime.now(timezone.utc)
+
+    def record(self, stage: str, seconds: float, timed_out: bool = False):
+        with self._lock:
+            histogram = self._stages.get(stage)
+            if histogram is None:
+                histogram = self._stages[stage] = StageHistogram()
+            histogram.observe(seconds, timed_out)
+
+    @contextmanager
+    def timer(self, stage: str) -> Iterator[None]:
+        """Blok süresini ölç; blok hata verirse zaman aşımı olarak say"""
+        started = time.perf_counter()
+        failed = False
+        try:
+            yield
+        except BaseException:
+            failed = True
+            raise
+        finally:
+            self.record(stage, time.perf_counter() - started, timed_out=failed)
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """Log için kısa özet"""
+        with self._lock:
+            return {
+                stage: {
+                    'count': histogram.count,
+                    'total': round(histogram.total, 3),
+                    'avg': round(histogram.total / histogram.count, 3),
+                    'max': round(histogram.max, 3),
+                    'timeouts': histogram.timeouts,
+                }
+                for stage, histogram in sorted(self._stages.items())
+            }
+
+    def report(self, **extra) -> Dict:
+        """Makinece okunabilir tam rapor"""
+        with self._lock:
+            stages = {stage: histogram.to_dict() for stage, histogram in sorted(self._stages.items())}
+        return {
+            'started_at': self.started_at.isoformat(),
+            'finished_at': datetime.now(timezone.utc).isoformat(),
+            **extra,
+            'stages': stages,
+        }
+
+    def prometheus(self, prefix: str = 'scraper_stage') -> str:
+        """Prometheus metin biçimi"""
+        lines = [
+            f"# HELP {prefix}_seconds Tarama aşamalarının süresi",
+            f"# TYPE {prefix}_seconds histogram",
+        ]
+        timeouts = []
+        with self._lock:
+            for stage, histogram in sorted(self._stages.items()):
+                cumulative = 0
+                for bound, count in zip(STAGE_BUCKETS, histogram.counts):
+                    cumulative += count
+                    lines.append(f'{prefix}_seconds_bucket{{stage="{stage}",le="{bound}"}} {cumulative}')
+                lines.append(f'{prefix}_seconds_bucket{{stage="{stage}",le="+Inf"}} {histogram.count}')
+                lines.append(f'{prefix}_seconds_sum{{stage="{stage}"}} {histogram.total:.6f}')
+                lines.append(f'{prefix}_seconds_count{{stage="{stage}"}} {histogram.count}')
+                timeouts.append(f'{prefix}_timeouts_total{{stage="{stage}"}} {histogram.timeouts}')
+        lines.append(f"# HELP {prefix}_timeouts_total Zaman aşımına uğrayan veya hata veren ölçümler")
+        lines.append(f"# TYPE {prefix}_timeouts_total counter")
+        lines.extend(timeouts)
+        return '\n'.join(lines) + '\n'
+
+
+def activate(metrics: StageMetrics):
+    """Mevcut görev ve alt görevleri için ölçüm nesnesini etkinleştir"""
+    return _current.set(metrics)
+
+
+def deactivate(token):
+    _current.reset(token)
+
+
+@contextmanager
+def timed(stage: str) -> Iterator[None]:
+    """Etkin bir ölçüm nesnesi varsa bloğun süresini kaydet"""
+    metrics = _current.get()
+    if metrics is None:
+        yield
+        return
+    with metrics.timer(stage):
+        yield
+
+
+def _write_atomic(path: Path, content: str):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(path.name + '.tmp')
+    tmp_path.write_text(content, encoding='utf-8')
+    os.replace(tmp_path, path)
+
+
+def emit_report(metrics: StageMetrics, name: str = 'crawl', **extra) -> Optional[Path]:
+    """Raporu logla, JSON dosyasına ve istenirse Prometheus dosyasına yaz"""
+    report = metrics.report(**extra)
+    logger.info(f"Aşama süreleri: {json.dumps(metrics.summary(), ensure_ascii=False)}")
+
+    path = None
+    try:
+        if METRICS_REPORT_DIR:
+            # Aynı saniyede başlayan taramalar (API işleri, ayrı süreçler) birbirinin
+            # raporunu ezmesin: mikrosaniye ve süreç numarası da dosya adında
+            stamp = metrics.started_at.strftime('%Y%m%dT%H%M%S%f')
+            path = Path(METRICS_REPORT_DIR) / f"{name}_{stamp}_{os.getpid()}.json"
+            _write_atomic(path, json.dumps(report, ensure_ascii=False, indent=2, default=str))
+            logger.info(f"Performans raporu yazıldı: {path}")
+        if METRICS_PROMETHEUS_FILE:
+            _write_atomic(Path(METRICS_PROMETHEUS_FILE), metrics.prometheus())
+    except OSError as e:
+        logger.error(f"Performans raporu yazılırken hata: {str(e)}")
+    return path
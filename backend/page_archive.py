@@ -0,0 +1,135 @@
+"""Çekilen sonuç sayfalarının sıkıştırılmış yerel arşivi.
+
+Her URL için ayrı bir dizin tutulur; sayfa içeriği değiştikçe çekilme
+zamanıyla adlandırılmış ``.html.gz`` dosyaları eklenir. İçerik özeti (hash)
+sayfanın tamamı yerine ilan listesi container'ı üzerinden hesaplanır, böylece
+reklam, token gibi değişken kısımlar sayfayı "değişmiş" göstermez. Son
+arşivlenen kopya ``latest.json`` dosyasında saklanır. Aynı dosyadaki
+``processed_hash`` sayfanın başarıyla kaydedilmiş son içeriğidir ve sadece
+ilanlar veritabanına yazıldıktan sonra güncellenir; özet bununla aynıysa
+sayfa yeniden parse edilmez. Kaydı yarıda kalan (tarayıcı hatası, telefon
+açılamaması, veritabanı hatası) sayfalar böylece bir sonraki taramada
+yeniden işlenir.
+
+Seçici düzeltmelerinden sonra ``reparse.py`` ile ilanlar arşivden yeniden
+oluşturulabilir.
+"""
+import gzip
+import hashlib
+import json
+import logging
+import os
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Iterator, Optional
+
+from listing_parser import container_html
+
+logger = logging.getLogger(__name__)
+
+PAGE_ARCHIVE_DIR = os.getenv("PAGE_ARCHIVE_DIR", "page_archive")
+# Arşivleme kapatılırsa sayfalar her taramada yeniden parse edilip yazılır
+PAGE_ARCHIVE_ENABLED = os.getenv("PAGE_ARCHIVE_ENABLED", "true").lower() in ("1", "true", "yes")
+
+LATEST_FILE = 'latest.json'
+
+
+def content_hash(html: str) -> str:
+    """Sayfanın ilan listesi üzerinden içerik özetini hesapla"""
+    fragment = container_html(html) or html
+    return hashlib.sha256(fragment.encode('utf-8')).hexdigest()
+
+
+class PageArchive:
+    """URL ve çekilme zamanına göre saklanan gzip sayfa arşivi"""
+
+    def __init__(self, root: str = PAGE_ARCHIVE_DIR):
+        self.root = Path(root)
+
+    def _url_dir(self, url: str) -> Path:
+        key = hashlib.sha1(url.encode('utf-8')).hexdigest()
+        return self.root / key[:2] / key
+
+    def latest(self, url: str) -> Optional[Dict]:
+        """URL'nin son arşiv kaydını döndür"""
+        return self._read_latest(self._url_dir(url) / LATEST_FILE)
+
+    @staticmethod
+    def _read_latest(path: Path) -> Optional[Dict]:
+        try:
+            with open(path, encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"Arşiv kaydı okunamadı: {path}: {str(e)}")
+            return None
+
+    def store(self, url: str, html: str, fetched_at: Optional[datetime] = None) -> Dict:
+        """Sayfayı arşivle ve URL'nin son kaydını döndür.
+
+        İçerik aynıysa yeni dosya yazılmaz, sadece kontrol zamanı güncellenir.
+        Sayfanın işlenip işlenmediği kaydın ``processed_hash`` alanından okunur.
+        """
+        fetched_at = fetched_at or datetime.now(timezone.utc)
+        digest = content_hash(html)
+        url_dir = self._url_dir(url)
+        previous = self.latest(url)
+
+        if previous is None or previous.get('content_hash') != digest:
+            url_dir.mkdir(parents=True, exist_ok=True)
+            path = url_dir / f"{fetched_at.strftime('%Y%m%dT%H%M%S%f')}_{digest[:16]}.html.gz"
+            with gzip.open(path, 'wt', encoding='utf-8') as f:
+                f.write(html)
+            record = {
+                'url': url,
+                'content_hash': digest,
+                'path': path.name,
+                'fetched_at': fetched_at.isoformat(),
+            }
+            if previous and previous.get('processed_hash'):
+                record['processed_hash'] = previous['processed_hash']
+        else:
+            record = dict(previous)
+        record['checked_at'] = fetched_at.isoformat()
+        self._write_latest(url_dir, record)
+        return record
+
+    def mark_processed(self, url: str, digest: str):
+        """Sayfanın bu içeriği veritabanına kaydedildi; sonraki taramalar atlayabilir"""
+        url_dir = self._url_dir(url)
+        record = self.latest(url)
+        if record is None:
+            return
+        record['processed_hash'] = digest
+        record['processed_at'] = datetime.now(timezone.utc).isoformat()
+        self._write_latest(url_dir, record)
+
+    @staticmethod
+    def _write_latest(url_dir: Path, record: Dict):
+        # Yarım yazılmış bir latest.json bırakmamak için önce geçici dosyaya yaz
+        tmp_path = url_dir / f"{LATEST_FILE}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(record, f, ensure_ascii=False)
+        os.replace(tmp_path, url_dir / LATEST_FILE)
+
+    def iter_latest(self, since: Optional[datetime] = None) -> Iterator[Dict]:
+        """Her URL'nin son kaydını, çekilme zamanına göre sıralı üret"""
+        records = []
+        for latest_path in self.root.glob(f'*/*/{LATEST_FILE}'):
+            record = self._read_latest(latest_path)
+            if not record:
+                continue
+            fetched_at = datetime.fromisoformat(record['fetched_at'])
+            if since and fetched_at < since:
+                continue
+            record['file'] = latest_path.parent / record['path']
+            records.append(record)
+        # Aynı ilan birden fazla sayfada geçtiyse en son çekilen kazanır
+        records.sort(key=lambda record: record['fetched_at'])
+        return iter(records)
+
+    @staticmethod
+    def read(path: Path) -> str:
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            return f.read()
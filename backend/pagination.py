@@ -0,0 +1,29 @@
+"""``(created_at, id)`` üzerinden keyset sayfalama imleçleri.
+
+İmleç, bir sayfanın son satırının ``created_at`` ve ``id`` değerlerinin
+URL'de güvenle taşınabilen base64 kodlamasıdır. Sonraki sayfa
+``(created_at, id) < (imleç)`` koşuluyla indeks üzerinden doğrudan
+okunur; OFFSET'in aksine derin sayfalarda da maliyet sabit kalır.
+"""
+import base64
+import binascii
+from datetime import datetime
+from typing import Tuple
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(created_at: datetime, row_id: int) -> str:
+    raw = f"{created_at.isoformat()}|{row_id}".encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        created_at, row_id = base64.urlsafe_b64decode(padded).decode('utf-8').split('|')
+        return datetime.fromisoformat(created_at), int(row_id)
+    except (binascii.Error, UnicodeDecodeError, ValueError) as e:
+        raise InvalidCursor(f"Geçersiz imleç: {cursor}") from e
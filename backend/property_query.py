@@ -0,0 +1,49 @@
+"""İlan listesi filtreleri.
+
+``GET /properties/`` ve ``GET /properties/export`` aynı filtreleri kabul
+eder. Filtreler bir kez çıkarılır; listeleme ``databases`` üzerinden adlı
+parametrelerle (``:city``), dışa aktarma ise asyncpg imleciyle sıra
+numaralı parametrelerle (``$1``) çalıştığından koşul metni iki biçimde
+üretilebilir.
+"""
+from typing import Any, Dict, List, Optional, Tuple
+
+# (parametre adı, kolon, operatör, değer)
+Filter = Tuple[str, str, str, Any]
+
+
+def property_filters(
+    city: Optional[str] = None,
+    district: Optional[str] = None,
+    min_price: Optional[float] = None,
+    max_price: Optional[float] = None,
+    min_size: Optional[float] = None,
+    max_size: Optional[float] = None,
+    property_type: Optional[str] = None,
+) -> List[Filter]:
+    candidates = [
+        ('city', 'city', '=', city),
+        ('district', 'district', '=', district),
+        ('min_price', 'price', '>=', min_price),
+        ('max_price', 'price', '<=', max_price),
+        ('min_size', 'square_meters', '>=', min_size),
+        ('max_size', 'square_meters', '<=', max_size),
+        ('property_type', 'property_type', '=', property_type),
+    ]
+    # Boş veya 0 değerli filtreler uygulanmaz
+    return [candidate for candidate in candidates if candidate[3]]
+
+
+def named_conditions(filters: List[Filter]) -> Tuple[str, Dict[str, Any]]:
+    """``databases`` için `` AND kolon = :ad`` koşulları"""
+    sql = ''.join(f" AND {column} {op} :{name}" for name, column, op, _ in filters)
+    return sql, {name: value for name, _, _, value in filters}
+
+
+def positional_conditions(filters: List[Filter], start: int = 1) -> Tuple[str, List[Any]]:
+    """asyncpg için `` AND kolon = $n`` koşulları"""
+    sql = ''.join(
+        f" AND {column} {op} ${index}"
+        for index, (_, column, op, _) in enumerate(filters, start)
+    )
+    return sql, [value for _, _, _, value in filters]
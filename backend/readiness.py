@@ -0,0 +1,159 @@
+"""Sabit bekleme süreleri yerine somut koşullara dayalı sayfa hazırlık kontrolü.
+
+Her aşama (sayfa yükleme, çerez, sonuç listesi, ilan sayısının sabitlenmesi,
+görseller, telefon penceresi) kendi zaman aşımıyla beklenir ve bekleme
+süreleri aşama bazında ``metrics.StageMetrics`` histogramlarına yazılır.
+Sayfalar arasındaki nezaket beklemesi bu sürelerden ayrı olarak ayarlanır.
+"""
+import logging
+import os
+import time
+from typing import Callable, Dict, Optional
+
+from selenium.common.exceptions import StaleElementReferenceException, TimeoutException
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.webdriver.support.ui import WebDriverWait
+
+from metrics import StageMetrics
+
+logger = logging.getLogger(__name__)
+
+READY_LOAD_TIMEOUT = float(os.getenv("READY_LOAD_TIMEOUT", "20"))
+READY_COOKIE_TIMEOUT = float(os.getenv("READY_COOKIE_TIMEOUT", "5"))
+READY_RESULTS_TIMEOUT = float(os.getenv("READY_RESULTS_TIMEOUT", "20"))
+READY_STABLE_TIMEOUT = float(os.getenv("READY_STABLE_TIMEOUT", "10"))
+READY_IMAGES_TIMEOUT = float(os.getenv("READY_IMAGES_TIMEOUT", "5"))
+READY_PHONE_TIMEOUT = float(os.getenv("READY_PHONE_TIMEOUT", "5"))
+READY_POLL_INTERVAL = float(os.getenv("READY_POLL_INTERVAL", "0.25"))
+# Aynı siteye art arda iki sayfa isteği arasındaki en kısa süre (saniye)
+CRAWL_POLITENESS_DELAY = float(os.getenv("CRAWL_POLITENESS_DELAY", "3"))
+
+COOKIE_BUTTON_SELECTOR = "button#onetrust-accept-btn-handler"
+COOKIE_BANNER_SELECTOR = "#onetrust-banner-sdk"
+CONTAINER_SELECTOR = 'ul.list-items-container'
+ITEM_SELECTOR = 'li.listing-item'
+NO_RESULT_SELECTOR = '.no-result-wrapper, .no-result'
+ERROR_PAGE_SELECTOR = '.error-page, .error-content'
+
+IMAGES_LOADED_SCRIPT = """
+    return Array.from(document.querySelectorAll('img.list-view-image'))
+        .every(img => img.complete && img.naturalWidth > 0);
+"""
+
+
+class PageReadiness:
+    """WebDriver üzerinde koşul bazlı bekleme işlemleri"""
+
+    def __init__(self, driver, stats: Optional[StageMetrics] = None,
+                 politeness_delay: float = CRAWL_POLITENESS_DELAY):
+        self.driver = driver
+        self.stats = stats or StageMetrics()
+        self.politeness_delay = politeness_delay
+        self._last_navigation = None
+
+    def _wait(self, stage: str, timeout: float, condition: Callable, raise_on_timeout: bool = False):
+        """Koşul sağlanana kadar bekle; zaman aşımında None döndür"""
+        started = time.perf_counter()
+        try:
+            result = WebDriverWait(
+                self.driver, timeout, poll_frequency=READY_POLL_INTERVAL,
+                ignored_exceptions=(StaleElementReferenceException,)
+            ).until(condition)
+            self.stats.record(stage, time.perf_counter() - started)
+            return result
+        except TimeoutException:
+            self.stats.record(stage, time.perf_counter() - started, timed_out=True)
+            if raise_on_timeout:
+                raise
+            logger.warning(f"Bekleme zaman aşımı: {stage} ({timeout} sn)")
+            return None
+
+    def politeness_wait(self):
+        """Bir önceki sayfa isteğinden bu yana nezaket süresi dolmadıysa bekle"""
+        if self._last_navigation is not None:
+            remaining = self.politeness_delay - (time.monotonic() - self._last_navigation)
+            if remaining > 0:
+                time.sleep(remaining)
+                self.stats.record('politeness', remaining)
+        self._last_navigation = time.monotonic()
+
+    def load(self, url: str):
+        """Sayfayı aç ve document.readyState 'complete' olana kadar bekle"""
+        self.politeness_wait()
+        started = time.perf_counter()
+        self.driver.get(url)
+        self.stats.record('navigate', time.perf_counter() - started)
+        self._wait('document', READY_LOAD_TIMEOUT,
+                   lambda d: d.execute_script("return document.readyState") == 'complete')
+
+    def accept_cookies(self) -> bool:
+        """Çerez butonu görünürse tıkla ve banner kaybolana kadar bekle"""
+        button = self._wait('cookie', READY_COOKIE_TIMEOUT, EC.element_to_be_clickable((
+            By.CSS_SELECTOR, COOKIE_BUTTON_SELECTOR
+        )))
+        if not button:
+            return False
+        button.click()
+        self._wait('cookie_banner', READY_COOKIE_TIMEOUT, EC.invisibility_of_element_located((
+            By.CSS_SELECTOR, COOKIE_BANNER_SELECTOR
+        )))
+        return True
+
+    def wait_for_results(self) -> Optional[str]:
+        """Sonuç listesi, 'sonuç yok' veya hata sayfasından biri görünene kadar bekle.
+
+        'results', 'empty', 'error' veya zaman aşımında None döndürür.
+        """
+        def page_state(driver):
+            if driver.find_elements(By.CSS_SELECTOR, NO_RESULT_SELECTOR):
+                return 'empty'
+            if driver.find_elements(By.CSS_SELECTOR, ERROR_PAGE_SELECTOR):
+                return 'error'
+            if driver.find_elements(By.CSS_SELECTOR, CONTAINER_SELECTOR):
+                return 'results'
+            return False
+
+        return self._wait('results', READY_RESULTS_TIMEOUT, page_state)
+
+    def item_count(self) -> int:
+        return len(self.driver.find_elements(By.CSS_SELECTOR, f'{CONTAINER_SELECTOR} {ITEM_SELECTOR}'))
+
+    def wait_for_stable_count(self, stage: str = 'stable_count') -> int:
+        """İlan sayısı art arda iki kontrolde aynı ve sıfırdan büyük olana kadar bekle"""
+        previous = {'count': -1}
+
+        def count_is_stable(driver):
+            count = self.item_count()
+            stable = count > 0 and count == previous['count']
+            previous['count'] = count
+            return stable
+
+        self._wait(stage, READY_STABLE_TIMEOUT, count_is_stable)
+        return max(previous['count'], 0)
+
+    def scroll_to_bottom(self) -> int:
+        """Sayfanın sonuna in ve tembel yüklenen ilanların sabitlenmesini bekle"""
+        self.driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
+        return self.wait_for_stable_count('scroll')
+
+    def wait_for_images(self) -> bool:
+        """Liste görsellerinin yüklenmesini bekle; zaman aşımı sayfayı geçersiz kılmaz"""
+        return bool(self._wait('images', READY_IMAGES_TIMEOUT,
+                               lambda d: d.execute_script(IMAGES_LOADED_SCRIPT)))
+
+    def wait_for_phone(self, selenium_item):
+        """Telefon penceresinde ilan numarası görünene kadar bekle"""
+        def phone_visible(driver):
+            elements = selenium_item.find_elements(By.CSS_SELECTOR, 'span.phone-listing-id')
+            return elements[0] if elements and elements[0].text.strip() else False
+
+        return self._wait('phone_popup', READY_PHONE_TIMEOUT, phone_visible, raise_on_timeout=True)
+
+    def wait_for_phone_closed(self, phone_container):
+        """Telefon penceresinin kapanmasını bekle"""
+        return self._wait('phone_close', READY_PHONE_TIMEOUT,
+                          lambda d: not phone_container.is_displayed())
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        return self.stats.summary()
@@ -0,0 +1,93 @@
+"""Arşivlenmiş sonuç sayfalarından ilanları yeniden oluştur.
+
+Seçiciler düzeltildikten sonra siteyi yeniden taramadan ``properties``
+tablosunu güncellemek için kullanılır. Her URL'nin son arşiv kopyası sırayla
+okunur, parse edilir ve ilanlar partiler halinde kaydedilir; arşivin tamamı
+belleğe alınmaz. Kayıtlı ilanların parse edilen bütün kolonları (başlık,
+metrekare, konum, bina yaşı, ...) arşivdeki değerlerle değiştirilir. Arşivde
+telefon bilgisi olmadığından kayıtlı danışman telefonlarına dokunulmaz.
+
+Kullanım:
+    python reparse.py [--archive-dir page_archive] [--since 2024-01-01] [--batch-size 1000]
+"""
+import argparse
+import asyncio
+import logging
+import time
+from datetime import datetime, timezone
+from typing import Dict, Iterator, Optional
+
+from dotenv import load_dotenv
+
+from area_statistics import AreaStatisticsRefresher
+from db import PooledDatabase
+from import_listings import batched
+from ingest import IngestResult, ingest_listings
+from listing_parser import available_backends, parse_listings_html
+from page_archive import PAGE_ARCHIVE_DIR, PageArchive
+
+load_dotenv()
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def iter_archived_listings(archive: PageArchive, since: Optional[datetime] = None,
+                           backend: Optional[str] = None) -> Iterator[Dict]:
+    """Arşivdeki sayfaları tek tek açıp ilanlarını üret"""
+    pages = 0
+    for record in archive.iter_latest(since):
+        try:
+            html = archive.read(record['file'])
+        except OSError as e:
+            logger.error(f"Arşiv dosyası okunamadı: {record['file']}: {str(e)}")
+            continue
+        pages += 1
+        if pages % 100 == 0:
+            logger.info(f"{pages} sayfa işlendi")
+        yield from parse_listings_html(html, backend)
+
+
+async def reparse(archive_dir: str, batch_size: int, since: Optional[datetime] = None,
+                  backend: Optional[str] = None) -> IngestResult:
+    archive = PageArchive(archive_dir)
+    database = PooledDatabase()
+    await database.connect()
+    area_stats = AreaStatisticsRefresher(database)
+    total = IngestResult()
+    started = time.perf_counter()
+    try:
+        for batch in batched(iter_archived_listings(archive, since, backend), batch_size):
+            result = await ingest_listings(database, batch, refresh=True)
+            area_stats.track(result)
+            result.rows = []
+            total.merge(result)
+        await area_stats.flush()
+    finally:
+        await database.disconnect()
+
+    elapsed = time.perf_counter() - started
+    logger.info(
+        f"Yeniden parse tamamlandı: {total.inserted} yeni, {total.updated} güncellendi, "
+        f"{total.unchanged} değişmedi, {total.skipped} atlandı ({elapsed:.1f} sn)"
+    )
+    return total
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="İlanları sayfa arşivinden yeniden oluştur")
+    arg_parser.add_argument('--archive-dir', default=PAGE_ARCHIVE_DIR)
+    arg_parser.add_argument('--since', type=datetime.fromisoformat,
+                            help="Sadece bu tarihten sonra çekilen sayfalar (YYYY-MM-DD)")
+    arg_parser.add_argument('--batch-size', type=int, default=1000)
+    arg_parser.add_argument('--backend', choices=available_backends())
+    args = arg_parser.parse_args()
+
+    since = args.since
+    if since and since.tzinfo is None:
+        since = since.replace(tzinfo=timezone.utc)
+    asyncio.run(reparse(args.archive_dir, args.batch_size, since, args.backend))
+
+
+if __name__ == "__main__":
+    main()
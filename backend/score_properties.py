@@ -0,0 +1,445 @@
+"""İlanların tahmini fiyatını, bölge alanlarını ve puanlarını toplu hesapla.
+
+Kullanım (cron ile):
+    python score_properties.py [--full] [--model rules|ml] [--chunk-size 5000]
+
+``properties`` tablosundaki şu kolonlar doldurulur:
+
+- ``predicted_price``: ``rules`` yolunda değerlemedeki mahalle/ilçe
+  ağırlıkları ve yaş/metrekare faktörleri, ``ml`` yolunda eğitilmiş model
+- ``area_avg_price``, ``area_price_trend``: mahallenin son 6 aylık m² fiyatı
+  ortalaması ve gözlenen fiyatlardaki 6 aylık trendi (mahalle verisi yoksa
+  ilçeninki)
+- ``price_trend``: ilanın fiyatının 6 ay önceki fiyatına göre değişimi
+  (``price_history``)
+- ``investment_score``: tahmini fiyata göre iskonto ve bölge trendi
+- ``location_score``: mahallenin m² fiyatının şehirdeki sırası ve ilan yoğunluğu
+- ``property_score``: değerlemedeki yaş ve metrekare faktörlerinin çarpımı
+- ``overall_score``: üç puanın ağırlıklı ortalaması
+
+Bölge özetleri ``area_monthly_stats``'tan çalışma başında bir kez okunur;
+ilanlar id sırasıyla parçalar halinde okunup pandas/NumPy ile hesaplanır ve
+her parça tek bir ``UPDATE ... FROM unnest(...)`` ifadesiyle yazılır. Değeri
+değişmeyen satırlara yazılmaz.
+
+Artımlı modda (varsayılan) sadece son tamamlanan çalışmanın başlangıcından
+sonra ``updated_at``'i ilerleyen ilanlar, aylık özeti değişen bir mahalleyle
+aynı ilçedeki ilanlar (tahmini fiyat ve bölge alanları ilçe ortalamasını
+kullanır) ve konum puanı değişen ilanlar puanlanır. Konum puanı mahallenin
+şehirdeki sırasına bağlı olduğundan, değişen şehirlerin bütün mahallelerinin
+yeni puanları kayıtlı puanlarla karşılaştırılır. İlk çalışmada, model değiştiğinde veya
+yeni bir aya girildiğinde (6 aylık pencere kaydığı için) tam yeniden
+hesaplama yapılır.
+"""
+import argparse
+import asyncio
+import logging
+import os
+import time
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from databases import Database
+from dotenv import load_dotenv
+
+from area_monthly import TREND_MONTHS_SQL, WINDOW_MONTHS
+from db import PooledDatabase
+from price_history import add_months
+from valuation import (DISTRICT_WEIGHT, NEIGHBORHOOD_WEIGHT, VALUATION_MODE, VALUATION_MODES,
+                       age_factors, select_model, size_factors)
+from valuation_model import ValuationModel, model_store
+
+load_dotenv()
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+SCORING_CHUNK_SIZE = int(os.getenv("SCORING_CHUNK_SIZE", "5000"))
+
+# Tahmini fiyatın %20 altındaki ilan 100, %20 üstündeki 0 değer puanı alır
+VALUE_SCORE_SLOPE = 250
+# Bölgede 6 ayda %10 artış 100, %10 düşüş 0 trend puanı
+TREND_SCORE_SLOPE = 5
+INVESTMENT_WEIGHTS = (0.7, 0.3)  # değer, trend
+LOCATION_WEIGHTS = (0.7, 0.3)  # şehirdeki fiyat sırası, ilan yoğunluğu
+# Güven skorundaki gibi 50 ilan ve üstü tam yoğunluk sayılır
+LOCATION_FULL_LISTINGS = 50
+OVERALL_WEIGHTS = (0.4, 0.3, 0.3)  # yatırım, konum, emlak
+
+# Yaş/metrekare faktörü çarpımının aralığı: eski ve büyük ... sıfır ve küçük
+PROPERTY_FACTOR_RANGE = (
+    float(age_factors(25) * size_factors(250)),
+    float(age_factors(0) * size_factors(50)),
+)
+
+# DECIMAL(5, 2) kolonlarının sınırı
+TREND_LIMIT = 999.99
+
+# Pencere ayları (series = 'listings') ve trend için gözlenen fiyat satırları
+# (series = 'prices'); bkz. area_monthly.DISTRICT_MONTHS_QUERY
+AREA_WINDOW_QUERY = f"""
+    SELECT
+        'listings' AS series,
+        city, district, neighborhood, month, listings,
+        price_per_sqm_sum::float8 AS price_per_sqm_sum, price_per_sqm_count,
+        date_trunc('month', NOW())::date AS current_month
+    FROM area_monthly_stats
+    WHERE month > (date_trunc('month', NOW()) - INTERVAL '{WINDOW_MONTHS} months')::date
+    UNION ALL
+    SELECT
+        'prices' AS series,
+        city, district, neighborhood, month, listings,
+        price_per_sqm_sum::float8 AS price_per_sqm_sum, price_per_sqm_count,
+        date_trunc('month', NOW())::date AS current_month
+    FROM area_price_monthly
+    WHERE month IN ({TREND_MONTHS_SQL})
+"""
+
+LAST_RUN_QUERY = """
+    SELECT
+        started_at, model,
+        date_trunc('month', started_at) = date_trunc('month', NOW()) AS same_month
+    FROM property_scoring_runs
+    WHERE finished_at IS NOT NULL
+    ORDER BY started_at DESC
+    LIMIT 1
+"""
+
+START_RUN_QUERY = """
+    INSERT INTO property_scoring_runs (mode, model) VALUES ($1, $2)
+    RETURNING id, started_at
+"""
+
+FINISH_RUN_QUERY = """
+    UPDATE property_scoring_runs
+    SET finished_at = NOW(), scored = $2, updated = $3
+    WHERE id = $1
+"""
+
+CHUNK_COLUMNS = """
+    id, price::float8 AS price, square_meters::float8 AS square_meters, building_age,
+    city, district, COALESCE(neighborhood, '') AS neighborhood, property_type
+"""
+
+FULL_CHUNK_QUERY = f"""
+    SELECT {CHUNK_COLUMNS}
+    FROM properties
+    WHERE id > $1
+    ORDER BY id
+    LIMIT $2
+"""
+
+IDS_CHUNK_QUERY = f"""
+    SELECT {CHUNK_COLUMNS}
+    FROM properties
+    WHERE id = ANY($1::int[])
+    ORDER BY id
+"""
+
+CHANGED_CITIES_QUERY = """
+    SELECT DISTINCT city FROM area_monthly_stats WHERE updated_at >= $1
+"""
+
+# Değişen ilanlar, aylık özeti veya gözlenen fiyatları değişen ilçelerin ilanları ve kayıtlı konum
+# puanı mahallenin yeni puanından farklı olan ilanlar
+CHANGED_IDS_QUERY = """
+    SELECT id FROM properties WHERE updated_at >= $1
+    UNION
+    SELECT p.id
+    FROM properties p
+    JOIN (
+        SELECT city, district FROM area_monthly_stats WHERE updated_at >= $1
+        UNION
+        SELECT city, district FROM area_price_monthly WHERE updated_at >= $1
+    ) a USING (city, district)
+    UNION
+    SELECT p.id
+    FROM properties p
+    JOIN unnest($2::text[], $3::text[], $4::text[], $5::int[])
+        AS l(city, district, neighborhood, location_score)
+        ON p.city = l.city AND p.district = l.district AND p.neighborhood = l.neighborhood
+    WHERE p.location_score IS DISTINCT FROM l.location_score
+    ORDER BY id
+"""
+
+# Her ilanın pencere başındaki fiyatı: pencereden önceki son kayıt, yoksa
+# penceredeki ilk kayıt
+PRICE_BASELINE_QUERY = """
+    SELECT DISTINCT ON (property_id) property_id, price::float8 AS price
+    FROM price_history
+    WHERE property_id = ANY($1::int[])
+    ORDER BY
+        property_id,
+        recorded_at >= NOW() - make_interval(months => $2),
+        CASE WHEN recorded_at < NOW() - make_interval(months => $2) THEN recorded_at END DESC NULLS LAST,
+        recorded_at
+"""
+
+SCORE_COLUMNS = (
+    'predicted_price', 'price_trend', 'area_avg_price', 'area_price_trend',
+    'investment_score', 'location_score', 'property_score', 'overall_score',
+)
+
+# Sadece değeri değişen satırlar yazılır
+UPDATE_QUERY = """
+    WITH scores AS (
+        SELECT
+            id,
+            predicted_price::numeric(15, 2) AS predicted_price,
+            price_trend::numeric(5, 2) AS price_trend,
+            area_avg_price::numeric(15, 2) AS area_avg_price,
+            area_price_trend::numeric(5, 2) AS area_price_trend,
+            investment_score, location_score, property_score, overall_score
+        FROM unnest(
+            $1::int[], $2::float8[], $3::float8[], $4::float8[], $5::float8[],
+            $6::int[], $7::int[], $8::int[], $9::int[]
+        ) AS s(
+            id, predicted_price, price_trend, area_avg_price, area_price_trend,
+            investment_score, location_score, property_score, overall_score
+        )
+    )
+    UPDATE properties p SET
+        predicted_price = s.predicted_price,
+        price_trend = s.price_trend,
+        area_avg_price = s.area_avg_price,
+        area_price_trend = s.area_price_trend,
+        investment_score = s.investment_score,
+        location_score = s.location_score,
+        property_score = s.property_score,
+        overall_score = s.overall_score
+    FROM scores s
+    WHERE p.id = s.id
+      AND (p.predicted_price, p.price_trend, p.area_avg_price, p.area_price_trend,
+           p.investment_score, p.location_score, p.property_score, p.overall_score)
+          IS DISTINCT FROM
+          (s.predicted_price, s.price_trend, s.area_avg_price, s.area_price_trend,
+           s.investment_score, s.location_score, s.property_score, s.overall_score)
+"""
+
+NEIGHBORHOOD_KEY = ['city', 'district', 'neighborhood']
+DISTRICT_KEY = ['city', 'district']
+
+
+def _averages(frame: pd.DataFrame, keys: List[str]) -> pd.Series:
+    totals = frame.groupby(keys)[['price_per_sqm_sum', 'price_per_sqm_count']].sum()
+    return totals['price_per_sqm_sum'] / totals['price_per_sqm_count'].where(totals['price_per_sqm_count'] > 0)
+
+
+def _summarize(frame: pd.DataFrame, keys: List[str]) -> pd.DataFrame:
+    """``area_monthly.summarize_area`` ile aynı tanımlar, bütün bölgeler için"""
+    current = frame['current_month'].iloc[0]
+    trend_start = add_months(current, -WINDOW_MONTHS)
+    window = frame[(frame['series'] == 'listings') & (frame['month'] > trend_start)]
+    prices = frame[frame['series'] == 'prices']
+
+    summary = pd.DataFrame({
+        'avg_price': _averages(window, keys),
+        'listings': window.groupby(keys)['listings'].sum(),
+    })
+    last_month = _averages(prices[prices['month'] == current], keys).reindex(summary.index)
+    six_months_ago = _averages(prices[prices['month'] == trend_start], keys).reindex(summary.index)
+    trend = (last_month - six_months_ago) / six_months_ago.where(six_months_ago != 0) * 100
+    summary['trend'] = trend.fillna(0)
+    return summary
+
+
+def area_frames(records) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """Mahalle ve ilçe özetleri; mahallelerde konum puanı da hesaplanır"""
+    frame = pd.DataFrame([dict(record) for record in records])
+    if frame.empty:
+        empty = pd.DataFrame(columns=['avg_price', 'listings', 'trend', 'location_score'])
+        return (
+            empty.set_index(pd.MultiIndex.from_arrays([[], [], []], names=NEIGHBORHOOD_KEY)),
+            empty.set_index(pd.MultiIndex.from_arrays([[], []], names=DISTRICT_KEY)),
+        )
+
+    neighborhoods = _summarize(frame, NEIGHBORHOOD_KEY)
+    price_rank = neighborhoods.groupby(level='city')['avg_price'].rank(pct=True)
+    density = neighborhoods['listings'].clip(upper=LOCATION_FULL_LISTINGS) / LOCATION_FULL_LISTINGS
+    neighborhoods['location_score'] = 100 * (
+        LOCATION_WEIGHTS[0] * price_rank + LOCATION_WEIGHTS[1] * density
+    )
+    return neighborhoods, _summarize(frame, DISTRICT_KEY)
+
+
+def weighted_score(components: List[np.ndarray], weights: Tuple[float, ...]) -> np.ndarray:
+    """Eksik (NaN) bileşenler atlanarak ağırlıklı ortalama"""
+    values = np.column_stack(components)
+    present = ~np.isnan(values)
+    weights = np.asarray(weights, dtype=np.float64)
+    total = np.where(present, values, 0) @ weights
+    weight_sum = present @ weights
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(weight_sum > 0, total / weight_sum, np.nan)
+
+
+def score_chunk(chunk: pd.DataFrame, neighborhoods: pd.DataFrame, districts: pd.DataFrame,
+                baselines: Dict[int, float], model: Optional[ValuationModel] = None) -> pd.DataFrame:
+    """Bir parça ilanın bütün kolonlarını vektörel olarak hesapla"""
+    neighborhood = chunk.join(neighborhoods.add_prefix('neighborhood_'), on=NEIGHBORHOOD_KEY)
+    district = chunk.join(districts.add_prefix('district_'), on=DISTRICT_KEY)
+    neighborhood_avg = neighborhood['neighborhood_avg_price'].to_numpy(dtype=np.float64)
+    district_avg = district['district_avg_price'].to_numpy(dtype=np.float64)
+    area_avg_price = np.where(np.isnan(neighborhood_avg), district_avg, neighborhood_avg)
+    area_price_trend = np.where(
+        np.isnan(neighborhood_avg),
+        district['district_trend'].to_numpy(dtype=np.float64),
+        neighborhood['neighborhood_trend'].to_numpy(dtype=np.float64),
+    )
+
+    price = chunk['price'].to_numpy(dtype=np.float64)
+    square_meters = chunk['square_meters'].to_numpy(dtype=np.float64)
+    building_age = chunk['building_age'].to_numpy(dtype=np.float64)
+    factors = age_factors(building_age) * size_factors(square_meters)
+
+    if model is not None:
+        predicted_price = model.predict_prices(list(chunk.itertuples(index=False)))
+    else:
+        # Değerlemedeki gibi mahalle verisi olmayan ilanda tahmin yapılmaz
+        base_sqm_price = neighborhood_avg * NEIGHBORHOOD_WEIGHT + district_avg * DISTRICT_WEIGHT
+        predicted_price = base_sqm_price * factors * square_meters
+
+    baseline = chunk['id'].map(baselines).to_numpy(dtype=np.float64)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        price_trend = np.where(baseline > 0, (price - baseline) / baseline * 100, np.nan)
+        discount = (predicted_price - price) / predicted_price
+
+    value_score = np.clip(50 + VALUE_SCORE_SLOPE * discount, 0, 100)
+    trend_score = np.clip(50 + TREND_SCORE_SLOPE * area_price_trend, 0, 100)
+    investment_score = weighted_score([value_score, trend_score], INVESTMENT_WEIGHTS)
+    location_score = neighborhood['neighborhood_location_score'].to_numpy(dtype=np.float64)
+    low, high = PROPERTY_FACTOR_RANGE
+    property_score = np.clip((factors - low) / (high - low) * 100, 0, 100)
+    overall_score = weighted_score([investment_score, location_score, property_score], OVERALL_WEIGHTS)
+
+    return pd.DataFrame({
+        'id': chunk['id'].to_numpy(),
+        'predicted_price': np.round(predicted_price, 2),
+        'price_trend': np.round(np.clip(price_trend, -TREND_LIMIT, TREND_LIMIT), 2),
+        'area_avg_price': np.round(area_avg_price, 2),
+        'area_price_trend': np.round(np.clip(area_price_trend, -TREND_LIMIT, TREND_LIMIT), 2),
+        'investment_score': np.round(investment_score),
+        'location_score': np.round(location_score),
+        'property_score': np.round(property_score),
+        'overall_score': np.round(overall_score),
+    })
+
+
+def location_args(neighborhoods: pd.DataFrame, cities: List[str]) -> List[List]:
+    """Şehirlerdeki mahallelerin yuvarlanmış konum puanları (unnest kolonları)"""
+    in_cities = neighborhoods.index.get_level_values('city').isin(cities)
+    scores = neighborhoods.loc[in_cities, 'location_score'].astype(np.float64).dropna().round()
+    return [
+        scores.index.get_level_values(level).tolist() for level in NEIGHBORHOOD_KEY
+    ] + [scores.astype(int).tolist()]
+
+
+def _column(values: np.ndarray, integer: bool) -> List:
+    """NaN'ları NULL'a çevir (NUMERIC kolonlarda NaN geçerli bir değerdir)"""
+    if integer:
+        return [None if np.isnan(value) else int(value) for value in values]
+    return [None if np.isnan(value) else float(value) for value in values]
+
+
+def update_args(scores: pd.DataFrame) -> List[List]:
+    return [scores['id'].astype(int).tolist()] + [
+        _column(scores[name].to_numpy(dtype=np.float64), name.endswith('_score'))
+        for name in SCORE_COLUMNS
+    ]
+
+
+def chunk_frame(records) -> pd.DataFrame:
+    frame = pd.DataFrame([dict(record) for record in records])
+    frame['building_age'] = pd.to_numeric(frame['building_age'], errors='coerce')
+    return frame
+
+
+async def fetch_chunks(raw, since, chunk_size: int, neighborhoods: pd.DataFrame) -> AsyncIterator[List]:
+    """Tam modda bütün ilanlar id sırasıyla, artımlı modda değişenler"""
+    if since is None:
+        last_id = 0
+        while True:
+            records = await raw.fetch(FULL_CHUNK_QUERY, last_id, chunk_size)
+            if not records:
+                return
+            yield records
+            last_id = records[-1]['id']
+    else:
+        cities = [record['city'] for record in await raw.fetch(CHANGED_CITIES_QUERY, since)]
+        ids = [
+            record['id']
+            for record in await raw.fetch(CHANGED_IDS_QUERY, since, *location_args(neighborhoods, cities))
+        ]
+        logger.info(f"Artımlı puanlama: {len(ids)} ilan değişmiş")
+        for start in range(0, len(ids), chunk_size):
+            yield await raw.fetch(IDS_CHUNK_QUERY, ids[start:start + chunk_size])
+
+
+async def score_properties(db: Database, full: bool = False, model: Optional[ValuationModel] = None,
+                           chunk_size: int = SCORING_CHUNK_SIZE) -> Dict:
+    model_name = f"ml:{model.version}" if model else 'rules'
+    async with db.connection() as connection:
+        raw = connection.raw_connection
+        since = None
+        if not full:
+            last_run = await raw.fetchrow(LAST_RUN_QUERY)
+            if last_run is None:
+                logger.info("Önceki puanlama bulunamadı, tam hesaplama yapılıyor")
+            elif last_run['model'] != model_name:
+                logger.info(f"Model değişmiş ({last_run['model']} -> {model_name}), tam hesaplama yapılıyor")
+            elif not last_run['same_month']:
+                logger.info("Yeni aya girildi, tam hesaplama yapılıyor")
+            else:
+                since = last_run['started_at']
+        mode = 'full' if since is None else 'incremental'
+
+        run = await raw.fetchrow(START_RUN_QUERY, mode, model_name)
+        neighborhoods, districts = area_frames(await raw.fetch(AREA_WINDOW_QUERY))
+        started = time.perf_counter()
+        scored = updated = 0
+        async for records in fetch_chunks(raw, since, chunk_size, neighborhoods):
+            if not records:
+                continue
+            chunk = chunk_frame(records)
+            baselines = {
+                record['property_id']: record['price']
+                for record in await raw.fetch(PRICE_BASELINE_QUERY, chunk['id'].tolist(), WINDOW_MONTHS)
+            }
+            scores = score_chunk(chunk, neighborhoods, districts, baselines, model)
+            status = await raw.execute(UPDATE_QUERY, *update_args(scores))
+            scored += len(chunk)
+            updated += int(status.split()[-1])
+            logger.info(f"Puanlanan ilan: {scored} ({updated} güncellendi)")
+
+        await raw.execute(FINISH_RUN_QUERY, run['id'], scored, updated)
+
+    elapsed = time.perf_counter() - started
+    logger.info(
+        f"Puanlama tamamlandı ({mode}, {model_name}): {scored} ilan, {updated} güncellendi "
+        f"({elapsed:.1f} sn, {scored / elapsed if elapsed else 0:.0f} ilan/sn)"
+    )
+    return {'mode': mode, 'model': model_name, 'scored': scored, 'updated': updated}
+
+
+async def main(full: bool, mode: Optional[str], chunk_size: int):
+    if (mode or VALUATION_MODE) == 'ml':
+        model_store.load()
+    model = select_model(mode)
+    database = PooledDatabase()
+    await database.connect()
+    try:
+        await score_properties(database, full, model, chunk_size)
+    finally:
+        await database.disconnect()
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description="İlanların tahmini fiyatını ve puanlarını hesapla")
+    arg_parser.add_argument('--full', action='store_true', help="Bütün ilanları yeniden puanla")
+    arg_parser.add_argument('--model', choices=VALUATION_MODES,
+                            help="Tahmini fiyat yolu (verilmezse VALUATION_MODE)")
+    arg_parser.add_argument('--chunk-size', type=int, default=SCORING_CHUNK_SIZE)
+    args = arg_parser.parse_args()
+
+    asyncio.run(main(args.full, args.model, args.chunk_size))
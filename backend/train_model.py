@@ -0,0 +1,241 @@
+"""Değerleme modelini ``properties`` tablosundan eğit ve sürümlü dosyaya yaz.
+
+Kullanım:
+    python train_model.py [--holdout 0.2] [--no-refit] [--model-dir models]
+
+İlanlar ilan tarihine göre sıralanır ve en yeni ``--holdout`` oranı ayrılır;
+model eski ilanlarla eğitilip ayrılan ilanlarda ölçülür (ortalama mutlak
+hata, ortalama/medyan yüzde hata, %10 ve %20 içinde kalan tahminler). Aynı
+ilanlardaki göreli hata fiyat aralığını belirler. Ölçümden sonra model,
+varsayılan olarak en yeni ilanları da görmesi için bütün ilanlarla yeniden
+eğitilir (``--no-refit`` ile ölçülen model yazılır).
+
+Emlak tipi ve bölge kodlamaları eğitim satırlarında k-katlı hesaplanır: her
+satırın emlak tipi/mahalle/ilçe ortalamasına kendi fiyatı dahil edilmez.
+"""
+import argparse
+import asyncio
+import logging
+from pathlib import Path
+from typing import Dict, Tuple
+
+import numpy as np
+import pandas as pd
+from dotenv import load_dotenv
+from sklearn import __version__ as sklearn_version
+from sklearn.ensemble import HistGradientBoostingRegressor
+
+from valuation_model import (ENCODING_SMOOTHING, VALUATION_MODEL_DIR, encode_areas,
+                             encode_property_types, feature_matrix, month_number, new_version,
+                             save_model)
+
+load_dotenv()
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+TRAINING_QUERY = """
+    SELECT city, district, COALESCE(neighborhood, '') AS neighborhood, property_type,
+        square_meters::float8 AS square_meters, building_age,
+        price::float8 AS price, created_at
+    FROM properties
+    WHERE price > 0 AND square_meters > 0
+      AND city IS NOT NULL AND district IS NOT NULL
+"""
+
+ENCODING_FOLDS = 5
+# Aralık dışındaki m² fiyatları (hatalı girilmiş ilanlar) eğitime alınmaz
+OUTLIER_QUANTILES = (0.005, 0.995)
+INTERVAL_QUANTILES = (0.1, 0.9)
+
+Encoded = Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]
+
+
+def prepare_frame(records) -> pd.DataFrame:
+    frame = pd.DataFrame([dict(record) for record in records])
+    frame['neighborhood'] = frame['neighborhood'].fillna('')
+    frame['property_type'] = frame['property_type'].fillna('')
+    frame['building_age'] = pd.to_numeric(frame['building_age'], errors='coerce')
+    frame['price_per_sqm'] = frame['price'] / frame['square_meters']
+    low, high = frame['price_per_sqm'].quantile(list(OUTLIER_QUANTILES))
+    frame = frame[(frame['price_per_sqm'] >= low) & (frame['price_per_sqm'] <= high)]
+    frame = frame.sort_values('created_at', kind='stable').reset_index(drop=True)
+    frame['log_sqm_price'] = np.log(frame['price_per_sqm'])
+    frame['month'] = [month_number(created_at) for created_at in frame['created_at']]
+    return frame
+
+
+def target_encodings(frame: pd.DataFrame) -> Dict:
+    """Emlak tipi, ilçe ve mahallelerin log m² fiyatı ortalamaları (üst gruba çekilmiş)"""
+    global_price = float(frame['log_sqm_price'].mean())
+
+    property_types = frame.groupby('property_type')['log_sqm_price'].agg(['sum', 'count'])
+    property_type_price = (
+        (property_types['sum'] + ENCODING_SMOOTHING * global_price)
+        / (property_types['count'] + ENCODING_SMOOTHING)
+    )
+
+    districts = frame.groupby(['city', 'district'])['log_sqm_price'].agg(['sum', 'count'])
+    district_price = (
+        (districts['sum'] + ENCODING_SMOOTHING * global_price)
+        / (districts['count'] + ENCODING_SMOOTHING)
+    )
+
+    neighborhoods = frame.groupby(['city', 'district', 'neighborhood'])['log_sqm_price'].agg(['sum', 'count'])
+    parent = district_price.reindex(neighborhoods.index.droplevel(2)).to_numpy()
+    neighborhood_price = (
+        (neighborhoods['sum'].to_numpy() + ENCODING_SMOOTHING * parent)
+        / (neighborhoods['count'].to_numpy() + ENCODING_SMOOTHING)
+    )
+
+    return {
+        'global_price': global_price,
+        'property_type_price': {key: float(value) for key, value in property_type_price.items()},
+        'district_price': {key: float(value) for key, value in district_price.items()},
+        'neighborhood_price': {
+            key: float(value) for key, value in zip(neighborhoods.index, neighborhood_price)
+        },
+        'neighborhood_listings': {key: int(value) for key, value in neighborhoods['count'].items()},
+    }
+
+
+def encode_frame(frame: pd.DataFrame, encodings: Dict) -> Encoded:
+    return (
+        encode_property_types(encodings, frame['property_type']),
+        *encode_areas(encodings, frame['city'], frame['district'], frame['neighborhood']),
+    )
+
+
+def out_of_fold_encodings(frame: pd.DataFrame, seed: int) -> Encoded:
+    """Her satırın kodlamaları, o satırı içermeyen katlardan"""
+    folds = np.random.default_rng(seed).integers(0, ENCODING_FOLDS, len(frame))
+    columns = [np.empty(len(frame)) for _ in range(4)]
+    for fold in range(ENCODING_FOLDS):
+        held = folds == fold
+        if not held.any():
+            continue
+        encoded = encode_frame(frame[held], target_encodings(frame[~held]))
+        for column, values in zip(columns, encoded):
+            column[held] = values
+    return tuple(columns)
+
+
+def training_matrix(frame: pd.DataFrame, encoded: Encoded) -> np.ndarray:
+    property_type_price, district_price, neighborhood_price, listings = encoded
+    return feature_matrix({
+        'square_meters': frame['square_meters'],
+        'building_age': frame['building_age'],
+        'property_type_price': property_type_price,
+        'district_price': district_price,
+        'neighborhood_price': neighborhood_price,
+        'neighborhood_listings': listings,
+        'month': frame['month'],
+    })
+
+
+def fit(frame: pd.DataFrame, seed: int) -> Tuple[HistGradientBoostingRegressor, Dict]:
+    estimator = HistGradientBoostingRegressor(
+        learning_rate=0.05,
+        max_iter=500,
+        max_leaf_nodes=31,
+        min_samples_leaf=20,
+        l2_regularization=1.0,
+        early_stopping=True,
+        validation_fraction=0.1,
+        n_iter_no_change=20,
+        random_state=seed,
+    )
+    estimator.fit(
+        training_matrix(frame, out_of_fold_encodings(frame, seed)),
+        frame['log_sqm_price'].to_numpy(),
+    )
+    return estimator, target_encodings(frame)
+
+
+def price_errors(actual: np.ndarray, predicted: np.ndarray) -> Dict:
+    ape = np.abs(predicted - actual) / actual
+    return {
+        'listings': int(len(actual)),
+        'mae': round(float(np.mean(np.abs(predicted - actual))), 2),
+        'mape': round(float(np.mean(ape)) * 100, 2),
+        'median_ape': round(float(np.median(ape)) * 100, 2),
+        'within_10pct': round(float(np.mean(ape <= 0.10)) * 100, 2),
+        'within_20pct': round(float(np.mean(ape <= 0.20)) * 100, 2),
+    }
+
+
+def predict_frame(estimator, encodings: Dict, frame: pd.DataFrame) -> np.ndarray:
+    """Ayrılan ilanların fiyat tahmini (her ilan kendi ayıyla)"""
+    features = training_matrix(frame, encode_frame(frame, encodings))
+    return np.exp(estimator.predict(features)) * frame['square_meters'].to_numpy()
+
+
+def train(frame: pd.DataFrame, holdout: float = 0.2, refit: bool = True, seed: int = 42) -> Dict:
+    """Zamana göre ayrılan ilanlarda ölç, modeli ve ölçümleri içeren dosya içeriğini döndür"""
+    cutoff = int(len(frame) * (1 - holdout))
+    train_frame, test_frame = frame.iloc[:cutoff], frame.iloc[cutoff:]
+    if train_frame.empty or test_frame.empty:
+        raise ValueError(f"Eğitim için yeterli ilan yok ({len(frame)})")
+
+    logger.info(f"Model eğitiliyor: {len(train_frame)} eğitim, {len(test_frame)} ayrılmış ilan")
+    estimator, encodings = fit(train_frame, seed)
+    actual = test_frame['price'].to_numpy()
+    predicted = predict_frame(estimator, encodings, test_frame)
+    metrics = price_errors(actual, predicted)
+    residuals = np.log(actual / predicted)
+    interval = tuple(float(q) for q in np.quantile(residuals, INTERVAL_QUANTILES))
+    logger.info(
+        f"Ayrılmış ilanlarda hata: MAPE %{metrics['mape']}, medyan %{metrics['median_ape']}, "
+        f"%10 içinde %{metrics['within_10pct']}"
+    )
+
+    if refit:
+        logger.info(f"Model bütün ilanlarla yeniden eğitiliyor ({len(frame)})")
+        estimator, encodings = fit(frame, seed)
+
+    return {
+        'version': new_version(),
+        'trained_at': pd.Timestamp.now(tz='UTC').isoformat(),
+        'sklearn_version': sklearn_version,
+        'rows': int(len(frame) if refit else len(train_frame)),
+        'holdout_from': test_frame['created_at'].iloc[0].isoformat(),
+        'model': estimator,
+        'encodings': encodings,
+        'interval': interval,
+        'metrics': metrics,
+    }
+
+
+async def load_frame() -> pd.DataFrame:
+    from db import PooledDatabase
+
+    database = PooledDatabase()
+    await database.connect()
+    try:
+        async with database.connection() as connection:
+            records = await connection.raw_connection.fetch(TRAINING_QUERY)
+    finally:
+        await database.disconnect()
+    if not records:
+        raise ValueError("properties tablosunda eğitilecek ilan yok")
+    return prepare_frame(records)
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Değerleme modelini eğit")
+    arg_parser.add_argument('--holdout', type=float, default=0.2,
+                            help="Ölçüm için ayrılan en yeni ilanların oranı")
+    arg_parser.add_argument('--no-refit', action='store_true',
+                            help="Ölçülen modeli bütün ilanlarla yeniden eğitmeden yaz")
+    arg_parser.add_argument('--model-dir', type=Path, default=VALUATION_MODEL_DIR)
+    arg_parser.add_argument('--seed', type=int, default=42)
+    args = arg_parser.parse_args()
+
+    frame = asyncio.run(load_frame())
+    artifact = train(frame, args.holdout, refit=not args.no_refit, seed=args.seed)
+    path = save_model(artifact, args.model_dir)
+    logger.info(f"Model kaydedildi: {path} (sürüm {artifact['version']})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,292 @@
+"""Emlak değerlemesi: tekli ve toplu (portföy) tahmin.
+
+Tekli değerlemede emsaller ve bölge özetleri ``valuation_cache`` üzerinden
+okunur. Toplu değerlemede istekler (şehir, ilçe) bazında gruplanır; her
+ilçenin emsal indeksi ve aylık bölge satırları bir kez yüklenir, gruptaki
+bütün birimler tek bir vektörel geçişte puanlanır ve seçilen emsallerin
+satırları tek sorguda okunur. Bir birimin hatası (ör. "Benzer emlak
+bulunamadı") sadece o birimin sonucuna yazılır.
+
+Tahmini fiyat iki yoldan biriyle hesaplanır: ``rules`` mahalle/ilçe m²
+fiyatı ortalamalarını yaş ve metrekare bantlarıyla düzeltir, ``ml`` ise
+``train_model.py`` ile eğitilmiş modeli kullanır (bkz. ``valuation_model``).
+Emsaller, bölge özetleri ve güven skoru iki yolda da aynıdır.
+"""
+import logging
+import os
+from collections import OrderedDict
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+import numpy as np
+from databases import Database
+from dotenv import load_dotenv
+from pydantic import BaseModel, ValidationError
+
+from area_monthly import area_price_summary, fetch_district_months, summarize_area
+from codec import property_rows
+from comparables import comparables_index
+from valuation_cache import valuation_cache, valuation_key
+from valuation_model import Prediction, ValuationModel, model_store
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+COMPARABLES_K = 10
+
+# İstekte model belirtilmezse kullanılan yol
+VALUATION_MODE = os.getenv("VALUATION_MODE", "rules")
+VALUATION_MODES = ('rules', 'ml')
+
+NEIGHBORHOOD_WEIGHT = 0.6
+DISTRICT_WEIGHT = 0.4
+
+
+class ValuationRequest(BaseModel):
+    city: str
+    district: str
+    neighborhood: str
+    square_meters: float
+    building_age: int
+    property_type: str
+    room_count: Optional[str]
+    floor: Optional[int]
+    total_floors: Optional[int]
+
+
+class ValuationError(Exception):
+    """Bu istek için değerleme yapılamıyor (istemci hatası)"""
+
+
+class ModelUnavailable(Exception):
+    """``ml`` istendi ama yüklü model yok"""
+
+
+def select_model(mode: Optional[str]) -> Optional[ValuationModel]:
+    """İstenen değerleme yolu; ``rules`` için None.
+
+    Varsayılan ``ml`` olup model yüklenemediyse kural tabanlı yola düşülür;
+    istekte açıkça ``ml`` istendiyse ``ModelUnavailable`` yükseltilir.
+    """
+    selected = mode or VALUATION_MODE
+    if selected not in VALUATION_MODES:
+        raise ValuationError(f"Geçersiz model: {selected} ({'|'.join(VALUATION_MODES)})")
+    if selected == 'rules':
+        return None
+    if model_store.current is None and mode:
+        raise ModelUnavailable("Değerleme modeli yüklü değil")
+    return model_store.current
+
+
+def age_factors(building_age) -> np.ndarray:
+    """Bina yaşı faktörü; tek değer veya dizi (bilinmeyen yaş NaN, faktör 1.0)"""
+    age = np.asarray(building_age, dtype=np.float64)
+    return np.select(
+        [age == 0, age < 5, age < 10, age > 20, age > 30],
+        [
+            1.15,  # Sıfır bina primi
+            1.10,
+            1.05,
+            0.95,
+            0.90,
+        ],
+        1.0
+    )
+
+
+def size_factors(square_meters) -> np.ndarray:
+    """Metrekare faktörü (büyük dairelerde m² başına fiyat düşer)"""
+    sqm = np.asarray(square_meters, dtype=np.float64)
+    return np.select([sqm > 200, sqm > 150, sqm < 80], [0.90, 0.95, 1.05], 1.0)
+
+
+def rules_sqm_price(area_stats: Dict, building_age: int, square_meters: float) -> Tuple[float, float]:
+    """Kural tabanlı m² fiyatı: (bölge taban fiyatı, yaş ve metrekareyle düzeltilmiş fiyat)"""
+    # Temel değer hesaplama
+    base_sqm_price = (
+        float(area_stats['neighborhood_avg_price']) * NEIGHBORHOOD_WEIGHT +
+        float(area_stats['district_avg_price']) * DISTRICT_WEIGHT
+    )
+    factor = float(age_factors(building_age)) * float(size_factors(square_meters))
+    return base_sqm_price, base_sqm_price * factor
+
+
+def estimate(request: ValuationRequest, similar_properties: List[Dict], area_stats: Dict,
+             prediction: Optional[Prediction] = None) -> Dict:
+    """Emsaller ve bölge özetlerinden tahmini değer, aralık ve güven skoru"""
+    if not area_stats or not area_stats['neighborhood_avg_price']:
+        raise ValuationError("Bu bölge için yeterli veri bulunmuyor")
+
+    # Benzer emlakların fiyatlarını analiz et
+    similar_prices = [float(p['price']) for p in similar_properties]
+    similar_sqm_prices = [float(p['price_per_sqm']) for p in similar_properties]
+
+    if not similar_prices:
+        raise ValuationError("Benzer emlak bulunamadı")
+
+    base_sqm_price, estimated_sqm_price = rules_sqm_price(
+        area_stats, request.building_age, request.square_meters
+    )
+
+    if prediction is None:
+        # Tahmini değer hesaplama
+        estimated_price = estimated_sqm_price * request.square_meters
+
+        # Fiyat aralığı hesaplama
+        price_range_factor = 0.10  # ±10%
+        if len(similar_properties) < 5:
+            price_range_factor = 0.15  # Daha az veri varsa aralığı genişlet
+
+        price_range = (
+            estimated_price * (1 - price_range_factor),
+            estimated_price * (1 + price_range_factor)
+        )
+        model = 'rules'
+    else:
+        # Model tahmini; aralık modelin ayrılmış ilanlardaki hatasından
+        estimated_price = prediction.price
+        price_range = (prediction.low, prediction.high)
+        model = f"ml:{prediction.version}"
+
+    # Güven skoru hesaplama
+    confidence_score = min(
+        int(
+            # Benzer emlak sayısı (40 puan)
+            (min(len(similar_properties), 10) * 4) +
+            # Mahalle veri sayısı (30 puan)
+            (min(area_stats['neighborhood_listings'], 50) * 0.6) +
+            # Fiyat tutarlılığı (30 puan)
+            (30 * (1 - (max(similar_sqm_prices) - min(similar_sqm_prices)) / base_sqm_price))
+        ),
+        100
+    )
+
+    return {
+        'estimated_price': estimated_price,
+        'price_range': price_range,
+        'confidence_score': confidence_score,
+        'similar_properties': similar_properties,
+        'model': model,
+        'area_stats': {
+            'city': request.city,
+            'district': request.district,
+            'neighborhood': request.neighborhood,
+            'avg_price_per_sqm': float(area_stats['neighborhood_avg_price']),
+            'avg_property_age': float(area_stats['neighborhood_median_price']),
+            'total_listings': int(area_stats['neighborhood_listings']),
+            'price_trend_6m': float(area_stats['price_trend_6m']),
+            'price_trend_1y': float(area_stats['price_trend_1y'])
+        }
+    }
+
+
+async def valuation_inputs(db: Database, request: ValuationRequest) -> Tuple[List[Dict], Dict]:
+    """Emsaller ve bölge özetleri; aynı bantlardaki istekler için önbellekten"""
+    key = valuation_key(
+        request.city, request.district, request.neighborhood,
+        request.property_type, request.square_meters, request.building_age
+    )
+    cached = valuation_cache.get(key)
+    if cached is not None:
+        return cached
+    generation = valuation_cache.generation(key)
+
+    # Bölgedeki benzer özellikteki emlakları bellek içi emsal indeksinden bul
+    similar_properties = await comparables_index.find(
+        db,
+        city=request.city,
+        district=request.district,
+        neighborhood=request.neighborhood,
+        square_meters=request.square_meters,
+        building_age=request.building_age,
+        property_type=request.property_type,
+        k=COMPARABLES_K
+    )
+    # Bölge istatistiklerini önceden hesaplanmış aylık özetlerden al
+    area_stats = await area_price_summary(db, request.city, request.district, request.neighborhood)
+    inputs = (property_rows(similar_properties), area_stats)
+    valuation_cache.put(key, inputs, generation)
+    return inputs
+
+
+async def estimate_value(db: Database, request: ValuationRequest,
+                         model: Optional[ValuationModel] = None) -> Dict:
+    similar_properties, area_stats = await valuation_inputs(db, request)
+    prediction = model.predict_many([request])[0] if model else None
+    return estimate(request, similar_properties, area_stats, prediction)
+
+
+def _item_result(index: int, result: Optional[Dict] = None, error: Optional[str] = None) -> Dict:
+    if error is not None:
+        return {'index': index, 'ok': False, 'error': error}
+    return {'index': index, 'ok': True, 'result': result}
+
+
+async def _estimate_district(db: Database, city: str, district: str,
+                             units: List[Tuple[int, ValuationRequest]],
+                             model: Optional[ValuationModel] = None) -> List[Dict]:
+    """Bir ilçedeki birimleri tek geçişte değerle"""
+    partition = await comparables_index.partition(db, city, district)
+    district_months = await fetch_district_months(db, city, district)
+
+    queries = [
+        {
+            'square_meters': request.square_meters,
+            'building_age': request.building_age,
+            'neighborhood': request.neighborhood,
+            'property_type': request.property_type,
+        }
+        for _, request in units
+    ]
+    best = partition.top_k_many(queries, COMPARABLES_K, comparables_index.since())
+    rows = await comparables_index.fetch_rows(db, {row_id for unit_best in best for row_id, _ in unit_best})
+
+    # Model tahminleri de ilçedeki bütün birimler için tek çağrıda
+    predictions = model.predict_many([request for _, request in units]) if model else [None] * len(units)
+
+    summaries: Dict[str, Dict] = {}
+    results = []
+    for (index, request), unit_best, prediction in zip(units, best, predictions):
+        if request.neighborhood not in summaries:
+            summaries[request.neighborhood] = summarize_area(district_months, request.neighborhood)
+        similar_properties = property_rows(comparables_index.rows_for(unit_best, rows))
+        try:
+            result = estimate(request, similar_properties, summaries[request.neighborhood], prediction)
+        except ValuationError as e:
+            results.append(_item_result(index, error=str(e)))
+            continue
+        except Exception as e:
+            logger.error(f"Birim değerlenemedi ({index}): {str(e)}")
+            results.append(_item_result(index, error="Değerleme hesaplanırken bir hata oluştu"))
+            continue
+        results.append(_item_result(index, result))
+    return results
+
+
+async def estimate_batch(db: Database, items: List[Dict],
+                         model: Optional[ValuationModel] = None) -> AsyncIterator[Dict]:
+    """Portföydeki birimleri değerle; her birimin sonucu hazır oldukça üretilir.
+
+    Sonuçlar istek sırasıyla değil ilçe grupları tamamlandıkça gelir;
+    ``index`` alanı birimin istekteki sırasıdır.
+    """
+    groups: 'OrderedDict[Tuple[str, str], List[Tuple[int, ValuationRequest]]]' = OrderedDict()
+    for index, item in enumerate(items):
+        try:
+            request = ValuationRequest(**item)
+        except (TypeError, ValidationError) as e:
+            yield _item_result(index, error=f"Geçersiz istek: {str(e)}")
+            continue
+        groups.setdefault((request.city, request.district), []).append((index, request))
+
+    for (city, district), units in groups.items():
+        try:
+            results = await _estimate_district(db, city, district, units, model)
+        except Exception as e:
+            logger.error(f"Toplu değerlemede {city}/{district} hesaplanamadı: {str(e)}")
+            results = [
+                _item_result(index, error="Değerleme hesaplanırken bir hata oluştu")
+                for index, _ in units
+            ]
+        for result in results:
+            yield result
@@ -0,0 +1,130 @@
+"""Değerleme girdileri için LRU/TTL önbelleği.
+
+Bir değerlemenin pahalı kısmı emsal araması ve bölge özetlerinin
+okunmasıdır; hesaplamanın geri kalanı birkaç çarpmadır. Önbellek bu
+girdileri (emsal satırları ve bölge özetleri) normalize edilmiş istek
+anahtarıyla saklar. Metrekare benzerlik skorundaki 10 m²'lik bantlara, bina
+yaşı en dar yaş bandı olan 2 yıla yuvarlanır; tahmini fiyat her istekte
+gerçek metrekare ve yaşla yeniden hesaplanır.
+
+Kayıt sırasında bir (şehir, ilçe) içinde ilan eklendiğinde veya
+güncellendiğinde o ilçenin nesli artırılır ve eski nesilden kalan
+girişler bir sonraki okumada geçersiz sayılır. Bölge özetleri
+(``area_monthly_stats``) kayıttan sonra ``AreaStatisticsRefresher.flush``
+ile yazıldığından ilçe, güncelleme bittiğinde bir kez daha geçersiz kılınır;
+aradaki okumalar eski özetleri önbelleğe alamaz. Başka süreçlerin yazdıkları
+için girişler ``VALUATION_CACHE_TTL`` saniye sonra düşer.
+"""
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from dotenv import load_dotenv
+
+from ingest import IngestResult
+
+load_dotenv()
+
+VALUATION_CACHE_SIZE = int(os.getenv("VALUATION_CACHE_SIZE", "1024"))
+VALUATION_CACHE_TTL = float(os.getenv("VALUATION_CACHE_TTL", "300"))
+
+SQM_BUCKET = 10
+AGE_BUCKET = 2
+
+CacheKey = Tuple[str, str, str, str, int, int]
+AreaKey = Tuple[str, str]
+
+
+def valuation_key(city: str, district: str, neighborhood: str, property_type: str,
+                  square_meters: float, building_age: int) -> CacheKey:
+    return (
+        city, district, neighborhood, property_type,
+        int(round(square_meters / SQM_BUCKET)),
+        building_age // AGE_BUCKET,
+    )
+
+
+class ValuationCache:
+    """(şehir, ilçe) nesilleriyle geçersiz kılınan LRU/TTL önbelleği"""
+
+    def __init__(self, max_size: int = VALUATION_CACHE_SIZE, ttl: float = VALUATION_CACHE_TTL):
+        self.max_size = max_size
+        self.ttl = ttl
+        # anahtar -> (yazılma zamanı, ilçe nesli, değer)
+        self._entries: 'OrderedDict[CacheKey, Tuple[float, int, Any]]' = OrderedDict()
+        self._generations: Dict[AreaKey, int] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def _area(key: CacheKey) -> AreaKey:
+        return key[0], key[1]
+
+    def generation(self, key: CacheKey) -> int:
+        """Hesaplamaya başlamadan alınır; hesaplama sırasında gelen
+        geçersiz kılma sonucu eskimiş sayar"""
+        return self._generations.get(self._area(key), 0)
+
+    def get(self, key: CacheKey) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        stored_at, generation, value = entry
+        if generation != self.generation(key) or time.monotonic() - stored_at > self.ttl:
+            del self._entries[key]
+            self.expirations += 1
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key: CacheKey, value: Any, generation: int):
+        if generation != self.generation(key):
+            return
+        self._entries[key] = (time.monotonic(), generation, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate_area(self, city: str, district: str):
+        area = (city, district)
+        self._generations[area] = self._generations.get(area, 0) + 1
+        self.invalidations += 1
+
+    def track(self, result: IngestResult):
+        """Kayıt dinleyicisi: yeni veya değişen ilanların ilçelerini geçersiz kıl"""
+        areas = set()
+        for row in result.rows:
+            if row['unchanged']:
+                continue
+            # Yeniden parse ilanı başka bir ilçeye taşıdıysa eski ilçe de değişmiştir
+            for area in ((row['city'], row['district']), (row.get('prior_city'), row.get('prior_district'))):
+                if all(area):
+                    areas.add(area)
+        for city, district in areas:
+            self.invalidate_area(city, district)
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {
+            'size': len(self._entries),
+            'max_size': self.max_size,
+            'ttl_seconds': self.ttl,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': round(self.hits / lookups, 4) if lookups else 0.0,
+            'evictions': self.evictions,
+            'expirations': self.expirations,
+            'invalidations': self.invalidations,
+        }
+
+
+# API sürecinde paylaşılan önbellek
+valuation_cache = ValuationCache()
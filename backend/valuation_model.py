@@ -0,0 +1,276 @@
+"""Eğitilmiş değerleme modeli: sürümlü dosyadan yükleme ve süreç içi tahmin.
+
+Model ``train_model.py`` ile ``properties`` tablosundan eğitilir ve
+``VALUATION_MODEL_DIR`` altına ``valuation-<sürüm>.joblib`` olarak yazılır;
+aynı dizindeki ``LATEST`` dosyası son sürümün adını tutar
+(``VALUATION_MODEL_PATH`` verilirse o dosya yüklenir). API modeli açılışta
+bir kez yükler ve tahminleri istek sırasında, veritabanına gitmeden yapar.
+Yüklenirken ağaçlar düz NumPy dizilerine derlenir (``CompiledForest``): tek
+satırlık tahminde scikit-learn'ün ağaç başına Python döngüsü yerine bütün
+ağaçlar seviye seviye birlikte yürütülür.
+
+Model m² fiyatının logaritmasını tahmin eden bir ``HistGradientBoostingRegressor``
+modelidir. Özellikler:
+
+- metrekare, bina yaşı (bilinmiyorsa eksik değer)
+- emlak tipinin, ilçenin ve mahallenin m² fiyatı kodlaması: log m²
+  fiyatlarının, az ilanlı gruplarda bir üst gruba doğru çekilmiş ortalaması.
+  Mahalle sayısı modelin kategorik kolon sınırını (255) aştığı için bölgeler
+  kategori olarak verilmez; kodlamayla bütün ağaçlar sayısal bölünmelerden
+  oluşur.
+- mahallenin ilan sayısı ve ilanın ayı (fiyat seviyesindeki zamanla değişim)
+
+Fiyat aralığı, eğitimde ayrılan ilanlardaki göreli hatanın %10 ve %90
+yüzdeliklerinden gelir.
+"""
+import logging
+import os
+import time
+from collections import namedtuple
+from datetime import date, datetime, timezone
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+from dotenv import load_dotenv
+
+try:
+    import joblib
+except ImportError:  # scikit-learn kurulu değilse sadece kural tabanlı değerleme yapılır
+    joblib = None
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+VALUATION_MODEL_DIR = Path(os.getenv("VALUATION_MODEL_DIR", "models"))
+VALUATION_MODEL_PATH = os.getenv("VALUATION_MODEL_PATH")
+LATEST_FILE = 'LATEST'
+
+FEATURES = (
+    'square_meters', 'building_age', 'property_type_price',
+    'district_price', 'neighborhood_price', 'neighborhood_listings', 'month',
+)
+
+# Bir grubun kodlamasında üst grup ortalaması bu kadar ilan ağırlığında sayılır
+ENCODING_SMOOTHING = 10
+
+# Bu kadar satıra kadar derlenmiş ağaçlar, daha büyük partilerde scikit-learn kullanılır
+COMPILED_MAX_ROWS = 32
+
+Prediction = namedtuple('Prediction', ['price', 'low', 'high', 'version'])
+
+
+def month_number(day: date) -> int:
+    return day.year * 12 + day.month - 1
+
+
+def feature_matrix(columns: Dict[str, np.ndarray]) -> np.ndarray:
+    """Kolonları modelin beklediği sırada float matrise diz"""
+    return np.column_stack([np.asarray(columns[name], dtype=np.float64) for name in FEATURES])
+
+
+def encode_property_types(encodings: Dict, property_types: Iterable[str]) -> np.ndarray:
+    global_price = encodings['global_price']
+    prices = encodings['property_type_price']
+    return np.array([prices.get(name, global_price) for name in property_types], dtype=np.float64)
+
+
+def encode_areas(encodings: Dict, cities: Iterable[str], districts: Iterable[str],
+                 neighborhoods: Iterable[str]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Bölge kodlamaları; görülmemiş mahalle ilçeye, görülmemiş ilçe genele düşer"""
+    global_price = encodings['global_price']
+    district_prices = encodings['district_price']
+    neighborhood_prices = encodings['neighborhood_price']
+    neighborhood_listings = encodings['neighborhood_listings']
+
+    district_price, neighborhood_price, listings = [], [], []
+    for city, district, neighborhood in zip(cities, districts, neighborhoods):
+        district_value = district_prices.get((city, district), global_price)
+        key = (city, district, neighborhood)
+        district_price.append(district_value)
+        neighborhood_price.append(neighborhood_prices.get(key, district_value))
+        listings.append(neighborhood_listings.get(key, 0))
+    return (
+        np.array(district_price, dtype=np.float64),
+        np.array(neighborhood_price, dtype=np.float64),
+        np.log1p(np.array(listings, dtype=np.float64)),
+    )
+
+
+class CompiledForest:
+    """``HistGradientBoostingRegressor`` ağaçlarının düz dizilerdeki kopyası.
+
+    Bütün ağaçların düğümleri tek dizidedir; her satır için her ağaçta
+    bulunulan düğüm bir matriste tutulur ve en derin yaprağın derinliği kadar
+    adımda bütün ağaçlar birlikte ilerletilir. Bölünme kuralı scikit-learn'le
+    aynıdır: eksik değer ``missing_go_to_left`` yönüne, diğerleri
+    ``değer <= eşik`` ise sola gider.
+    """
+
+    def __init__(self, estimator):
+        trees = [tree.nodes for iteration in estimator._predictors for tree in iteration]
+        nodes = np.concatenate(trees)
+        if nodes['is_categorical'].any():
+            raise ValueError("Kategorik bölünmeler derlenmiyor")
+        sizes = [len(tree) for tree in trees]
+        self.roots = np.cumsum([0] + sizes[:-1]).astype(np.intp)
+        shift = np.repeat(self.roots, sizes)
+
+        self.feature = nodes['feature_idx'].astype(np.intp)
+        self.threshold = nodes['num_threshold'].astype(np.float64)
+        self.missing_left = nodes['missing_go_to_left'].astype(bool)
+        self.is_leaf = nodes['is_leaf'].astype(bool)
+        self.left = np.where(self.is_leaf, np.arange(len(nodes)), nodes['left'] + shift).astype(np.intp)
+        self.right = np.where(self.is_leaf, np.arange(len(nodes)), nodes['right'] + shift).astype(np.intp)
+        self.value = nodes['value'].astype(np.float64)
+        self.depth = int(nodes['depth'].max())
+        self.baseline = float(np.ravel(estimator._baseline_prediction)[0])
+
+    def predict(self, features: np.ndarray) -> np.ndarray:
+        current = np.tile(self.roots, (len(features), 1))
+        rows = np.arange(len(features))[:, None]
+        for _ in range(self.depth):
+            if self.is_leaf[current].all():
+                break
+            values = features[rows, self.feature[current]]
+            go_left = np.where(np.isnan(values), self.missing_left[current], values <= self.threshold[current])
+            # Yapraklarda iki çocuk da yaprağın kendisidir
+            current = np.where(go_left, self.left[current], self.right[current])
+        return self.baseline + self.value[current].sum(axis=1)
+
+
+class ValuationModel:
+    """Yüklenmiş model dosyası; tahminler toplu olarak yapılır"""
+
+    def __init__(self, artifact: Dict):
+        self.artifact = artifact
+        self.version: str = artifact['version']
+        self.estimator = artifact['model']
+        self.encodings: Dict = artifact['encodings']
+        self.interval: Tuple[float, float] = artifact['interval']
+        try:
+            self.compiled: Optional[CompiledForest] = CompiledForest(self.estimator)
+        except Exception as e:
+            logger.warning(f"Model ağaçları derlenemedi, scikit-learn tahmini kullanılacak: {str(e)}")
+            self.compiled = None
+
+    def predict_log_sqm_prices(self, features: np.ndarray) -> np.ndarray:
+        if self.compiled is not None and len(features) <= COMPILED_MAX_ROWS:
+            return self.compiled.predict(features)
+        return self.estimator.predict(features)
+
+    def features(self, requests: Sequence, today: Optional[date] = None) -> np.ndarray:
+        """İstek nesnelerinden (``ValuationRequest`` alanları) özellik matrisi"""
+        district_price, neighborhood_price, listings = encode_areas(
+            self.encodings,
+            (r.city for r in requests),
+            (r.district for r in requests),
+            (r.neighborhood for r in requests),
+        )
+        return feature_matrix({
+            'square_meters': [r.square_meters for r in requests],
+            'building_age': [np.nan if r.building_age is None else r.building_age for r in requests],
+            'property_type_price': encode_property_types(self.encodings, (r.property_type for r in requests)),
+            'district_price': district_price,
+            'neighborhood_price': neighborhood_price,
+            'neighborhood_listings': listings,
+            'month': np.full(len(requests), month_number(today or date.today())),
+        })
+
+    def predict_prices(self, requests: Sequence) -> np.ndarray:
+        sqm_prices = np.exp(self.predict_log_sqm_prices(self.features(requests)))
+        return sqm_prices * np.array([r.square_meters for r in requests], dtype=np.float64)
+
+    def predict_many(self, requests: Sequence) -> List[Prediction]:
+        if not requests:
+            return []
+        low_factor, high_factor = np.exp(self.interval[0]), np.exp(self.interval[1])
+        return [
+            Prediction(float(price), float(price * low_factor), float(price * high_factor), self.version)
+            for price in self.predict_prices(requests)
+        ]
+
+    def info(self) -> Dict:
+        return {
+            'version': self.version,
+            'trained_at': self.artifact['trained_at'],
+            'rows': self.artifact['rows'],
+            'features': list(FEATURES),
+            'metrics': self.artifact['metrics'],
+        }
+
+
+def latest_model_path(model_dir: Path = VALUATION_MODEL_DIR) -> Optional[Path]:
+    pointer = model_dir / LATEST_FILE
+    if not pointer.exists():
+        return None
+    return model_dir / pointer.read_text(encoding='utf-8').strip()
+
+
+def save_model(artifact: Dict, model_dir: Path = VALUATION_MODEL_DIR) -> Path:
+    """Modeli sürümlü dosyaya yaz ve ``LATEST`` göstergesini güncelle"""
+    if joblib is None:
+        raise RuntimeError("Model kaydetmek için scikit-learn (joblib) gerekli")
+    model_dir.mkdir(parents=True, exist_ok=True)
+    path = model_dir / f"valuation-{artifact['version']}.joblib"
+    joblib.dump(artifact, path)
+    pointer = model_dir / f"{LATEST_FILE}.tmp"
+    pointer.write_text(path.name, encoding='utf-8')
+    os.replace(pointer, model_dir / LATEST_FILE)
+    return path
+
+
+def new_version() -> str:
+    return datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%S')
+
+
+class ModelStore:
+    """API sürecinde yüklü model; açılışta bir kez yüklenir"""
+
+    def __init__(self):
+        self.current: Optional[ValuationModel] = None
+        self.path: Optional[Path] = None
+        self.loaded_at: Optional[float] = None
+
+    def load(self, path: Optional[Path] = None) -> Optional[ValuationModel]:
+        if joblib is None:
+            logger.warning("scikit-learn kurulu değil, değerleme modeli yüklenmedi")
+            return None
+        path = path or (Path(VALUATION_MODEL_PATH) if VALUATION_MODEL_PATH else latest_model_path())
+        if path is None or not path.exists():
+            logger.warning(f"Değerleme modeli bulunamadı ({path or VALUATION_MODEL_DIR}), sadece kural tabanlı değerleme yapılacak")
+            return None
+        try:
+            model = ValuationModel(joblib.load(path))
+        except Exception as e:
+            logger.error(f"Değerleme modeli yüklenemedi ({path}): {str(e)}")
+            return None
+
+        try:
+            import sklearn
+            if model.artifact.get('sklearn_version') != sklearn.__version__:
+                logger.warning(
+                    f"Model scikit-learn {model.artifact.get('sklearn_version')} ile eğitilmiş, "
+                    f"kurulu sürüm {sklearn.__version__}"
+                )
+        except ImportError:
+            pass
+
+        self.current, self.path, self.loaded_at = model, path, time.time()
+        logger.info(f"Değerleme modeli yüklendi: {model.version} ({path})")
+        return model
+
+    def info(self) -> Dict:
+        if self.current is None:
+            return {'loaded': False}
+        return {
+            'loaded': True,
+            'path': str(self.path),
+            'loaded_at': datetime.fromtimestamp(self.loaded_at, timezone.utc).isoformat(),
+            **self.current.info(),
+        }
+
+
+# API sürecinde paylaşılan model
+model_store = ModelStore()
@@ -0,0 +1,107 @@
+"""CSV'deki portföyü toplu olarak değerle.
+
+Kullanım:
+    python value_portfolio.py portfoy.csv [--output sonuc.csv] [--model rules|ml]
+
+Girdi kolonları ``POST /valuation/estimate`` isteğiyle aynıdır (``city``,
+``district``, ``neighborhood``, ``square_meters``, ``building_age``,
+``property_type`` ve isteğe bağlı ``room_count``, ``floor``,
+``total_floors``). Çıktı her girdi satırı için bir satırdır: satır
+numarası, tahmini değer, fiyat aralığı, güven skoru, emsal sayısı veya
+hata mesajı. ``--output`` verilmezse sonuçlar NDJSON olarak standart
+çıktıya yazılır. ``--model ml`` ile tahminler eğitilmiş modelden gelir.
+"""
+import argparse
+import asyncio
+import csv
+import logging
+import sys
+import time
+from pathlib import Path
+from typing import Dict, Optional
+
+from dotenv import load_dotenv
+
+from codec import dumps
+from db import PooledDatabase
+from import_listings import read_rows
+from valuation import VALUATION_MODE, VALUATION_MODES, estimate_batch, select_model
+from valuation_model import model_store
+
+load_dotenv()
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# CSV'de bulunmayabilecek isteğe bağlı alanlar
+OPTIONAL_COLUMNS = ('room_count', 'floor', 'total_floors')
+
+OUTPUT_COLUMNS = (
+    'row', 'estimated_price', 'price_min', 'price_max',
+    'confidence_score', 'comparables', 'model', 'error',
+)
+
+
+def summary_row(item: Dict) -> Dict:
+    if not item['ok']:
+        return {'row': item['index'] + 1, 'error': item['error']}
+    result = item['result']
+    return {
+        'row': item['index'] + 1,
+        'estimated_price': round(result['estimated_price'], 2),
+        'price_min': round(result['price_range'][0], 2),
+        'price_max': round(result['price_range'][1], 2),
+        'confidence_score': result['confidence_score'],
+        'comparables': len(result['similar_properties']),
+        'model': result['model'],
+    }
+
+
+async def value_portfolio(path: Path, output: Optional[Path], mode: Optional[str]):
+    if (mode or VALUATION_MODE) == 'ml':
+        model_store.load()
+    model = select_model(mode)
+    units = [{**dict.fromkeys(OPTIONAL_COLUMNS), **row} for row in read_rows(path)]
+    database = PooledDatabase()
+    await database.connect()
+    started = time.perf_counter()
+    valued = failed = 0
+    out = open(output, 'w', encoding='utf-8', newline='') if output else None
+    try:
+        writer = csv.DictWriter(out, fieldnames=OUTPUT_COLUMNS) if out else None
+        if writer:
+            writer.writeheader()
+        async for item in estimate_batch(database, units, model):
+            if item['ok']:
+                valued += 1
+            else:
+                failed += 1
+            if writer:
+                writer.writerow(summary_row(item))
+            else:
+                sys.stdout.write(dumps(item).decode('utf-8') + '\n')
+    finally:
+        if out:
+            out.close()
+        await database.disconnect()
+
+    elapsed = time.perf_counter() - started
+    logger.info(
+        f"Portföy değerlemesi tamamlandı: {valued} birim değerlendi, {failed} hata "
+        f"({elapsed:.1f} sn, {len(units) / elapsed if elapsed else 0:.0f} birim/sn)"
+    )
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="CSV portföyünü toplu değerle")
+    arg_parser.add_argument('file', type=Path, help="Portföy CSV dosyası")
+    arg_parser.add_argument('--output', type=Path, help="Sonuç CSV dosyası (verilmezse NDJSON stdout)")
+    arg_parser.add_argument('--model', choices=VALUATION_MODES,
+                            help="Değerleme yolu (verilmezse VALUATION_MODE)")
+    args = arg_parser.parse_args()
+
+    asyncio.run(value_portfolio(args.file, args.output, args.model))
+
+
+if __name__ == "__main__":
+    main()
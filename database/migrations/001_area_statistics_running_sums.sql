@@ -0,0 +1,30 @@
+-- Bölge istatistiklerinin artımlı güncellenebilmesi için toplam ve sayaç kolonları
+ALTER TABLE area_statistics
+    ADD COLUMN IF NOT EXISTS price_per_sqm_sum DECIMAL(20, 2),
+    ADD COLUMN IF NOT EXISTS price_per_sqm_count INTEGER,
+    ADD COLUMN IF NOT EXISTS building_age_sum BIGINT,
+    ADD COLUMN IF NOT EXISTS building_age_count INTEGER;
+
+-- Mevcut satırları properties tablosundan doldur
+UPDATE area_statistics a SET
+    price_per_sqm_sum = s.price_per_sqm_sum,
+    price_per_sqm_count = s.price_per_sqm_count,
+    building_age_sum = s.building_age_sum,
+    building_age_count = s.building_age_count,
+    total_listings = s.total_listings
+FROM (
+    SELECT
+        city, district, neighborhood,
+        COALESCE(SUM(price_per_sqm), 0) AS price_per_sqm_sum,
+        COUNT(price_per_sqm) AS price_per_sqm_count,
+        COALESCE(SUM(building_age), 0) AS building_age_sum,
+        COUNT(building_age) AS building_age_count,
+        COUNT(*) AS total_listings
+    FROM properties
+    GROUP BY city, district, neighborhood
+) s
+WHERE a.city = s.city AND a.district = s.district AND a.neighborhood = s.neighborhood;
+
+-- Bölge bazlı sorgular için indeks
+CREATE INDEX IF NOT EXISTS idx_properties_area
+    ON properties (city, district, neighborhood);
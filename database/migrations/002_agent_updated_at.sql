@@ -0,0 +1,10 @@
+-- Danışman telefonlarının ne zaman açıldığını tutarak tekrar taramalarda
+-- bilinen ilanların telefon adımını atlayabilmek için
+ALTER TABLE properties
+    ADD COLUMN IF NOT EXISTS agent_updated_at TIMESTAMP WITH TIME ZONE;
+
+UPDATE properties
+SET agent_updated_at = updated_at
+WHERE agent_updated_at IS NULL
+  AND agent_phone IS NOT NULL
+  AND agent_phone <> '[]'::jsonb;
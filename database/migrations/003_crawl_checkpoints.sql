@@ -0,0 +1,9 @@
+-- Yarıda kalan taramaların kaldığı yerden devam edebilmesi için
+CREATE TABLE IF NOT EXISTS crawl_checkpoints (
+    base_url TEXT PRIMARY KEY,
+    last_page INTEGER NOT NULL DEFAULT 0,
+    last_listing_number VARCHAR(50),
+    completed BOOLEAN NOT NULL DEFAULT FALSE,
+    started_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+);
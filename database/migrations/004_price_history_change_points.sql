@@ -0,0 +1,33 @@
+-- Fiyat geçmişinde sadece fiyatın değiştiği noktalar tutulur. Daha önce her
+-- taramada yazılmış tekrar satırları tek seferlik toplu bir geçişle ayıklanır:
+-- değişim noktaları geçici tabloya alınır, tablo boşaltılıp geri yüklenir.
+-- Aradaki gözlemlerin son zamanı properties.updated_at üzerinden okunur.
+BEGIN;
+
+LOCK TABLE price_history IN ACCESS EXCLUSIVE MODE;
+
+CREATE TEMP TABLE price_history_change_points ON COMMIT DROP AS
+SELECT id, property_id, price, recorded_at
+FROM (
+    SELECT
+        id, property_id, price, recorded_at,
+        ROW_NUMBER() OVER w AS position,
+        LAG(price) OVER w AS previous_price
+    FROM price_history
+    WINDOW w AS (PARTITION BY property_id ORDER BY recorded_at, id)
+) h
+WHERE position = 1 OR price IS DISTINCT FROM previous_price;
+
+TRUNCATE price_history;
+
+INSERT INTO price_history (id, property_id, price, recorded_at)
+SELECT id, property_id, price, recorded_at
+FROM price_history_change_points;
+
+COMMIT;
+
+-- İlan bazlı zaman serisi okumaları için
+CREATE INDEX IF NOT EXISTS idx_price_history_property
+    ON price_history (property_id, recorded_at);
+
+ANALYZE price_history;
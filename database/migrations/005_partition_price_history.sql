@@ -0,0 +1,108 @@
+-- price_history tablosunu recorded_at üzerinden aylık bölümlenmiş yapıya taşı.
+-- Eski tablo yeniden adlandırılır, veri ay ay yeni bölümlere kopyalanır ve
+-- eski tablo silinir. Tablo zaten bölümlenmişse hiçbir şey yapılmaz.
+BEGIN;
+
+DO $$
+BEGIN
+    IF EXISTS (
+        SELECT 1 FROM pg_class
+        WHERE oid = to_regclass('price_history') AND relkind = 'p'
+    ) THEN
+        RAISE NOTICE 'price_history zaten bölümlenmiş';
+        RETURN;
+    END IF;
+
+    ALTER TABLE price_history RENAME TO price_history_unpartitioned;
+    ALTER INDEX IF EXISTS idx_price_history_property RENAME TO idx_price_history_unpartitioned;
+
+    CREATE TABLE price_history (
+        id BIGSERIAL,
+        property_id INTEGER REFERENCES properties(id),
+        price DECIMAL(15, 2),
+        recorded_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP,
+        PRIMARY KEY (id, recorded_at)
+    ) PARTITION BY RANGE (recorded_at);
+
+    CREATE INDEX idx_price_history_property ON price_history (property_id, recorded_at);
+    CREATE TABLE price_history_default PARTITION OF price_history DEFAULT;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION create_price_history_partition(month_start DATE)
+RETURNS TEXT AS $$
+DECLARE
+    range_start DATE := date_trunc('month', month_start)::date;
+    range_end DATE := (date_trunc('month', month_start) + INTERVAL '1 month')::date;
+    partition_name TEXT := 'price_history_' || to_char(month_start, 'YYYY_MM');
+BEGIN
+    IF to_regclass(partition_name) IS NOT NULL THEN
+        RETURN partition_name;
+    END IF;
+
+    EXECUTE format(
+        'CREATE TABLE %I (LIKE price_history INCLUDING DEFAULTS INCLUDING CONSTRAINTS)',
+        partition_name
+    );
+    EXECUTE format(
+        'WITH moved AS (
+            DELETE FROM price_history_default
+            WHERE recorded_at >= %L AND recorded_at < %L
+            RETURNING *
+        )
+        INSERT INTO %I SELECT * FROM moved',
+        range_start, range_end, partition_name
+    );
+    EXECUTE format(
+        'ALTER TABLE price_history ATTACH PARTITION %I FOR VALUES FROM (%L) TO (%L)',
+        partition_name, range_start, range_end
+    );
+    RETURN partition_name;
+END;
+$$ language 'plpgsql';
+
+DO $$
+BEGIN
+    IF to_regclass('price_history_unpartitioned') IS NULL THEN
+        RETURN;
+    END IF;
+
+    -- Mevcut verinin kapsadığı aylar ve önümüzdeki iki ay için bölümler
+    PERFORM create_price_history_partition(m::date)
+    FROM generate_series(
+        date_trunc('month', COALESCE(
+            (SELECT MIN(recorded_at) FROM price_history_unpartitioned), CURRENT_DATE
+        )),
+        date_trunc('month', CURRENT_DATE) + INTERVAL '2 months',
+        INTERVAL '1 month'
+    ) AS m;
+
+    INSERT INTO price_history (id, property_id, price, recorded_at)
+    SELECT id, property_id, price, COALESCE(recorded_at, CURRENT_TIMESTAMP)
+    FROM price_history_unpartitioned;
+
+    PERFORM setval(
+        pg_get_serial_sequence('price_history', 'id'),
+        COALESCE((SELECT MAX(id) FROM price_history), 0) + 1,
+        false
+    );
+
+    DROP TABLE price_history_unpartitioned;
+END;
+$$;
+
+-- Saklama süresini aşan bölümlerin aylık özetleri
+CREATE TABLE IF NOT EXISTS price_history_monthly (
+    property_id INTEGER REFERENCES properties(id),
+    month DATE NOT NULL,
+    min_price DECIMAL(15, 2),
+    max_price DECIMAL(15, 2),
+    last_price DECIMAL(15, 2),
+    last_recorded_at TIMESTAMP WITH TIME ZONE,
+    change_count INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (property_id, month)
+);
+
+COMMIT;
+
+ANALYZE price_history;
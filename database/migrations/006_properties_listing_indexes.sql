@@ -0,0 +1,30 @@
+-- GET /properties/ filtreleri ve (created_at, id) keyset sayfalaması için
+-- indeksler. Keyset koşulu NULL değerlerde çalışmadığından created_at
+-- zorunlu hale getirilir.
+UPDATE properties
+SET created_at = COALESCE(updated_at, CURRENT_TIMESTAMP)
+WHERE created_at IS NULL;
+
+ALTER TABLE properties
+    ALTER COLUMN created_at SET NOT NULL;
+
+-- Filtresiz listeleme
+CREATE INDEX IF NOT EXISTS idx_properties_created
+    ON properties (created_at DESC, id DESC);
+
+-- Şehir ve şehir + ilçe filtreleri, sıralama indeksten okunur
+CREATE INDEX IF NOT EXISTS idx_properties_city_created
+    ON properties (city, created_at DESC, id DESC);
+
+CREATE INDEX IF NOT EXISTS idx_properties_city_district_created
+    ON properties (city, district, created_at DESC, id DESC);
+
+-- Emlak tipi filtresi
+CREATE INDEX IF NOT EXISTS idx_properties_type_created
+    ON properties (property_type, created_at DESC, id DESC);
+
+-- Seçici fiyat aralıkları için
+CREATE INDEX IF NOT EXISTS idx_properties_city_district_price
+    ON properties (city, district, price);
+
+ANALYZE properties;
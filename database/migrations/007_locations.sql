@@ -0,0 +1,16 @@
+-- /locations/* uçlarının properties üzerinde SELECT DISTINCT yapmaması
+-- için konum hiyerarşisi tablosu. Yeni konumlar kayıt sırasında eklenir.
+CREATE TABLE IF NOT EXISTS locations (
+    city VARCHAR(100) NOT NULL,
+    district VARCHAR(100) NOT NULL DEFAULT '',
+    neighborhood VARCHAR(100) NOT NULL DEFAULT '',
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+
+    PRIMARY KEY (city, district, neighborhood)
+);
+
+INSERT INTO locations (city, district, neighborhood)
+SELECT DISTINCT city, COALESCE(district, ''), COALESCE(neighborhood, '')
+FROM properties
+WHERE city IS NOT NULL
+ON CONFLICT DO NOTHING;
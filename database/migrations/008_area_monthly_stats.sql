@@ -0,0 +1,63 @@
+-- Değerlemenin her istekte ham ilanları taramaması için bölge ve ay
+-- bazında önceden hesaplanmış m² fiyatı özetleri. Yeni kayıtlar
+-- AreaStatisticsRefresher tarafından güncellenir.
+CREATE TABLE IF NOT EXISTS area_monthly_stats (
+    city VARCHAR(100) NOT NULL,
+    district VARCHAR(100) NOT NULL,
+    neighborhood VARCHAR(100) NOT NULL,
+    month DATE NOT NULL,
+    listings INTEGER NOT NULL DEFAULT 0,
+    price_per_sqm_sum DECIMAL(20, 2) NOT NULL DEFAULT 0,
+    price_per_sqm_count INTEGER NOT NULL DEFAULT 0,
+    -- m² fiyatı medyan taslağı: log(fiyat)/log(1.02) kovaları ve sayıları
+    sketch_buckets INTEGER[] NOT NULL DEFAULT '{}',
+    sketch_counts INTEGER[] NOT NULL DEFAULT '{}',
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+
+    PRIMARY KEY (city, district, neighborhood, month)
+);
+
+-- Mevcut ilanlardan doldur
+WITH listings AS (
+    SELECT city, district, neighborhood,
+        date_trunc('month', created_at)::date AS month,
+        price_per_sqm
+    FROM properties
+    WHERE city IS NOT NULL AND district IS NOT NULL AND neighborhood IS NOT NULL
+),
+totals AS (
+    SELECT city, district, neighborhood, month,
+        COUNT(*) AS listings,
+        COALESCE(SUM(price_per_sqm), 0) AS price_per_sqm_sum,
+        COUNT(price_per_sqm) AS price_per_sqm_count
+    FROM listings
+    GROUP BY city, district, neighborhood, month
+),
+buckets AS (
+    SELECT city, district, neighborhood, month,
+        FLOOR(LN(price_per_sqm) / LN(1.02))::int AS bucket,
+        COUNT(*)::int AS n
+    FROM listings
+    WHERE price_per_sqm > 0
+    GROUP BY city, district, neighborhood, month, bucket
+),
+sketches AS (
+    SELECT city, district, neighborhood, month,
+        array_agg(bucket ORDER BY bucket) AS sketch_buckets,
+        array_agg(n ORDER BY bucket) AS sketch_counts
+    FROM buckets
+    GROUP BY city, district, neighborhood, month
+)
+INSERT INTO area_monthly_stats (
+    city, district, neighborhood, month,
+    listings, price_per_sqm_sum, price_per_sqm_count,
+    sketch_buckets, sketch_counts
+)
+SELECT
+    t.city, t.district, t.neighborhood, t.month,
+    t.listings, t.price_per_sqm_sum, t.price_per_sqm_count,
+    COALESCE(s.sketch_buckets, '{}'),
+    COALESCE(s.sketch_counts, '{}')
+FROM totals t
+LEFT JOIN sketches s USING (city, district, neighborhood, month)
+ON CONFLICT (city, district, neighborhood, month) DO NOTHING;
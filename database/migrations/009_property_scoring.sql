@@ -0,0 +1,28 @@
+-- Toplu puanlama işi (backend/score_properties.py): predicted_price,
+-- area_avg_price, price_trend, area_price_trend ve puan kolonları.
+
+-- Puan kolonlarının toplu yazımı updated_at'i değiştirmez; artımlı
+-- puanlama son çalışmadan sonra updated_at'i ilerleyen ilanları okur.
+DROP TRIGGER IF EXISTS update_properties_updated_at ON properties;
+CREATE TRIGGER update_properties_updated_at
+    BEFORE UPDATE OF
+        title, price, currency, city, district, neighborhood, square_meters,
+        building_age, property_type, listing_date, listing_number,
+        agency_name, agency_logo_url, agency_url, agent_name, agent_phone,
+        agent_updated_at, image_url, listing_url, price_per_sqm
+    ON properties
+    FOR EACH ROW
+    EXECUTE FUNCTION update_updated_at_column();
+
+CREATE INDEX IF NOT EXISTS idx_properties_updated
+    ON properties (updated_at);
+
+CREATE TABLE IF NOT EXISTS property_scoring_runs (
+    id SERIAL PRIMARY KEY,
+    mode VARCHAR(20) NOT NULL,  -- full / incremental
+    model VARCHAR(50) NOT NULL,  -- rules / ml:<sürüm>
+    started_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    finished_at TIMESTAMP WITH TIME ZONE,
+    scored INTEGER NOT NULL DEFAULT 0,
+    updated INTEGER NOT NULL DEFAULT 0
+);
@@ -0,0 +1,30 @@
+-- Bölge fiyat trendleri (price_trend_6m, price_trend_1y) area_monthly_stats
+-- satırlarından hesaplanır: içinde bulunulan ayın m² fiyatı ortalaması ile
+-- 6 ve 12 ay önceki ayların ortalamaları (bkz. backend/area_monthly.py).
+
+-- Bütün mahallelerin trend aylarını okuyan /area-statistics/ sorgusu için
+CREATE INDEX IF NOT EXISTS idx_area_monthly_stats_month
+    ON area_monthly_stats (month);
+
+-- Şimdiye kadar 0 yazılmış trendleri doldur
+WITH averages AS (
+    SELECT city, district, neighborhood,
+        SUM(price_per_sqm_sum) FILTER (WHERE month = date_trunc('month', NOW())::date)
+            / NULLIF(SUM(price_per_sqm_count) FILTER (WHERE month = date_trunc('month', NOW())::date), 0) AS avg_0,
+        SUM(price_per_sqm_sum) FILTER (WHERE month = (date_trunc('month', NOW()) - INTERVAL '6 months')::date)
+            / NULLIF(SUM(price_per_sqm_count) FILTER (WHERE month = (date_trunc('month', NOW()) - INTERVAL '6 months')::date), 0) AS avg_6,
+        SUM(price_per_sqm_sum) FILTER (WHERE month = (date_trunc('month', NOW()) - INTERVAL '12 months')::date)
+            / NULLIF(SUM(price_per_sqm_count) FILTER (WHERE month = (date_trunc('month', NOW()) - INTERVAL '12 months')::date), 0) AS avg_12
+    FROM area_monthly_stats
+    WHERE month IN (
+        date_trunc('month', NOW())::date,
+        (date_trunc('month', NOW()) - INTERVAL '6 months')::date,
+        (date_trunc('month', NOW()) - INTERVAL '12 months')::date
+    )
+    GROUP BY city, district, neighborhood
+)
+UPDATE area_statistics a SET
+    price_trend_6m = COALESCE(ROUND(LEAST(GREATEST(t.avg_0 / NULLIF(t.avg_6, 0) * 100 - 100, -999.99), 999.99), 2), 0),
+    price_trend_1y = COALESCE(ROUND(LEAST(GREATEST(t.avg_0 / NULLIF(t.avg_12, 0) * 100 - 100, -999.99), 999.99), 2), 0)
+FROM averages t
+WHERE a.city = t.city AND a.district = t.district AND a.neighborhood = t.neighborhood;
@@ -0,0 +1,82 @@
+-- Bölge fiyat trendleri için gözlenen fiyat serisi: her (bölge, ay) için o ay
+-- price_history'ye kaydedilen fiyatlar (yeni ilanlar ve fiyat değişiklikleri),
+-- her ilanın ay içindeki son fiyatıyla. area_monthly_stats ilanları ilan
+-- ayına ve güncel fiyatına göre topladığı için trendler artık buradan
+-- hesaplanır (bkz. backend/area_monthly.py).
+CREATE TABLE IF NOT EXISTS area_price_monthly (
+    city VARCHAR(100) NOT NULL,
+    district VARCHAR(100) NOT NULL,
+    neighborhood VARCHAR(100) NOT NULL,
+    month DATE NOT NULL,
+    listings INTEGER NOT NULL DEFAULT 0,
+    price_per_sqm_sum DECIMAL(20, 2) NOT NULL DEFAULT 0,
+    price_per_sqm_count INTEGER NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+
+    PRIMARY KEY (city, district, neighborhood, month)
+);
+
+-- Bütün mahallelerin trend aylarını okuyan /area-statistics/ sorgusu için
+CREATE INDEX IF NOT EXISTS idx_area_price_monthly_month
+    ON area_price_monthly (month);
+
+-- 010'da area_monthly_stats üzerindeki trend okumaları için eklenmişti
+DROP INDEX IF EXISTS idx_area_monthly_stats_month;
+
+-- Fiyat geçmişinden ve saklama süresini aşmış ayların özetlerinden doldur
+WITH observations AS (
+    SELECT p.city, p.district, p.neighborhood,
+        date_trunc('month', h.recorded_at)::date AS month,
+        p.id AS property_id, p.square_meters, h.price, h.recorded_at
+    FROM price_history h
+    JOIN properties p ON p.id = h.property_id
+    WHERE p.city IS NOT NULL AND p.district IS NOT NULL AND p.neighborhood IS NOT NULL
+    UNION ALL
+    SELECT p.city, p.district, p.neighborhood,
+        m.month, p.id, p.square_meters, m.last_price, m.last_recorded_at
+    FROM price_history_monthly m
+    JOIN properties p ON p.id = m.property_id
+    WHERE p.city IS NOT NULL AND p.district IS NOT NULL AND p.neighborhood IS NOT NULL
+),
+latest AS (
+    SELECT DISTINCT ON (property_id, month)
+        city, district, neighborhood, month,
+        price / NULLIF(square_meters, 0) AS price_per_sqm
+    FROM observations
+    WHERE price > 0
+    ORDER BY property_id, month, recorded_at DESC
+)
+INSERT INTO area_price_monthly (
+    city, district, neighborhood, month,
+    listings, price_per_sqm_sum, price_per_sqm_count
+)
+SELECT city, district, neighborhood, month,
+    COUNT(*), COALESCE(SUM(price_per_sqm), 0), COUNT(price_per_sqm)
+FROM latest
+GROUP BY city, district, neighborhood, month
+ON CONFLICT (city, district, neighborhood, month) DO NOTHING;
+
+-- Saklanan trendleri yeni seriden yeniden hesapla
+UPDATE area_statistics SET price_trend_6m = 0, price_trend_1y = 0;
+
+WITH averages AS (
+    SELECT city, district, neighborhood,
+        SUM(price_per_sqm_sum) FILTER (WHERE month = date_trunc('month', NOW())::date)
+            / NULLIF(SUM(price_per_sqm_count) FILTER (WHERE month = date_trunc('month', NOW())::date), 0) AS avg_0,
+        SUM(price_per_sqm_sum) FILTER (WHERE month = (date_trunc('month', NOW()) - INTERVAL '6 months')::date)
+            / NULLIF(SUM(price_per_sqm_count) FILTER (WHERE month = (date_trunc('month', NOW()) - INTERVAL '6 months')::date), 0) AS avg_6,
+        SUM(price_per_sqm_sum) FILTER (WHERE month = (date_trunc('month', NOW()) - INTERVAL '12 months')::date)
+            / NULLIF(SUM(price_per_sqm_count) FILTER (WHERE month = (date_trunc('month', NOW()) - INTERVAL '12 months')::date), 0) AS avg_12
+    FROM area_price_monthly
+    WHERE month IN (
+        date_trunc('month', NOW())::date,
+        (date_trunc('month', NOW()) - INTERVAL '6 months')::date,
+        (date_trunc('month', NOW()) - INTERVAL '12 months')::date
+    )
+    GROUP BY city, district, neighborhood
+)
+UPDATE area_statistics a SET
+    price_trend_6m = COALESCE(ROUND(LEAST(GREATEST(t.avg_0 / NULLIF(t.avg_6, 0) * 100 - 100, -999.99), 999.99), 2), 0),
+    price_trend_1y = COALESCE(ROUND(LEAST(GREATEST(t.avg_0 / NULLIF(t.avg_12, 0) * 100 - 100, -999.99), 999.99), 2), 0)
+FROM averages t
+WHERE a.city = t.city AND a.district = t.district AND a.neighborhood = t.neighborhood;
@@ -17,10 +17,11 @@ CREATE TABLE IF NOT EXISTS properties (
     agency_url TEXT,
     agent_name VARCHAR(255),
     agent_phone JSONB,
+    agent_updated_at TIMESTAMP WITH TIME ZONE,  -- Telefon bilgisinin son açıldığı zaman
     image_url TEXT,
     listing_url TEXT UNIQUE,
     price_per_sqm DECIMAL(15, 2),
-    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP,
     updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
     
     -- Değerleme için önemli metrikler
@@ -34,6 +35,41 @@ CREATE TABLE IF NOT EXISTS properties (
     overall_score INTEGER  -- 0-100 arası genel puan
 );
 
+-- Bölge bazlı sorgular için indeks
+CREATE INDEX IF NOT EXISTS idx_properties_area
+    ON properties (city, district, neighborhood);
+
+-- GET /properties/ filtreleri ve (created_at, id) keyset sayfalaması için
+CREATE INDEX IF NOT EXISTS idx_properties_created
+    ON properties (created_at DESC, id DESC);
+
+CREATE INDEX IF NOT EXISTS idx_properties_city_created
+    ON properties (city, created_at DESC, id DESC);
+
+CREATE INDEX IF NOT EXISTS idx_properties_city_district_created
+    ON properties (city, district, created_at DESC, id DESC);
+
+CREATE INDEX IF NOT EXISTS idx_properties_type_created
+    ON properties (property_type, created_at DESC, id DESC);
+
+CREATE INDEX IF NOT EXISTS idx_properties_city_district_price
+    ON properties (city, district, price);
+
+-- Artımlı puanlama son çalışmadan sonra değişen ilanları okur
+CREATE INDEX IF NOT EXISTS idx_properties_updated
+    ON properties (updated_at);
+
+-- Şehir/ilçe/mahalle hiyerarşisi (/locations/* açılır listeleri).
+-- Kayıt sırasında doldurulur; eksik ilçe/mahalle boş metin olarak tutulur.
+CREATE TABLE IF NOT EXISTS locations (
+    city VARCHAR(100) NOT NULL,
+    district VARCHAR(100) NOT NULL DEFAULT '',
+    neighborhood VARCHAR(100) NOT NULL DEFAULT '',
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+
+    PRIMARY KEY (city, district, neighborhood)
+);
+
 -- Bölge istatistikleri için tablo
 CREATE TABLE IF NOT EXISTS area_statistics (
     id SERIAL PRIMARY KEY,
@@ -43,19 +79,118 @@ CREATE TABLE IF NOT EXISTS area_statistics (
     avg_price_per_sqm DECIMAL(15, 2),
     avg_property_age DECIMAL(5, 2),
     total_listings INTEGER,
-    price_trend_6m DECIMAL(5, 2),
+    price_trend_6m DECIMAL(5, 2),  -- area_price_monthly'den, son güncellemedeki değer
     price_trend_1y DECIMAL(5, 2),
+    -- Artımlı güncelleme için toplam ve sayaçlar
+    price_per_sqm_sum DECIMAL(20, 2),
+    price_per_sqm_count INTEGER,
+    building_age_sum BIGINT,
+    building_age_count INTEGER,
     updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
     
     UNIQUE(city, district, neighborhood)
 );
 
--- Fiyat geçmişi için tablo
+-- Değerleme için bölge ve ay bazında m² fiyatı özetleri (bkz. backend/area_monthly.py)
+CREATE TABLE IF NOT EXISTS area_monthly_stats (
+    city VARCHAR(100) NOT NULL,
+    district VARCHAR(100) NOT NULL,
+    neighborhood VARCHAR(100) NOT NULL,
+    month DATE NOT NULL,
+    listings INTEGER NOT NULL DEFAULT 0,
+    price_per_sqm_sum DECIMAL(20, 2) NOT NULL DEFAULT 0,
+    price_per_sqm_count INTEGER NOT NULL DEFAULT 0,
+    -- m² fiyatı medyan taslağı: log(fiyat)/log(1.02) kovaları ve sayıları
+    sketch_buckets INTEGER[] NOT NULL DEFAULT '{}',
+    sketch_counts INTEGER[] NOT NULL DEFAULT '{}',
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+
+    PRIMARY KEY (city, district, neighborhood, month)
+);
+
+-- Bölge ve ay bazında gözlenen m² fiyatları: o ay price_history'ye kaydedilen
+-- fiyatlar, her ilanın ay içindeki son fiyatıyla. Fiyat trendleri bu seriden
+-- hesaplanır (bkz. backend/area_monthly.py).
+CREATE TABLE IF NOT EXISTS area_price_monthly (
+    city VARCHAR(100) NOT NULL,
+    district VARCHAR(100) NOT NULL,
+    neighborhood VARCHAR(100) NOT NULL,
+    month DATE NOT NULL,
+    listings INTEGER NOT NULL DEFAULT 0,
+    price_per_sqm_sum DECIMAL(20, 2) NOT NULL DEFAULT 0,
+    price_per_sqm_count INTEGER NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+
+    PRIMARY KEY (city, district, neighborhood, month)
+);
+
+-- Bölge trendleri içinde bulunulan ay ile 6 ve 12 ay önceki ayları okur
+CREATE INDEX IF NOT EXISTS idx_area_price_monthly_month
+    ON area_price_monthly (month);
+
+-- Fiyat geçmişi için tablo (aylık bölümlenmiş)
 CREATE TABLE IF NOT EXISTS price_history (
-    id SERIAL PRIMARY KEY,
+    id BIGSERIAL,
     property_id INTEGER REFERENCES properties(id),
     price DECIMAL(15, 2),
-    recorded_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+    recorded_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (id, recorded_at)
+) PARTITION BY RANGE (recorded_at);
+
+-- Fiyat geçmişinde sadece fiyat değişimleri tutulur; ilan bazlı okumalar için
+CREATE INDEX IF NOT EXISTS idx_price_history_property
+    ON price_history (property_id, recorded_at);
+
+-- Henüz bölümü oluşturulmamış aylara düşen satırlar için
+CREATE TABLE IF NOT EXISTS price_history_default PARTITION OF price_history DEFAULT;
+
+-- Verilen ayın bölümünü oluştur; varsayılan bölüme düşmüş satırları taşı
+CREATE OR REPLACE FUNCTION create_price_history_partition(month_start DATE)
+RETURNS TEXT AS $$
+DECLARE
+    range_start DATE := date_trunc('month', month_start)::date;
+    range_end DATE := (date_trunc('month', month_start) + INTERVAL '1 month')::date;
+    partition_name TEXT := 'price_history_' || to_char(month_start, 'YYYY_MM');
+BEGIN
+    IF to_regclass(partition_name) IS NOT NULL THEN
+        RETURN partition_name;
+    END IF;
+
+    EXECUTE format(
+        'CREATE TABLE %I (LIKE price_history INCLUDING DEFAULTS INCLUDING CONSTRAINTS)',
+        partition_name
+    );
+    EXECUTE format(
+        'WITH moved AS (
+            DELETE FROM price_history_default
+            WHERE recorded_at >= %L AND recorded_at < %L
+            RETURNING *
+        )
+        INSERT INTO %I SELECT * FROM moved',
+        range_start, range_end, partition_name
+    );
+    EXECUTE format(
+        'ALTER TABLE price_history ATTACH PARTITION %I FOR VALUES FROM (%L) TO (%L)',
+        partition_name, range_start, range_end
+    );
+    RETURN partition_name;
+END;
+$$ language 'plpgsql';
+
+-- İçinde bulunulan ay ve sonraki iki ay için bölümler
+SELECT create_price_history_partition((date_trunc('month', CURRENT_DATE) + m * INTERVAL '1 month')::date)
+FROM generate_series(0, 2) AS m;
+
+-- Saklama süresini aşan bölümlerin aylık özetleri
+CREATE TABLE IF NOT EXISTS price_history_monthly (
+    property_id INTEGER REFERENCES properties(id),
+    month DATE NOT NULL,
+    min_price DECIMAL(15, 2),
+    max_price DECIMAL(15, 2),
+    last_price DECIMAL(15, 2),
+    last_recorded_at TIMESTAMP WITH TIME ZONE,
+    change_count INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (property_id, month)
 );
 
 -- Değerleme modeli parametreleri için tablo
@@ -67,6 +202,28 @@ CREATE TABLE IF NOT EXISTS valuation_parameters (
     updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
 );
 
+-- Yarıda kalan taramaların kaldığı yerden devam edebilmesi için
+CREATE TABLE IF NOT EXISTS crawl_checkpoints (
+    base_url TEXT PRIMARY KEY,
+    last_page INTEGER NOT NULL DEFAULT 0,
+    last_listing_number VARCHAR(50),
+    completed BOOLEAN NOT NULL DEFAULT FALSE,
+    started_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Toplu puanlama işinin çalışmaları; artımlı mod son çalışmanın
+-- başlangıcından sonra değişen ilanları puanlar
+CREATE TABLE IF NOT EXISTS property_scoring_runs (
+    id SERIAL PRIMARY KEY,
+    mode VARCHAR(20) NOT NULL,  -- full / incremental
+    model VARCHAR(50) NOT NULL,  -- rules / ml:<sürüm>
+    started_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    finished_at TIMESTAMP WITH TIME ZONE,
+    scored INTEGER NOT NULL DEFAULT 0,
+    updated INTEGER NOT NULL DEFAULT 0
+);
+
 -- Trigger fonksiyonu - properties tablosu için updated_at güncellemesi
 CREATE OR REPLACE FUNCTION update_updated_at_column()
 RETURNS TRIGGER AS $$
@@ -76,9 +233,15 @@ BEGIN
 END;
 $$ language 'plpgsql';
 
--- Properties tablosu için trigger
+-- Properties tablosu için trigger. Puan kolonlarının toplu yazımı
+-- (score_properties.py) updated_at'i değiştirmez.
 CREATE TRIGGER update_properties_updated_at
-    BEFORE UPDATE ON properties
+    BEFORE UPDATE OF
+        title, price, currency, city, district, neighborhood, square_meters,
+        building_age, property_type, listing_date, listing_number,
+        agency_name, agency_logo_url, agency_url, agent_name, agent_phone,
+        agent_updated_at, image_url, listing_url, price_per_sqm
+    ON properties
     FOR EACH ROW
     EXECUTE FUNCTION update_updated_at_column();
 
@@ -66,7 +66,7 @@ function HomePage() {
 
       setNotification({
         open: true,
-        message: `${response.data.message} (${response.data.total_listings || 0} ilan)`,
+        message: `${response.data.message} (İş no: ${response.data.job_id})`,
         severity: 'success',
       });
       